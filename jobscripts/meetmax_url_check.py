@@ -4,227 +4,585 @@ from pathlib import Path
 # Add the absolute path to the parent directory
 sys.path.append(str(Path.home() / 'client_etl_workflow'))
 import threading
-import requests
-import re
+import asyncio
+import socket
+import subprocess
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
 import uuid
 import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from systemscripts.user_utils import get_username
 from systemscripts.log_utils import log_message
-from systemscripts.web_utils import fetch_url
+from systemscripts.web_utils import fetch_url_async, AdaptiveRateController, HostLimiter, HttpClient
+from systemscripts.meetmax_html import extract_page, PageFields
+from systemscripts.http_cache import HttpCache, body_digest
+from systemscripts.result_writer import AppendOnlyResultWriter, write_manifest, read_manifest
+from systemscripts.rate_budget import DbTokenBucket
+from systemscripts.meetmax_scan_shards import (
+    create_shards, claim_shard, renew_shard, release_dead_claims, complete_shard, shard_progress, load_staged_results,
+    clear_staged_results, SHARD_HEARTBEAT_SECONDS
+)
 from systemscripts.periodic_utils import periodic_task
-from systemscripts.directory_management import LOG_DIR, FILE_WATCHER_DIR, ensure_directory_exists
+from systemscripts.meetmax_event_state import (
+    load_event_state, select_event_ids, merge_snapshot, record_event_results, highest_valid_event_id,
+    load_frontier, record_frontier, FAILED_STATUSES
+)
+from systemscripts.directory_management import LOG_DIR, FILE_WATCHER_DIR, CACHE_DIR, ensure_directory_exists
 
 # Define constants
 BASE_URL = "https://www.meetmax.com/sched/event_{}/"
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 MAX_RETRIES = 3  # Reduced to avoid excessive retries on rate limits
 INITIAL_DELAY = 15.0  # Increased for longer retry backoff
-TASK_SUBMISSION_DELAY = 5.0  # Enforce delay between task submissions
+REQUESTS_PER_SECOND = float(os.environ.get("MEETMAX_REQUESTS_PER_SECOND", "1.0"))  # Starting request rate, retries included
+MIN_REQUESTS_PER_SECOND = float(os.environ.get("MEETMAX_MIN_REQUESTS_PER_SECOND", "0.05"))  # Floor for rate cuts on 429/503/timeouts
+MAX_REQUESTS_PER_SECOND = float(os.environ.get("MEETMAX_MAX_REQUESTS_PER_SECOND", "4.0"))  # Ceiling for the additive increase
+REQUEST_BURST = int(os.environ.get("MEETMAX_REQUEST_BURST", "2"))  # Requests allowed back to back after an idle spell
+MAX_CONCURRENT_PER_HOST = int(os.environ.get("MEETMAX_MAX_CONCURRENT_PER_HOST", "4"))  # Open requests against www.meetmax.com
+MAX_EVENTS_IN_FLIGHT = int(os.environ.get("MEETMAX_MAX_EVENTS_IN_FLIGHT", "16"))  # Events worked on at once; the budget above sets throughput
+KEEPALIVE_SECONDS = float(os.environ.get("MEETMAX_KEEPALIVE_SECONDS", "30"))  # Idle time before a pooled connection is closed
+PAGE_CACHE_MAX_MB = int(os.environ.get("MEETMAX_PAGE_CACHE_MAX_MB", "256"))  # Size of the conditional-GET page cache; 0 disables it
+SCAN_WORKERS = int(os.environ.get("MEETMAX_SCAN_WORKERS", "0"))  # Worker processes for a sharded scan; 0 checks every event in this process
+GLOBAL_REQUESTS_PER_SECOND = float(os.environ.get("MEETMAX_GLOBAL_REQUESTS_PER_SECOND", str(MAX_REQUESTS_PER_SECOND)))  # Request budget shared by all workers of a sharded scan
+RATE_BUDGET_NAME = "www.meetmax.com"  # dba.tratebudget row the workers draw their requests from
+SHARD_POLL_SECONDS = 10  # How often the coordinator checks on shards still claimed by other workers
 PERIODIC_INTERVAL = 300  # Increased for longer runs
 
+# Headers sent with every request, and the extra ones for the private company list page
+SESSION_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive"
+}
+PRIVATE_PAGE_HEADERS = {
+    "Accept": "application/vnd.ms-excel,application/octet-stream,text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive",
+    "User-Agent": USER_AGENT
+}
+
 # Define directories
 FILE_WATCHER_TEMP_DIR = FILE_WATCHER_DIR / "file_watcher_temp"
+PAGE_CACHE_DIR = CACHE_DIR / "meetmax_pages"
 
 # Ensure directories exist
 ensure_directory_exists(LOG_DIR)
 ensure_directory_exists(FILE_WATCHER_DIR)
 ensure_directory_exists(FILE_WATCHER_TEMP_DIR)
-
-# Define Event IDs range
-event_ids = range(94583, 120400)
-
-
-# Global lock and variables
-results_lock = threading.Lock()
+ensure_directory_exists(CACHE_DIR)
+ensure_directory_exists(PAGE_CACHE_DIR)
+
+# Define Event IDs range: from EVENT_ID_START through the discovered frontier plus FRONTIER_LOOKAHEAD
+EVENT_ID_START = 94583
+DEFAULT_FRONTIER = 120399  # Assumed highest valid ID when neither the cache nor the event state knows one
+FRONTIER_LOOKAHEAD = 20  # IDs past the frontier checked every run, so new events show up without rediscovery
+FRONTIER_GAP_TOLERANCE = 5  # Consecutive invalid IDs needed before the search treats an ID as past the frontier
+FRONTIER_CACHE_HOURS = 12  # A cached frontier younger than this is used without probing
+MAX_FRONTIER_PROBES = 200  # Upper bound on event IDs checked by one discovery
+event_ids = range(EVENT_ID_START, DEFAULT_FRONTIER + 1)
+
+
+# Columns of a result row and how AppendOnlyResultWriter buffers them
+RESULT_SCHEMA = [
+    ("EventID", "int"), ("URL", "str"), ("IfExists", "int"), ("InvalidEventID", "bool"),
+    ("IsDownloadable", "int"), ("DownloadLink", "str"), ("StatusCode", "str"), ("Title", "str")
+]
+
+# Global variables
 results = []
 stop_event = threading.Event()
 script_start_time = time.time()
 run_uuid = str(uuid.uuid4())
 process_counters = {}
 start_timestamp = None
+rate_controller = None
+http_client = None
+page_cache = None
+request_budget = None
 
 def save_results():
-    """Save current results to a temporary CSV file, overwriting with fixed timestamp."""
+    """Checkpoint the streamed results: fsync the temporary JSON Lines file rows have been appended to as they arrived."""
     global user_cache, log_file, start_timestamp
     log_message(log_file, "PeriodicSave", f"save_results called, current results length: {len(results)}", run_uuid=run_uuid, stepcounter="PeriodicSave_call", user=user_cache, script_start_time=script_start_time)
-    with results_lock:
-        if results:
-            temp_csv_file = FILE_WATCHER_TEMP_DIR / f"{start_timestamp}_MeetMaxURLCheck.csv"
-            log_message(log_file, "PeriodicSave", f"Attempting to save to {temp_csv_file}", run_uuid=run_uuid, stepcounter="PeriodicSave_1", user=user_cache, script_start_time=script_start_time)
-            df = pd.DataFrame(results)
-            df = df.sort_values(by='EventID')
-            try:
-                df.to_csv(temp_csv_file, index=False, quoting=csv.QUOTE_NONNUMERIC, quotechar='"')
-                os.chmod(temp_csv_file, 0o660)
-                log_message(log_file, "PeriodicSave", f"Saved {len(results)} rows to {temp_csv_file}", run_uuid=run_uuid, stepcounter="PeriodicSave_0", user=user_cache, script_start_time=script_start_time)
-            except (PermissionError, OSError) as e:
-                log_message(log_file, "Error", f"Failed to save results to {temp_csv_file}: {str(e)}", run_uuid=run_uuid, stepcounter="PeriodicSave_0", user=user_cache, script_start_time=script_start_time)
-        else:
-            log_message(log_file, "PeriodicSave", "No results to save yet", run_uuid=run_uuid, stepcounter="PeriodicSave_2", user=user_cache, script_start_time=script_start_time)
-
-def process_event(event_id, log_file):
-    """Process a single event ID."""
-    log_message(log_file, "EventProcessing", f"Starting processing for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": USER_AGENT,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Encoding": "gzip, deflate",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "keep-alive"
-    })
-
-    public_url = BASE_URL.format(event_id) + "__co-list_cp.html"
-    private_url = BASE_URL.format(event_id) + "__private-co-list_cp.html"
-    url_used = public_url
-    is_private = False
+    if rate_controller is not None:
+        log_message(log_file, "RateControl", f"Effective request rate: {rate_controller.summary()}", run_uuid=run_uuid, stepcounter="RateControl_0", user=user_cache, script_start_time=script_start_time)
+    if not results:
+        log_message(log_file, "PeriodicSave", "No results to save yet", run_uuid=run_uuid, stepcounter="PeriodicSave_2", user=user_cache, script_start_time=script_start_time)
+        return
+    try:
+        synced = results.sync()
+        log_message(log_file, "PeriodicSave", f"Synced {synced} rows to {results.path}", run_uuid=run_uuid, stepcounter="PeriodicSave_0", user=user_cache, script_start_time=script_start_time)
+    except OSError as e:
+        log_message(log_file, "Error", f"Failed to sync results to {results.path}: {str(e)}", run_uuid=run_uuid, stepcounter="PeriodicSave_0", user=user_cache, script_start_time=script_start_time)
+
+def checkpoint_file(timestamp):
+    """Checkpoint manifest of the run started at timestamp, next to its streamed results."""
+    return FILE_WATCHER_TEMP_DIR / f"{timestamp}_MeetMaxURLCheck.checkpoint.json"
+
+def find_unfinished_run():
+    """Manifest of the most recent run if it did not finish, or None."""
+    manifests = sorted(FILE_WATCHER_TEMP_DIR.glob("*_MeetMaxURLCheck.checkpoint.json"))
+    if not manifests:
+        return None
+    manifest = read_manifest(manifests[-1])
+    return manifest if manifest and manifest.get("status") == "running" else None
+
+def failed_result(event_id, url_used, status_code):
+    """Result row for an event whose page could not be fetched or parsed."""
+    return {
+        "EventID": event_id,
+        "URL": url_used,
+        "IfExists": 0,
+        "InvalidEventID": False,
+        "IsDownloadable": 0,
+        "DownloadLink": "",
+        "StatusCode": status_code,
+        "Title": ""
+    }
+
+def has_private_list(event_id, fields, log_file):
+    """Return True if the public page's extracted fields show a link to a private company list."""
+    private_match = fields.private_link
+    log_message(log_file, "EventProcessing", f"Private site indicator match for EventID {event_id}: {bool(private_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+    if private_match:
+        log_message(log_file, "EventProcessing", f"Private site indicator found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    return bool(private_match)
+
+def parse_event_page(event_id, url_used, status_code, fields, log_file):
+    """Build the result row for an event from the fields extracted from the company list page that was used."""
     is_downloadable = 0
     download_link = ""
     if_exists = 0
     invalid_event_id = False
-    status_code = None
     title = ""
 
-    try:
-        public_response = fetch_url(session, public_url, retries=MAX_RETRIES, initial_delay=INITIAL_DELAY, log_file=log_file, run_uuid=run_uuid, user=user_cache, script_start_time=script_start_time)
-        if public_response is None:
-            log_message(log_file, "Error", f"Failed to fetch public page for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-            return {
-                "EventID": event_id,
-                "URL": url_used,
-                "IfExists": 0,
-                "InvalidEventID": False,
-                "IsDownloadable": 0,
-                "DownloadLink": "",
-                "StatusCode": "Failed",
-                "Title": ""
-            }
-
-        status_code = public_response.status_code
-        log_message(log_file, "EventProcessing", f"Attempt 1 for EventID {event_id} at {public_url}: Status {status_code}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        log_message(log_file, "EventProcessing", f"Response length for EventID {event_id} at {public_url}: {len(public_response.text)} bytes", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-
-        private_match = re.search(r'<a[^>]*href="[^"]*__private-co-list_cp\.html[^"]*"[^>]*class="[^"]*nav-link[^"]*"[^>]*>Private Company List</a>', public_response.text, re.IGNORECASE)
-        log_message(log_file, "EventProcessing", f"Private site indicator match for EventID {event_id}: {bool(private_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        if private_match:
-            is_private = True
-            url_used = private_url
-            log_message(log_file, "EventProcessing", f"Private site indicator found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    if fields.title is not None:
+        title = fields.title.replace(" - MeetMax", "").strip()
+        log_message(log_file, "EventProcessing", f"Extracted title for EventID {event_id}: {title}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    else:
+        log_message(log_file, "EventProcessing", f"No title found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
 
-        response_text = public_response.text
-        if is_private:
-            log_message(log_file, "EventProcessing", f"Fetching private page: {private_url}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-            private_response = fetch_url(session, private_url, retries=MAX_RETRIES, initial_delay=INITIAL_DELAY, headers={
-                "Accept": "application/vnd.ms-excel,application/octet-stream,text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Encoding": "gzip, deflate",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Connection": "keep-alive",
-                "User-Agent": USER_AGENT
-            }, log_file=log_file, run_uuid=run_uuid, user=user_cache, script_start_time=script_start_time)
-            if private_response is None:
-                log_message(log_file, "Error", f"Failed to fetch private page for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-                return {
-                    "EventID": event_id,
-                    "URL": url_used,
-                    "IfExists": 0,
-                    "InvalidEventID": False,
-                    "IsDownloadable": 0,
-                    "DownloadLink": "",
-                    "StatusCode": "Failed",
-                    "Title": ""
-                }
-            response_text = private_response.text
-            status_code = private_response.status_code
-            log_message(log_file, "EventProcessing", f"Attempt 1 for EventID {event_id} at {private_url}: Status {status_code}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-            log_message(log_file, "EventProcessing", f"Response length for EventID {event_id} at {private_url}: {len(response_text)} bytes", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-
-        title_match = re.search(r'<title>(.*?)</title>', response_text, re.IGNORECASE)
-        if title_match:
-            title = title_match.group(1).replace(" - MeetMax", "").strip()
-            log_message(log_file, "EventProcessing", f"Extracted title for EventID {event_id}: {title}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    invalid_match = fields.invalid_event
+    log_message(log_file, "EventProcessing", f"Invalid Event ID match for EventID {event_id}: {bool(invalid_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+    if invalid_match:
+        invalid_event_id = True
+        log_message(log_file, "EventProcessing", f"Invalid Event ID tag found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    else:
+        if_exists = 1
+        log_message(log_file, "EventProcessing", f"No Invalid Event ID tag found for EventID {event_id}, event exists", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+
+    log_message(log_file, "EventProcessing", f"Checking for downloadable link or export button for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    link_match = fields.download_href is not None
+    button_match = fields.export_button
+    log_message(log_file, "EventProcessing", f"Download link match for EventID {event_id}: {bool(link_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+    log_message(log_file, "EventProcessing", f"Export button match for EventID {event_id}: {bool(button_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+    if link_match or button_match:
+        is_downloadable = 1
+        if link_match:
+            href = fields.download_href
+            log_message(log_file, "EventProcessing", f"Found downloadable link for EventID {event_id}, href: {href}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
         else:
-            log_message(log_file, "EventProcessing", f"No title found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+            href = f"__co-list_cp.xls?event_id={event_id}"
+            log_message(log_file, "EventProcessing", f"Found export button for EventID {event_id}, generating href: {href}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
 
-        invalid_match = re.search(r'<div class="alert alert-danger">Invalid Event ID: \d+</div>', response_text, re.IGNORECASE)
-        log_message(log_file, "EventProcessing", f"Invalid Event ID match for EventID {event_id}: {bool(invalid_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        if invalid_match:
-            invalid_event_id = True
-            log_message(log_file, "EventProcessing", f"Invalid Event ID tag found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        else:
-            if_exists = 1
-            log_message(log_file, "EventProcessing", f"No Invalid Event ID tag found for EventID {event_id}, event exists", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-
-        log_message(log_file, "EventProcessing", f"Checking for downloadable link or export button for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        link_match = re.search(r'<a[^>]*href="([^"]*[_\-_]co-list_cp\.xls[^"]*)"[^>]*>', response_text, re.IGNORECASE)
-        button_match = re.search(r'<[^>]*id="export"[^>]*>.*?<i class="fas fa-cloud-download-alt"> </i>\s*Download Company List', response_text, re.IGNORECASE | re.DOTALL)
-        log_message(log_file, "EventProcessing", f"Download link match for EventID {event_id}: {bool(link_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        log_message(log_file, "EventProcessing", f"Export button match for EventID {event_id}: {bool(button_match)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        if link_match or button_match:
-            is_downloadable = 1
-            if link_match:
-                href = link_match.group(1)
-                log_message(log_file, "EventProcessing", f"Found downloadable link for EventID {event_id}, href: {href}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-            else:
-                href = f"__co-list_cp.xls?event_id={event_id}"
-                log_message(log_file, "EventProcessing", f"Found export button for EventID {event_id}, generating href: {href}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+        if "?event_id=" in href:
+            base_url, query = href.split("?event_id=", 1)
+            event_id_part = query.split(";", 1)[0]
+            href = f"{base_url}?event_id={event_id_part}"
+            log_message(log_file, "EventProcessing", f"Truncated href after event_id for EventID {event_id}: {href}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
 
-            if "?event_id=" in href:
-                base_url, query = href.split("?event_id=", 1)
-                event_id_part = query.split(";", 1)[0]
-                href = f"{base_url}?event_id={event_id_part}"
-                log_message(log_file, "EventProcessing", f"Truncated href after event_id for EventID {event_id}: {href}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+        download_link = BASE_URL.format(event_id) + href.lstrip('/') if not href.startswith('http') else href
+        log_message(log_file, "EventProcessing", f"Download URL for EventID {event_id}: {download_link}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    else:
+        log_message(log_file, "EventProcessing", f"No downloadable link or export button found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+
+    result = {
+        "EventID": event_id,
+        "URL": url_used,
+        "IfExists": if_exists,
+        "InvalidEventID": invalid_event_id,
+        "IsDownloadable": is_downloadable,
+        "DownloadLink": download_link,
+        "StatusCode": str(status_code),
+        "Title": title
+    }
+    log_message(log_file, "EventProcessing", f"Result for EventID {event_id}: IfExists={if_exists}, InvalidEventID={invalid_event_id}, IsDownloadable={is_downloadable}, DownloadLink={download_link}, StatusCode={status_code}, Title={title}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    return result
+
+async def fetch_event_page(session, event_id, url, page_name, log_file, rate_controller, host_limiter, headers=None, cache=None):
+    """Fetch one of an event's company list pages. Returns None if the fetch returned nothing; fetch errors are raised."""
+    response = await fetch_url_async(session, url, retries=MAX_RETRIES, initial_delay=INITIAL_DELAY, headers=headers, rate_limiter=request_budget, rate_controller=rate_controller, host_limiter=host_limiter, log_file=log_file, run_uuid=run_uuid, user=user_cache, script_start_time=script_start_time, cache=cache)
+    if response is None:
+        log_message(log_file, "Error", f"Failed to fetch {page_name} page for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+        return None
+    log_message(log_file, "EventProcessing", f"Attempt 1 for EventID {event_id} at {url}: Status {response.status_code}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+    log_message(log_file, "EventProcessing", f"Response length for EventID {event_id} at {url}: {len(response.text)} bytes", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+    return response
+
+async def read_event_page(session, event_id, url, page_name, log_file, rate_controller, host_limiter, headers=None):
+    """Fetch a company list page and extract its fields. Returns (status code, PageFields), or None if the fetch returned nothing.
+
+    With the page cache the request is conditional: a 304, or a body whose digest matches the cached one, reuses
+    the cached fields instead of extracting them again.
+    """
+    if page_cache is None:
+        page = await fetch_event_page(session, event_id, url, page_name, log_file, rate_controller, host_limiter, headers)
+        return None if page is None else (page.status_code, extract_page(page.text))
+
+    page = await fetch_event_page(session, event_id, url, page_name, log_file, rate_controller, host_limiter, headers, cache=page_cache)
+    if page is None:
+        return None
+    entry = page_cache.get(url)
+    if page.status_code == 304:
+        if entry is not None:
+            log_message(log_file, "PageCache", f"{page_name.capitalize()} page for EventID {event_id} not modified, using cached fields", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+            return entry["status_code"], PageFields(**entry["result"])
+        # The entry was evicted after its validators were sent; fetch the page unconditionally
+        page = await fetch_event_page(session, event_id, url, page_name, log_file, rate_controller, host_limiter, headers)
+        if page is None:
+            return None
+
+    digest = body_digest(page.text)
+    if entry is not None and entry["digest"] == digest:
+        page_cache.record("unchanged")
+        log_message(log_file, "PageCache", f"{page_name.capitalize()} page for EventID {event_id} unchanged, using cached fields", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+        fields = PageFields(**entry["result"])
+    else:
+        page_cache.record("miss")
+        fields = extract_page(page.text)
+    page_cache.put(url, page.headers, digest, fields._asdict(), page.status_code)
+    return page.status_code, fields
 
-            download_link = BASE_URL.format(event_id) + href.lstrip('/') if not href.startswith('http') else href
-            log_message(log_file, "EventProcessing", f"Download URL for EventID {event_id}: {download_link}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        else:
-            log_message(log_file, "EventProcessing", f"No downloadable link or export button found for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-
-        result = {
-            "EventID": event_id,
-            "URL": url_used,
-            "IfExists": if_exists,
-            "InvalidEventID": invalid_event_id,
-            "IsDownloadable": is_downloadable,
-            "DownloadLink": download_link,
-            "StatusCode": str(status_code),
-            "Title": title
-        }
-        log_message(log_file, "EventProcessing", f"Result for EventID {event_id}: IfExists={if_exists}, InvalidEventID={invalid_event_id}, IsDownloadable={is_downloadable}, DownloadLink={download_link}, StatusCode={status_code}, Title={title}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        return result
+async def process_event(session, event_id, log_file, rate_controller, host_limiter):
+    """Process a single event ID: fetch the public page, then the private one if it is linked, and parse the one used."""
+    log_message(log_file, "EventProcessing", f"Starting processing for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+    public_url = BASE_URL.format(event_id) + "__co-list_cp.html"
+    private_url = BASE_URL.format(event_id) + "__private-co-list_cp.html"
+    url_used = public_url
+    try:
+        page = await read_event_page(session, event_id, public_url, "public", log_file, rate_controller, host_limiter)
+        if page is None:
+            return failed_result(event_id, url_used, "Failed")
 
+        # Each page is read once by extract_page; the public page's fields are reused when it has no private list
+        status_code, fields = page
+        if has_private_list(event_id, fields, log_file):
+            url_used = private_url
+            log_message(log_file, "EventProcessing", f"Fetching private page: {private_url}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+            page = await read_event_page(session, event_id, private_url, "private", log_file, rate_controller, host_limiter, headers=PRIVATE_PAGE_HEADERS)
+            if page is None:
+                return failed_result(event_id, url_used, "Failed")
+            status_code, fields = page
+
+        return parse_event_page(event_id, url_used, status_code, fields, log_file)
     except Exception as e:
-        log_message(log_file, "Error", f"Unexpected error processing EventID {event_id}: {str(e)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-        return {
-            "EventID": event_id,
-            "URL": url_used,
-            "IfExists": 0,
-            "InvalidEventID": False,
-            "IsDownloadable": 0,
-            "DownloadLink": "",
-            "StatusCode": "Error",
-            "Title": ""
-        }
+        log_message(log_file, "Error", f"Unexpected error processing EventID {event_id}: {str(e) or type(e).__name__}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+        return failed_result(event_id, url_used, "Error")
 
-def meetmax_url_check():
-    """Check MeetMax event URLs and save results to CSV."""
-    global results, stop_event, script_start_time, run_uuid, user_cache, log_file, start_timestamp
-    results = []
-    total = len(event_ids)
-    event_counter = 0
+async def check_worker(session, pending_ids, log_file, rate_controller, host_limiter, sink):
+    """Take event IDs from the shared iterator until it is exhausted, appending each result to sink. Returns the count processed."""
+    processed = 0
+    for event_id in pending_ids:
+        try:
+            result = await process_event(session, event_id, log_file, rate_controller, host_limiter)
+        except Exception as e:
+            log_message(log_file, "Error", f"Exception processing EventID {event_id}: {str(e)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
+            result = failed_result(event_id, BASE_URL.format(event_id) + "__co-list_cp.html", "Error")
+        sink.append(result)
+        log_message(log_file, "EventProcessing", f"Appended result for EventID {event_id}, current results length: {len(sink)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}_appended", user=user_cache, script_start_time=script_start_time, level="DEBUG")
+        processed += 1
+    return processed
+
+def open_page_cache():
+    """Conditional-GET cache of company list pages, or None when MEETMAX_PAGE_CACHE_MAX_MB is 0."""
+    return HttpCache(PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024) if PAGE_CACHE_MAX_MB > 0 else None
+
+def open_http_client():
+    """HttpClient shared by every request of a run, keeping up to MAX_CONCURRENT_PER_HOST connections per host open."""
+    return HttpClient(SESSION_HEADERS, pool_maxsize=MAX_CONCURRENT_PER_HOST, limit_per_host=MAX_CONCURRENT_PER_HOST, keepalive_timeout=KEEPALIVE_SECONDS)
+
+async def check_events(ids_to_check, log_file, rate_controller, sink=None):
+    """Check the given event IDs with MAX_EVENTS_IN_FLIGHT workers sharing the run's connection pool and adaptive request rate.
+
+    Results are appended to sink, by default the run's results.
+    """
+    sink = results if sink is None else sink
+    host_limiter = HostLimiter(MAX_CONCURRENT_PER_HOST)
+    # One iterator shared by every worker, so each event ID is handed out exactly once
+    pending_ids = iter(ids_to_check)
+    try:
+        counts = await asyncio.gather(*(check_worker(http_client, pending_ids, log_file, rate_controller, host_limiter, sink) for _ in range(MAX_EVENTS_IN_FLIGHT)))
+    finally:
+        await http_client.aclose()
+    return sum(counts)
+
+async def discover_frontier(start_id, log_file, rate_controller):
+    """Find the highest valid event ID, starting from start_id, which is known or assumed to be valid.
+
+    Exponential probing from start_id finds an ID past the frontier, then a binary search narrows the gap between
+    the two. An ID counts as past the frontier only when it and the FRONTIER_GAP_TOLERANCE - 1 IDs after it are
+    all invalid, so short runs of deleted or private events do not stop the search early. Returns
+    (frontier, {event ID: result} for every ID checked) so the probes need not be repeated.
+    """
+    probed = {}
+    host_limiter = HostLimiter(MAX_CONCURRENT_PER_HOST)
+    try:
+        async def is_valid(event_id):
+            if event_id not in probed:
+                probed[event_id] = await process_event(http_client, event_id, log_file, rate_controller, host_limiter)
+            result = probed[event_id]
+            return result["IfExists"] == 1 and result["StatusCode"] not in FAILED_STATUSES
+
+        async def first_valid(event_id):
+            """First valid ID in the gap-tolerance window starting at event_id, or None."""
+            for candidate in range(event_id, event_id + FRONTIER_GAP_TOLERANCE):
+                if len(probed) >= MAX_FRONTIER_PROBES:
+                    return None
+                if await is_valid(candidate):
+                    return candidate
+            return None
+
+        # Exponential probing: lo is valid, hi is past the frontier
+        lo, step, hi = start_id, 1, None
+        while hi is None:
+            found = await first_valid(lo + step)
+            if found is None:
+                hi = lo + step
+            else:
+                lo, step = found, step * 2
+
+        # Binary search down to one gap-tolerance window, then check the few IDs left in it
+        while hi - lo > FRONTIER_GAP_TOLERANCE:
+            mid = (lo + hi) // 2
+            found = await first_valid(mid)
+            if found is None:
+                hi = mid
+            else:
+                lo, hi = found, max(hi, found + 1)
+        for event_id in range(hi - 1, lo, -1):
+            if await is_valid(event_id):
+                lo = event_id
+                break
+    finally:
+        await http_client.aclose()
+    return lo, probed
+
+def open_request_budget(fallback_rate):
+    """Shared request budget of a sharded scan, paced locally at fallback_rate while the database cannot be reached."""
+    return DbTokenBucket(RATE_BUDGET_NAME, GLOBAL_REQUESTS_PER_SECOND, REQUEST_BURST, fallback_rate=fallback_rate)
+
+def shard_heartbeat(scan_uuid, shard_id, worker_name, shard_results, log_file):
+    """Task for periodic_task that renews this worker's claim of shard_id whenever events have been checked since the last renewal.
+
+    A worker that stops making progress stops renewing, so its shard is still claimed again once the lease expires.
+    """
+    renewed_count = 0
+
+    def renew():
+        nonlocal renewed_count
+        if len(shard_results) > renewed_count:
+            renewed_count = len(shard_results)
+            renew_shard(scan_uuid, shard_id, worker_name, log_file, run_uuid, user_cache, script_start_time)
+    return renew
+
+def process_shards(scan_uuid, worker_name, log_file, wait_for_others=False):
+    """Claim, check and stage shards of run scan_uuid until none is left to claim. Returns the event count processed.
+
+    Each claim returns this worker's share of the run's rate limit, which request_budget falls back to while the
+    database cannot be reached. The claim is renewed every SHARD_HEARTBEAT_SECONDS while results come in, however
+    long the shard takes at the current request rate.
+    With wait_for_others, keeps polling while other workers hold claims and takes over any whose lease expires, so
+    every shard of the run is done when it returns.
+    """
+    processed = 0
+    while True:
+        shard = claim_shard(scan_uuid, worker_name, log_file, run_uuid, user_cache, script_start_time)
+        if shard is None:
+            if not wait_for_others:
+                break
+            progress = shard_progress(scan_uuid, log_file, run_uuid, user_cache, script_start_time)
+            if not progress or not (progress["pending"] or progress["claimed"]):
+                break
+            log_message(log_file, "Shards", f"Waiting for {progress['claimed']} shards claimed by other workers", run_uuid=run_uuid, stepcounter="Shards_wait", user=user_cache, script_start_time=script_start_time)
+            time.sleep(SHARD_POLL_SECONDS)
+            continue
+        shard_id, shard_event_ids, fallback_rate = shard
+        request_budget.set_fallback_rate(fallback_rate)
+        log_message(log_file, "Shards", f"{worker_name} claimed shard {shard_id} of run {scan_uuid} with {len(shard_event_ids)} event IDs", run_uuid=run_uuid, stepcounter=f"shard_{shard_id}", user=user_cache, script_start_time=script_start_time)
+        shard_results = []
+        heartbeat_stop = threading.Event()
+        periodic_task(shard_heartbeat(scan_uuid, shard_id, worker_name, shard_results, log_file), SHARD_HEARTBEAT_SECONDS, heartbeat_stop)
+        try:
+            processed += asyncio.run(check_events(shard_event_ids, log_file, rate_controller, shard_results))
+        finally:
+            heartbeat_stop.set()
+        # A shard that cannot be staged stays claimed and is checked again when its lease expires
+        if complete_shard(scan_uuid, shard_id, shard_results, log_file, run_uuid, user_cache, script_start_time):
+            log_message(log_file, "Shards", f"{worker_name} staged {len(shard_results)} results of shard {shard_id}", run_uuid=run_uuid, stepcounter=f"shard_{shard_id}", user=user_cache, script_start_time=script_start_time)
+    return processed
+
+def meetmax_scan_worker(scan_uuid):
+    """Worker process of a sharded run: check shards of run scan_uuid until none is left to claim.
+
+    Started by meetmax_url_check for --workers, or by hand with --worker <run_uuid> on another host to add
+    capacity. Every worker draws its requests from the shared budget in dba.tratebudget, or paces itself at the
+    fallback rate stored with the run's shards while the database cannot be reached. The worker logs under its
+    own run_uuid, since log IDs are only unique within one process.
+    """
+    global user_cache, log_file, rate_controller, http_client, page_cache, request_budget
+    user_cache = get_username()
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    log_file = LOG_DIR / f"meetmax_url_check_worker_{datetime.now().strftime('%Y%m%dT%H%M%S')}_{os.getpid()}"
+    rate_controller = AdaptiveRateController(REQUESTS_PER_SECOND, MIN_REQUESTS_PER_SECOND, MAX_REQUESTS_PER_SECOND, burst=REQUEST_BURST)
+    http_client = open_http_client()
+    page_cache = open_page_cache()
+    # The run's fallback rate arrives with the first shard
+    request_budget = open_request_budget(MIN_REQUESTS_PER_SECOND)
+    log_message(log_file, "Initialization", f"Worker {worker_name} started for run {scan_uuid}", run_uuid=run_uuid, stepcounter="Worker_0", user=user_cache, script_start_time=script_start_time)
+
+    processed = process_shards(scan_uuid, worker_name, log_file)
+
+    log_message(log_file, "Processing", f"Worker {worker_name} processed {processed} events", run_uuid=run_uuid, stepcounter="Worker_1", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "RateControl", f"Effective request rate at end of run: {rate_controller.summary()}; global budget database errors: {request_budget.db_errors}", run_uuid=run_uuid, stepcounter="RateControl_1", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "HttpClient", f"Connection reuse: {http_client.summary()}", run_uuid=run_uuid, stepcounter="HttpClient_0", user=user_cache, script_start_time=script_start_time)
+    if page_cache is not None:
+        log_message(log_file, "PageCache", f"Page cache: {page_cache.summary()}", run_uuid=run_uuid, stepcounter="PageCache_0", user=user_cache, script_start_time=script_start_time)
+    http_client.close()
+    request_budget.close()
+
+def run_sharded_scan(shard_ids, workers, log_file, resumed=False):
+    """Check shard_ids in shards claimed by worker processes, then add their staged results to results.
+
+    This process starts the workers and claims shards alongside them until every shard is done, which also picks
+    up the shards of a worker that died once their lease expires. Returns the number of results merged, or None if
+    the staged results could not be loaded. If the shards cannot be created, checks shard_ids in this process.
+    When resumed, shards still claimed by stopped workers of the interrupted run on this host are claimable at once.
+    """
+    global request_budget
+    if create_shards(run_uuid, shard_ids, GLOBAL_REQUESTS_PER_SECOND, workers + 1, log_file, run_uuid, user_cache, script_start_time) is None:
+        log_message(log_file, "Warning", "Checking the event IDs in this process instead", run_uuid=run_uuid, stepcounter="Shards_1", user=user_cache, script_start_time=script_start_time)
+        checked_ids = {row["EventID"] for row in results}
+        return asyncio.run(check_events([event_id for event_id in shard_ids if event_id not in checked_ids], log_file, rate_controller))
+    if resumed:
+        release_dead_claims(run_uuid, log_file, run_uuid, user_cache, script_start_time)
+
+    request_budget = open_request_budget(GLOBAL_REQUESTS_PER_SECOND / (workers + 1))
+    command = [sys.executable, os.path.abspath(__file__), "--worker", run_uuid]
+    processes = [subprocess.Popen(command) for _ in range(workers)]
+    log_message(log_file, "Shards", f"Started {workers} worker processes sharing {GLOBAL_REQUESTS_PER_SECOND} requests/s; more can join with --worker {run_uuid}", run_uuid=run_uuid, stepcounter="Shards_7", user=user_cache, script_start_time=script_start_time)
+    processed = process_shards(run_uuid, f"{socket.gethostname()}:{os.getpid()}", log_file, wait_for_others=True)
+    exit_codes = [process.wait() for process in processes]
+    log_message(log_file, "Shards", f"Workers exited with {exit_codes}; this process checked {processed} events", run_uuid=run_uuid, stepcounter="Shards_8", user=user_cache, script_start_time=script_start_time)
+    request_budget.close()
+
+    # One sorted read of the staging table; rows merged before an interruption are already in results
+    staged = load_staged_results(run_uuid, log_file, run_uuid, user_cache, script_start_time)
+    if staged is None:
+        return None
+    merged_ids = {row["EventID"] for row in results}
+    new_rows = [row for row in staged if row["EventID"] not in merged_ids]
+    results.extend(new_rows)
+    log_message(log_file, "Shards", f"Merged {len(new_rows)} staged results", run_uuid=run_uuid, stepcounter="Shards_9", user=user_cache, script_start_time=script_start_time)
+    return len(new_rows)
+
+def meetmax_url_check(full_scan=False, resume=False, workers=SCAN_WORKERS):
+    """Check MeetMax event URLs and save results to CSV.
+
+    Only the event IDs due according to dba.tmeetmaxeventstate are checked, unless full_scan is set or the state
+    cannot be read; the final CSV is still a full snapshot, with unchecked IDs filled in from their last known state.
+    The IDs a run will check are saved in a checkpoint manifest next to its streamed results. With resume, the most
+    recent run, if it did not finish, is continued under its own timestamp and run_uuid, checking only the IDs with
+    no result yet, so its final CSV is the one the interrupted run would have written. With workers, the event IDs
+    are checked in shards by that many worker processes (see run_sharded_scan) and merged into the same CSV.
+    """
+    global results, stop_event, script_start_time, run_uuid, user_cache, log_file, start_timestamp, rate_controller, event_ids, http_client, page_cache
+    manifest = find_unfinished_run() if resume else None
+    resume_run = manifest is not None
+    rate_controller = AdaptiveRateController(REQUESTS_PER_SECOND, MIN_REQUESTS_PER_SECOND, MAX_REQUESTS_PER_SECOND, burst=REQUEST_BURST)
+    http_client = open_http_client()
+    page_cache = open_page_cache()
+    if manifest is not None:
+        run_uuid = manifest["run_uuid"]
+        workers = manifest.get("workers", 0)
+        checked_at = datetime.fromisoformat(manifest["checked_at"])
+        start_timestamp = manifest["start_timestamp"]
+    else:
+        checked_at = datetime.now()
+        start_timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
 
-    start_timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
     log_file = LOG_DIR / f"meetmax_url_check_{start_timestamp}"
-    temp_csv_file = FILE_WATCHER_TEMP_DIR / f"{start_timestamp}_MeetMaxURLCheck.csv"
+    temp_results_file = FILE_WATCHER_TEMP_DIR / f"{start_timestamp}_MeetMaxURLCheck.jsonl"
     final_csv_file = FILE_WATCHER_DIR / f"{start_timestamp}_MeetMaxURLCheck.csv"
+    manifest_file = checkpoint_file(start_timestamp)
+    # Results are appended to temp_results_file as they arrive; the sorted CSV is written once at the end
+    results = AppendOnlyResultWriter(temp_results_file, RESULT_SCHEMA, resume=resume_run)
 
     user_cache = get_username()
     log_message(log_file, "Initialization", f"Username: {user_cache}", run_uuid=run_uuid, stepcounter="Initialization_0", user=user_cache, script_start_time=script_start_time)
     log_message(log_file, "Initialization", f"Script started at {start_timestamp}", run_uuid=run_uuid, stepcounter="Initialization_1", user=user_cache, script_start_time=script_start_time)
     log_message(log_file, "Initialization", f"Final CSV path: {final_csv_file}", run_uuid=run_uuid, stepcounter="Initialization_2", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "Initialization", f"Streaming results to {temp_results_file}", run_uuid=run_uuid, stepcounter="Initialization_8", user=user_cache, script_start_time=script_start_time)
+
+    if resume and manifest is None:
+        log_message(log_file, "Warning", "No unfinished run to resume, starting a new run", run_uuid=run_uuid, stepcounter="Checkpoint_1", user=user_cache, script_start_time=script_start_time)
+
+    # The state is only written at the end of a run, so a resumed run reads what the interrupted one read
+    state = load_event_state(log_file, run_uuid, user_cache, script_start_time)
+    if manifest is not None:
+        # Event IDs with a result streamed before the interruption are not checked again
+        checked_ids = {row["EventID"] for row in results}
+        planned_ids = manifest["event_ids"]
+        event_ids = range(EVENT_ID_START, manifest["frontier"] + FRONTIER_LOOKAHEAD + 1)
+        ids_to_check = [event_id for event_id in planned_ids if event_id not in checked_ids]
+        log_message(log_file, "Checkpoint", f"Resuming run {start_timestamp}: {len(checked_ids)}/{len(planned_ids)} event IDs already checked, {len(ids_to_check)} left", run_uuid=run_uuid, stepcounter="Checkpoint_0", user=user_cache, script_start_time=script_start_time)
+    else:
+        # Find the highest valid event ID, reusing a recent cached value
+        known_valid = highest_valid_event_id(state) if state else None
+        cached = load_frontier(log_file, run_uuid, user_cache, script_start_time)
+        probed = {}
+        if cached and cached[1] >= checked_at - timedelta(hours=FRONTIER_CACHE_HOURS):
+            frontier = max(cached[0], known_valid or 0)
+            log_message(log_file, "Frontier", f"Using cached frontier {frontier} from {cached[1]}", run_uuid=run_uuid, stepcounter="Frontier_0", user=user_cache, script_start_time=script_start_time)
+        else:
+            start_id = max(cached[0] if cached else 0, known_valid or 0) or DEFAULT_FRONTIER
+            frontier, probed = asyncio.run(discover_frontier(start_id, log_file, rate_controller))
+            record_frontier(frontier, len(probed), log_file, run_uuid, user_cache, script_start_time)
+            log_message(log_file, "Frontier", f"Discovered frontier {frontier} from {start_id} with {len(probed)} probes", run_uuid=run_uuid, stepcounter="Frontier_0", user=user_cache, script_start_time=script_start_time)
+        event_ids = range(EVENT_ID_START, frontier + FRONTIER_LOOKAHEAD + 1)
+        results.extend(probed.values())
+
+        # Pick the event IDs to check from the per-event state; IDs probed above are not checked again
+        if full_scan or state is None:
+            ids_to_check = [event_id for event_id in event_ids if event_id not in probed]
+            log_message(log_file, "Initialization", f"Full scan of {len(ids_to_check)} event IDs", run_uuid=run_uuid, stepcounter="Initialization_7", user=user_cache, script_start_time=script_start_time)
+        else:
+            ids_to_check, reasons = select_event_ids(state, event_ids, checked_at)
+            ids_to_check = [event_id for event_id in ids_to_check if event_id not in probed]
+            log_message(log_file, "Initialization", f"Incremental scan of {len(ids_to_check)}/{len(event_ids)} event IDs: {', '.join(f'{reason}={count}' for reason, count in reasons.items())}", run_uuid=run_uuid, stepcounter="Initialization_7", user=user_cache, script_start_time=script_start_time)
+        checked_ids = set(probed)
+
+        # Checkpoint the plan before any other event is checked; the run is finished once the final CSV is written
+        manifest = {
+            "run_uuid": run_uuid,
+            "start_timestamp": start_timestamp,
+            "checked_at": checked_at.isoformat(),
+            "full_scan": full_scan,
+            "frontier": frontier,
+            "event_ids": list(probed) + ids_to_check,
+            "workers": workers,
+            "shard_ids": ids_to_check if workers else [],
+            "status": "running"
+        }
+        try:
+            write_manifest(manifest_file, manifest)
+            log_message(log_file, "Checkpoint", f"Checkpoint manifest written to {manifest_file}", run_uuid=run_uuid, stepcounter="Checkpoint_0", user=user_cache, script_start_time=script_start_time)
+        except OSError as e:
+            log_message(log_file, "Warning", f"Failed to write checkpoint manifest {manifest_file}, this run cannot be resumed: {str(e)}", run_uuid=run_uuid, stepcounter="Checkpoint_1", user=user_cache, script_start_time=script_start_time)
+    total = len(ids_to_check) + len(checked_ids)
 
     # Log active threads at start
     log_message(log_file, "Initialization", f"Active threads at start: {threading.active_count()}", run_uuid=run_uuid, stepcounter="Initialization_3", user=user_cache, script_start_time=script_start_time)
@@ -235,36 +593,25 @@ def meetmax_url_check():
     periodic_thread = periodic_task(save_results, PERIODIC_INTERVAL, stop_event)
     log_message(log_file, "Initialization", f"Periodic thread started, is_alive: {periodic_thread.is_alive()}", run_uuid=run_uuid, stepcounter="Initialization_6", user=user_cache, script_start_time=script_start_time)
 
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        for event_id in event_ids:
-            log_message(log_file, "Processing", f"Submitting task for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"submit_{event_id}", user=user_cache, script_start_time=script_start_time)
-            future = executor.submit(process_event, event_id, log_file)
-            try:
-                result = future.result()  # Wait for the task to complete
-                with results_lock:
-                    log_message(log_file, "EventProcessing", f"Appending result for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}_append", user=user_cache, script_start_time=script_start_time)
-                    results.append(result)
-                    log_message(log_file, "EventProcessing", f"Appended result for EventID {event_id}, current results length: {len(results)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}_appended", user=user_cache, script_start_time=script_start_time)
-                event_counter += 1
-            except Exception as e:
-                log_message(log_file, "Error", f"Exception processing EventID {event_id}: {str(e)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}", user=user_cache, script_start_time=script_start_time)
-                with results_lock:
-                    error_result = {
-                        "EventID": event_id,
-                        "URL": BASE_URL.format(event_id) + "__co-list_cp.html",
-                        "IfExists": 0,
-                        "InvalidEventID": False,
-                        "IsDownloadable": 0,
-                        "DownloadLink": "",
-                        "StatusCode": "Error",
-                        "Title": ""
-                    }
-                    log_message(log_file, "Error", f"Appending error result for EventID {event_id}", run_uuid=run_uuid, stepcounter=f"event_{event_id}_append", user=user_cache, script_start_time=script_start_time)
-                    results.append(error_result)
-                    log_message(log_file, "Error", f"Appended error result for EventID {event_id}, current results length: {len(results)}", run_uuid=run_uuid, stepcounter=f"event_{event_id}_appended", user=user_cache, script_start_time=script_start_time)
-                event_counter += 1
-            time.sleep(TASK_SUBMISSION_DELAY)  # Delay between task submissions
-        log_message(log_file, "Processing", f"Processed {event_counter} events", run_uuid=run_uuid, stepcounter="Processing_1", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "Processing", f"Checking {total} events starting at {REQUESTS_PER_SECOND} requests/s (adaptive, {MIN_REQUESTS_PER_SECOND}-{MAX_REQUESTS_PER_SECOND}), {MAX_CONCURRENT_PER_HOST} concurrent requests per host, {MAX_EVENTS_IN_FLIGHT} events in flight", run_uuid=run_uuid, stepcounter="Processing_0", user=user_cache, script_start_time=script_start_time)
+    if workers:
+        # Shards are always made from the run's original list, so a resumed run finds the ones already done
+        merged = run_sharded_scan(manifest["shard_ids"], workers, log_file, resumed=resume_run)
+        if merged is None:
+            stop_event.set()
+            results.close()
+            http_client.close()
+            log_message(log_file, "Error", "Staged results could not be loaded; rerun with --resume to merge them", run_uuid=run_uuid, stepcounter="Processing_2", user=user_cache, script_start_time=script_start_time)
+            return
+        event_counter = merged + len(checked_ids)
+    else:
+        event_counter = asyncio.run(check_events(ids_to_check, log_file, rate_controller)) + len(checked_ids)
+    log_message(log_file, "Processing", f"Processed {event_counter} events", run_uuid=run_uuid, stepcounter="Processing_1", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "RateControl", f"Effective request rate at end of run: {rate_controller.summary()}", run_uuid=run_uuid, stepcounter="RateControl_1", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "HttpClient", f"Connection reuse: {http_client.summary()}", run_uuid=run_uuid, stepcounter="HttpClient_0", user=user_cache, script_start_time=script_start_time)
+    if page_cache is not None:
+        log_message(log_file, "PageCache", f"Page cache: {page_cache.summary()}", run_uuid=run_uuid, stepcounter="PageCache_0", user=user_cache, script_start_time=script_start_time)
+    http_client.close()
 
     # Log active threads after processing
     log_message(log_file, "Finalization", f"Active threads after processing: {threading.active_count()}", run_uuid=run_uuid, stepcounter="Finalization_0", user=user_cache, script_start_time=script_start_time)
@@ -290,21 +637,39 @@ def meetmax_url_check():
     log_message(log_file, "Finalization", f"Active threads after joining: {threading.active_count()}", run_uuid=run_uuid, stepcounter="Finalization_8", user=user_cache, script_start_time=script_start_time)
     log_message(log_file, "Finalization", f"Thread names: {[t.name for t in threading.enumerate()]}", run_uuid=run_uuid, stepcounter="Finalization_9", user=user_cache, script_start_time=script_start_time)
 
+    # Every result is on disk in the temporary JSON Lines file before the single sort and merge below
+    results.close()
+
+    # Record this run's results before building the snapshot from them
+    record_event_results(results, checked_at, log_file, run_uuid, user_cache, script_start_time)
+    snapshot = merge_snapshot(state, results)
+
     # Final save
-    log_message(log_file, "Finalization", f"Starting final save, results length: {len(results)}", run_uuid=run_uuid, stepcounter="Finalization_10", user=user_cache, script_start_time=script_start_time)
-    if results:
-        df = pd.DataFrame(results)
-        df = df.sort_values(by='EventID')
-        log_message(log_file, "FinalSave", f"Attempting to save {len(results)} rows to {final_csv_file}", run_uuid=run_uuid, stepcounter="FinalSave_0", user=user_cache, script_start_time=script_start_time)
+    log_message(log_file, "Finalization", f"Starting final save, results length: {len(results)}, snapshot length: {len(snapshot)}", run_uuid=run_uuid, stepcounter="Finalization_10", user=user_cache, script_start_time=script_start_time)
+    if snapshot:
+        df = pd.DataFrame(snapshot)
+        log_message(log_file, "FinalSave", f"Attempting to save {len(snapshot)} rows to {final_csv_file}", run_uuid=run_uuid, stepcounter="FinalSave_0", user=user_cache, script_start_time=script_start_time)
         try:
             df.to_csv(final_csv_file, index=False, quoting=csv.QUOTE_NONNUMERIC, quotechar='"')
             log_message(log_file, "FinalSave", f"CSV write completed for {final_csv_file}", run_uuid=run_uuid, stepcounter="FinalSave_1", user=user_cache, script_start_time=script_start_time)
             os.chmod(final_csv_file, 0o660)
-            log_message(log_file, "FinalSave", f"Permissions set for {final_csv_file}, wrote {len(results)} rows", run_uuid=run_uuid, stepcounter="FinalSave_2", user=user_cache, script_start_time=script_start_time)
+            log_message(log_file, "FinalSave", f"Permissions set for {final_csv_file}, wrote {len(snapshot)} rows", run_uuid=run_uuid, stepcounter="FinalSave_2", user=user_cache, script_start_time=script_start_time)
+            finished = True
         except (PermissionError, OSError) as e:
             log_message(log_file, "Error", f"Failed to save final results to {final_csv_file}: {str(e)}", run_uuid=run_uuid, stepcounter="FinalSave_3", user=user_cache, script_start_time=script_start_time)
+            finished = False
     else:
         log_message(log_file, "FinalSave", "No results to save", run_uuid=run_uuid, stepcounter="FinalSave_4", user=user_cache, script_start_time=script_start_time)
+        finished = True
+
+    # Mark the checkpoint finished; a failed final save leaves it for --resume to retry
+    if finished:
+        try:
+            write_manifest(manifest_file, {**manifest, "status": "complete"})
+        except OSError as e:
+            log_message(log_file, "Warning", f"Failed to mark checkpoint manifest {manifest_file} complete: {str(e)}", run_uuid=run_uuid, stepcounter="Checkpoint_2", user=user_cache, script_start_time=script_start_time)
+        if workers:
+            clear_staged_results(run_uuid, log_file, run_uuid, user_cache, script_start_time)
 
     # Log completion
     log_message(log_file, "Finalization", f"Completed: Processed {event_counter}/{total} URLs", run_uuid=run_uuid, stepcounter="Finalization_11", user=user_cache, script_start_time=script_start_time)
@@ -313,4 +678,19 @@ def meetmax_url_check():
     log_message(log_file, "Finalization", "Script execution completed", run_uuid=run_uuid, stepcounter="Finalization_14", user=user_cache, script_start_time=script_start_time)
 
 if __name__ == "__main__":
-    meetmax_url_check()
\ No newline at end of file
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] == "--worker":
+        meetmax_scan_worker(args[1])
+        sys.exit(0)
+    workers = SCAN_WORKERS
+    if "--workers" in args:
+        index = args.index("--workers")
+        workers = int(args[index + 1]) if index + 1 < len(args) and args[index + 1].isdigit() else -1
+        del args[index:index + 2]
+    if workers < 0 or any(arg not in ("--full", "--resume") for arg in args):
+        print("Usage: python meetmax_url_check.py [--full] [--resume] [--workers N]\n"
+              "       python meetmax_url_check.py --worker RUN_UUID\n"
+              "  --full checks every event ID instead of only those due; --resume continues the last run if it did not finish;\n"
+              "  --workers checks the event IDs in shards with N worker processes; --worker joins a sharded run from another host")
+        sys.exit(1)
+    meetmax_url_check(full_scan="--full" in args, resume="--resume" in args, workers=workers)
@@ -1,6 +1,7 @@
 import sys
 import os
 import psycopg2
+from pathlib import Path
 
 # Add root directory to sys.path
 sys.path.append(str(Path.home() / 'client_etl_workflow'))
@@ -8,11 +9,11 @@ import pandas as pd
 import requests
 import uuid
 import time
-from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from systemscripts.user_utils import get_username
 from systemscripts.log_utils import log_message
+from systemscripts.web_utils import AdaptiveRateController, HttpClient, fetch_url
 from systemscripts.directory_management import FILE_WATCHER_DIR, LOG_DIR, ensure_directory_exists
 from systemscripts.db_config import DB_PARAMS
 import grp
@@ -29,13 +30,28 @@ INITIAL_DELAY = 15.0
 # Initial delay (in seconds) before retrying a failed request. Uses exponential backoff
 # (e.g., 10s, 20s for retries). Higher values reduce server pressure during retries.
 
-TASK_SUBMISSION_DELAY = 5.0
-# Delay (in seconds) between submitting download tasks to the thread pool.
-# Higher values slow down the rate of new requests, reducing server load.
+REQUESTS_PER_SECOND = 0.2
+# Starting request rate to www.meetmax.com, shared by all download threads (0.2 matches the old fixed
+# 5-second gap between downloads). Healthy responses raise it; 429, 503 and timeouts cut it.
+
+MIN_REQUESTS_PER_SECOND = 0.02
+MAX_REQUESTS_PER_SECOND = 2.0
+# Bounds for the adaptive request rate. The maximum is the politeness ceiling; the minimum keeps a
+# long run of throttling from stalling the script entirely.
 
-MAX_WORKERS = 1
-# Number of concurrent download threads in ThreadPoolExecutor.
-# Lower values (e.g., 1) reduce simultaneous requests, making the script more conservative.
+MAX_WORKERS = 4
+# Number of concurrent download threads in ThreadPoolExecutor. The request rate above sets the pace;
+# this only bounds how many downloads can be open at once.
+
+DOWNLOAD_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "application/vnd.ms-excel,application/octet-stream",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive"
+}
+# Headers sent with every download. All threads share one HttpClient, so its pool keeps up to
+# MAX_WORKERS keep-alive connections to www.meetmax.com instead of a new TLS handshake per file.
 
 
 
@@ -63,8 +79,9 @@ def fetch_url_data(log_file, run_uuid, user, script_start_time):
                             mm.downloadlink,
                             ds.isactive,
                             mu.maxdatasetdate
-                        FROM public.tmeetmaxurlcheck mm
-                        JOIN dba.tdataset ds ON ds.datasetid = mm.datasetid
+                        FROM dba.tdataset ds
+                        JOIN dba.vdatasetrows r ON r.datasetid = ds.datasetid
+                        JOIN public.tmeetmaxurlcheck mm ON mm.datasetid = r.rowdatasetid
                         CROSS JOIN MaxURLCheckDate mu
                         WHERE ds.isactive = TRUE
                         AND mm.isdownloadable = '1'
@@ -110,47 +127,35 @@ def fetch_url_data(log_file, run_uuid, user, script_start_time):
                     run_uuid=run_uuid, stepcounter="DataFetch_6", user=user, script_start_time=script_start_time)
         return None
 
-def download_file(event_id, download_url, log_file, run_uuid, user, script_start_time, timestamp):
-    """Download an XLS file."""
+def download_file(event_id, download_url, log_file, run_uuid, user, script_start_time, timestamp, rate_controller, http_client):
+    """Download an XLS file over the shared http_client, pacing every attempt with the shared rate_controller."""
     result = {"EventID": event_id, "DownloadURL": download_url, "Status": "Failed"}
     log_message(log_file, "Download", f"Starting download for EventID {event_id} from {download_url}",
                 run_uuid=run_uuid, stepcounter=f"download_{event_id}", user=user, script_start_time=script_start_time)
     
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": USER_AGENT,
-        "Accept": "application/vnd.ms-excel,application/octet-stream",
-        "Accept-Encoding": "gzip, deflate",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "keep-alive"
-    })
-    
     output_file = FILE_WATCHER_DIR / f"{timestamp}_MeetMax_{event_id}.xls"
     
     try:
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = session.get(download_url, timeout=10)
-                response.raise_for_status()
-                with open(output_file, "wb") as f:
-                    f.write(response.content)
-                os.chmod(output_file, 0o660)
-                try:
-                    group_id = grp.getgrnam('etl_group').gr_gid
-                    os.chown(output_file, os.getuid(), group_id)
-                except KeyError:
-                    log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {output_file}",
-                                run_uuid=run_uuid, stepcounter=f"download_{event_id}_chown", user=user, script_start_time=script_start_time)
-                log_message(log_file, "Download", f"Downloaded EventID {event_id} to {output_file}",
-                            run_uuid=run_uuid, stepcounter=f"download_{event_id}", user=user, script_start_time=script_start_time)
-                result["Status"] = "Success"
-                return result
-            except requests.RequestException as e:
-                if attempt == MAX_RETRIES - 1:
-                    log_message(log_file, "Error", f"Failed EventID {event_id} after {MAX_RETRIES} attempts: {str(e)}",
-                                run_uuid=run_uuid, stepcounter=f"download_{event_id}", user=user, script_start_time=script_start_time)
-                    return result
-                time.sleep(INITIAL_DELAY * (2 ** attempt))
+        try:
+            response = fetch_url(http_client, download_url, retries=MAX_RETRIES, initial_delay=INITIAL_DELAY, log_file=log_file,
+                                 run_uuid=run_uuid, user=user, script_start_time=script_start_time, rate_controller=rate_controller)
+        except requests.RequestException as e:
+            log_message(log_file, "Error", f"Failed EventID {event_id} after {MAX_RETRIES} attempts: {str(e)}",
+                        run_uuid=run_uuid, stepcounter=f"download_{event_id}", user=user, script_start_time=script_start_time)
+            return result
+        with open(output_file, "wb") as f:
+            f.write(response.content)
+        os.chmod(output_file, 0o660)
+        try:
+            group_id = grp.getgrnam('etl_group').gr_gid
+            os.chown(output_file, os.getuid(), group_id)
+        except KeyError:
+            log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {output_file}",
+                        run_uuid=run_uuid, stepcounter=f"download_{event_id}_chown", user=user, script_start_time=script_start_time)
+        log_message(log_file, "Download", f"Downloaded EventID {event_id} to {output_file}",
+                    run_uuid=run_uuid, stepcounter=f"download_{event_id}", user=user, script_start_time=script_start_time)
+        result["Status"] = "Success"
+        return result
     except Exception as e:
         log_message(log_file, "Error", f"Unexpected error for EventID {event_id}: {str(e)}",
                     run_uuid=run_uuid, stepcounter=f"download_{event_id}", user=user, script_start_time=script_start_time)
@@ -189,19 +194,25 @@ def meetmax_url_download():
                 run_uuid=run_uuid, stepcounter="Filter_3", user=user, script_start_time=script_start_time)
     
     results = []
+    rate_controller = AdaptiveRateController(REQUESTS_PER_SECOND, MIN_REQUESTS_PER_SECOND, MAX_REQUESTS_PER_SECOND)
+    http_client = HttpClient(DOWNLOAD_HEADERS, pool_maxsize=MAX_WORKERS, pool_block=True)
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = []
         for _, row in downloadable.iterrows():
             event_id = row["EventID"]
             download_url = row["DownloadLink"]
-            futures.append(executor.submit(download_file, event_id, download_url, log_file, run_uuid, user, script_start_time, timestamp))
-            time.sleep(TASK_SUBMISSION_DELAY)
+            futures.append(executor.submit(download_file, event_id, download_url, log_file, run_uuid, user, script_start_time, timestamp, rate_controller, http_client))
         
         for future in futures:
             result = future.result()
             results.append(result)
-            log_message(log_file, "Processing", f"Completed EventID {result['EventID']}, Status: {result['Status']}",
+            log_message(log_file, "Processing", f"Completed EventID {result['EventID']}, Status: {result['Status']}, request rate {rate_controller.rate(result['DownloadURL']):.3f}/s",
                         run_uuid=run_uuid, stepcounter=f"result_{result['EventID']}", user=user, script_start_time=script_start_time)
+    log_message(log_file, "RateControl", f"Effective request rate at end of run: {rate_controller.summary()}",
+                run_uuid=run_uuid, stepcounter="RateControl_0", user=user, script_start_time=script_start_time)
+    log_message(log_file, "HttpClient", f"Connection reuse: {http_client.summary()}",
+                run_uuid=run_uuid, stepcounter="HttpClient_0", user=user, script_start_time=script_start_time)
+    http_client.close()
     
     # Save results
     if results:
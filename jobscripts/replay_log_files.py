@@ -0,0 +1,211 @@
+import sys
+import os
+import io
+import csv
+import glob
+import math
+import time
+import uuid
+from pathlib import Path
+from datetime import datetime
+
+# Add root directory to sys.path
+sys.path.append(str(Path.home() / 'client_etl_workflow'))
+import psycopg2
+from systemscripts.user_utils import get_username
+from systemscripts.log_utils import log_message, level_enabled, TLOGENTRY_NAME_LENGTH
+from systemscripts.directory_management import LOG_DIR, ensure_directory_exists
+from systemscripts.db_config import DB_PARAMS
+
+# Columns a log CSV written by log_message must have; other CSVs in the log directory are skipped
+REQUIRED_COLUMNS = {"log_id", "timestamp", "run_uuid", "process_type", "stepcounter", "user", "step_runtime", "total_runtime", "message"}
+
+# Rows buffered in memory before each COPY into the staging table
+COPY_BATCH_ROWS = 100000
+
+# Timestamp format log_message writes, and the largest sourcelogid dba.tlogentry can hold
+LOG_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+MAX_SOURCE_LOG_ID = 2**31 - 1
+
+def find_log_csvs(paths):
+    """Expand files and directories into a sorted list of CSV paths."""
+    csv_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            csv_paths.extend(glob.glob(os.path.join(path, "*.csv")))
+        elif os.path.isfile(path):
+            csv_paths.append(str(path))
+    return sorted(set(csv_paths))
+
+def clean_text(value, max_length=None):
+    """Text field without the NUL characters PostgreSQL cannot store, cut to max_length."""
+    value = (value or "").replace("\x00", "")
+    return value[:max_length] if max_length else value
+
+def parse_runtime(value):
+    """Runtime in seconds, None if empty; raises ValueError for anything that is not a finite number."""
+    if not (value or "").strip():
+        return None
+    runtime = float(value)
+    if not math.isfinite(runtime):
+        raise ValueError(f"runtime {value!r} is not finite")
+    return runtime
+
+def parse_log_row(row):
+    """Convert a log CSV row to a tlogreplay row. Raises ValueError if a field would be rejected by COPY."""
+    log_id = int(row["log_id"])
+    if not 0 <= log_id <= MAX_SOURCE_LOG_ID:
+        raise ValueError(f"log_id {log_id} is out of range")
+    run_uuid = clean_text(row["run_uuid"])
+    if len(run_uuid) > 36:
+        raise ValueError(f"run_uuid {run_uuid!r} is too long")
+    process_type = clean_text(row["process_type"], TLOGENTRY_NAME_LENGTH)
+    if not process_type:
+        raise ValueError("process_type is empty")
+    return (
+        run_uuid,
+        log_id,
+        datetime.strptime(row["timestamp"] or "", LOG_TIMESTAMP_FORMAT).isoformat(sep=" "),
+        process_type,
+        clean_text(row["stepcounter"], TLOGENTRY_NAME_LENGTH),
+        clean_text(row["user"], TLOGENTRY_NAME_LENGTH),
+        parse_runtime(row["step_runtime"]),
+        parse_runtime(row["total_runtime"]),
+        clean_text(row["message"]),
+        clean_text(row.get("level"), 10)
+    )
+
+def read_log_rows(csv_path, rejected=None):
+    """Yield tlogentry rows from a log CSV. Returns nothing for CSVs that are not log_message output.
+
+    Rows whose level is below the current db minimum were never meant for dba.tlogentry and are skipped.
+    Rows with a field COPY would reject (a malformed timestamp, runtime or log_id) are skipped and counted
+    in rejected, {csv_path: count}, so one corrupt row cannot fail the whole replay.
+    """
+    with open(csv_path, newline="") as f:
+        reader = csv.DictReader(f)
+        if not REQUIRED_COLUMNS.issubset(reader.fieldnames or []):
+            return
+        for row in reader:
+            if not row["log_id"] or not row["run_uuid"]:
+                continue
+            if not level_enabled(row["process_type"], row.get("level"), "db"):
+                continue
+            try:
+                yield parse_log_row(row)
+            except (ValueError, TypeError):
+                if rejected is not None:
+                    rejected[csv_path] = rejected.get(csv_path, 0) + 1
+
+def copy_rows(cur, rows):
+    """COPY a batch of rows into the tlogreplay staging table."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert("""
+        COPY tlogreplay (run_uuid, sourcelogid, timestamp, processtype, stepcounter, username, stepruntime, totalruntime, message, loglevel)
+        FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (message))
+    """, buffer)
+
+def replay_log_files(paths):
+    """Load log CSV rows that are missing from dba.tlogentry, matched on run_uuid and log_id."""
+    script_start_time = time.time()
+    run_uuid = str(uuid.uuid4())
+    user = get_username()
+    timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    log_file = LOG_DIR / f"replay_log_files_{timestamp}"
+
+    ensure_directory_exists(LOG_DIR)
+    log_message(log_file, "Initialization", f"Script started at {timestamp} for {', '.join(str(p) for p in paths)}",
+                run_uuid=run_uuid, stepcounter="Initialization_0", user=user, script_start_time=script_start_time)
+
+    # This run's own log is written to the database directly
+    own_csv = f"{log_file}.csv"
+    csv_paths = [p for p in find_log_csvs(paths) if os.path.abspath(p) != os.path.abspath(own_csv)]
+    if not csv_paths:
+        log_message(log_file, "Warning", "No log CSVs found to replay",
+                    run_uuid=run_uuid, stepcounter="Replay_0", user=user, script_start_time=script_start_time)
+        return True
+
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE tlogreplay (
+                          run_uuid VARCHAR(36) NOT NULL
+                        , sourcelogid INTEGER NOT NULL
+                        , timestamp TIMESTAMP NOT NULL
+                        , processtype VARCHAR(50) NOT NULL
+                        , stepcounter VARCHAR(50)
+                        , username VARCHAR(50)
+                        , stepruntime FLOAT
+                        , totalruntime FLOAT
+                        , message TEXT NOT NULL
+                        , loglevel VARCHAR(10)
+                    ) ON COMMIT DROP
+                """)
+
+                # Stream every file into the staging table in one pass
+                scanned_rows = 0
+                skipped_files = 0
+                rejected = {}
+                batch = []
+                for csv_path in csv_paths:
+                    file_rows = 0
+                    try:
+                        for row in read_log_rows(csv_path, rejected):
+                            batch.append(row)
+                            file_rows += 1
+                            if len(batch) >= COPY_BATCH_ROWS:
+                                copy_rows(cur, batch)
+                                batch = []
+                    except (OSError, csv.Error, UnicodeDecodeError) as e:
+                        skipped_files += 1
+                        log_message(log_file, "Warning", f"Skipped unreadable log CSV {csv_path}: {str(e)}",
+                                    run_uuid=run_uuid, stepcounter="Replay_Skip", user=user, script_start_time=script_start_time)
+                    scanned_rows += file_rows
+                    if rejected.get(csv_path):
+                        log_message(log_file, "Warning", f"Skipped {rejected[csv_path]} malformed rows in log CSV {csv_path}",
+                                    run_uuid=run_uuid, stepcounter="Replay_Reject", user=user, script_start_time=script_start_time)
+                if batch:
+                    copy_rows(cur, batch)
+                cur.execute("ANALYZE tlogreplay")
+
+                # Entries logged before sourcelogid existed are matched on timestamp and message instead
+                cur.execute("""
+                    INSERT INTO dba.tlogentry (
+                        run_uuid, timestamp, processtype, stepcounter,
+                        username, stepruntime, totalruntime, message, loglevel, sourcelogid
+                    )
+                    SELECT DISTINCT ON (r.run_uuid, r.sourcelogid)
+                        r.run_uuid, r.timestamp, r.processtype, NULLIF(r.stepcounter, ''),
+                        NULLIF(r.username, ''), r.stepruntime, r.totalruntime, r.message, NULLIF(r.loglevel, ''), r.sourcelogid
+                    FROM tlogreplay r
+                    WHERE NOT EXISTS (
+                        SELECT 1
+                        FROM dba.tlogentry e
+                        WHERE e.run_uuid = r.run_uuid
+                          AND (e.sourcelogid = r.sourcelogid
+                               OR (e.sourcelogid IS NULL AND e.timestamp = r.timestamp AND e.message = r.message))
+                    )
+                    ORDER BY r.run_uuid, r.sourcelogid
+                """)
+                inserted_rows = cur.rowcount
+                conn.commit()
+    except (psycopg2.Error, OSError) as e:
+        log_message(log_file, "Error", f"Failed to replay log CSVs: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Replay_1", user=user, script_start_time=script_start_time)
+        return False
+
+    log_message(log_file, "Replay", f"Scanned {scanned_rows} rows in {len(csv_paths) - skipped_files} log CSVs, skipped {sum(rejected.values())} malformed rows and loaded {inserted_rows} missing rows into dba.tlogentry",
+                run_uuid=run_uuid, stepcounter="Replay_2", user=user, script_start_time=script_start_time)
+    log_message(log_file, "Finalization", f"Completed replay in {time.time() - script_start_time:.3f}s",
+                run_uuid=run_uuid, stepcounter="Finalization_0", user=user, script_start_time=script_start_time)
+    return True
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print("Usage: python replay_log_files.py [log_csv_or_directory ...]  (defaults to the log directory)")
+        sys.exit(1)
+    paths = sys.argv[1:] or [str(LOG_DIR)]
+    sys.exit(0 if replay_log_files(paths) else 1)
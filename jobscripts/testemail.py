@@ -71,8 +71,9 @@ LatestURLCheckDataset AS (
         ,m.statuscode
         ,m.title
         ,mu.maxdatasetdate
-    FROM public.tmeetmaxurlcheck m
-    JOIN dba.tdataset t ON t.datasetid = m.datasetid
+    FROM dba.tdataset t
+    JOIN dba.vdatasetrows r ON r.datasetid = t.datasetid
+    JOIN public.tmeetmaxurlcheck m ON m.datasetid = r.rowdatasetid
     CROSS JOIN MaxURLCheckDate mu
     WHERE t.datasetdate = mu.maxdatasetdate
     AND t.isactive = TRUE
@@ -92,7 +93,8 @@ select
     ,min(ed.datasetdate) as mindate
     ,max(ed.datasetdate) as maxdate
 from EventsDataSets ed
-join public.tmeetmaxevent t on t.datasetid  = ed.datasetid
+join dba.vdatasetrows r on r.datasetid = ed.datasetid
+join public.tmeetmaxevent t on t.datasetid = r.rowdatasetid
 group by
 	ed.eventid
 		,UPPER(COALESCE(
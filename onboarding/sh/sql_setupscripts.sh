@@ -20,15 +20,20 @@ DB_PORT="5432"
 # List of SQL scripts in execution order
 SQL_SCRIPTS=(
     "setup_dba_maintenance.sql"
+    "partition_tlogentry.sql"        # Monthly partitions for tlogentry
     "dataset_setup.sql"
     "maintenance_procedures.sql"
     "log_cleanup.sql"
+    "step_latency_rollup.sql"        # Daily step latency rollup of tlogentry
+    "partition_maintenance.sql"      # Retention for partitioned import tables
     "table_index_monitoring.sql"
     "monitor_long_running_queries.sql"
     "create_importconfig_table.sql"
     "create_treportmanager.sql"      # Table for report manager
     #"create_tscheduler.sql"          # Table for scheduler
     "create_f_get_event_changes.sql" # Function for event changes
+    "meetmax_event_state.sql"        # Per-event state for incremental MeetMax URL checks
+    "meetmax_scan_shards.sql"        # Shards, staged results and shared request budget for sharded MeetMax URL checks
     "create_tscheduler_procedures.sql" # Procedures for scheduler
 )
 
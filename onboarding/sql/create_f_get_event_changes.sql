@@ -52,8 +52,9 @@ LatestURLCheckDataset AS (
         m.statuscode,
         m.title,
         mu.maxdatasetdate
-    FROM public.tmeetmaxurlcheck m
-    JOIN dba.tdataset t ON t.datasetid = m.datasetid
+    FROM dba.tdataset t
+    JOIN dba.vdatasetrows r ON r.datasetid = t.datasetid
+    JOIN public.tmeetmaxurlcheck m ON m.datasetid = r.rowdatasetid
     CROSS JOIN MaxURLCheckDate mu
     WHERE t.datasetdate = mu.maxdatasetdate
     AND t.isactive = TRUE
@@ -73,7 +74,8 @@ EventsData AS (
         MIN(ed.datasetdate) AS mindate,
         MAX(ed.datasetdate) AS maxdate
     FROM EventsDataSets ed
-    JOIN public.tmeetmaxevent t ON t.datasetid = ed.datasetid
+    JOIN dba.vdatasetrows r ON r.datasetid = ed.datasetid
+    JOIN public.tmeetmaxevent t ON t.datasetid = r.rowdatasetid
     GROUP BY
         ed.eventid,
         UPPER(COALESCE(
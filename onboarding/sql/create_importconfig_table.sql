@@ -74,6 +74,22 @@ COMMENT ON COLUMN dba."timportconfig".is_active IS 'Flag indicating whether the
 COMMENT ON COLUMN dba."timportconfig".created_at IS 'Timestamp when the configuration was created.';
 COMMENT ON COLUMN dba."timportconfig".last_modified_at IS 'Timestamp when the configuration was last modified.';
 
+-- Loader settings added after the initial rollout; ADD COLUMN IF NOT EXISTS keeps existing installs in sync
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS load_method VARCHAR(10) NOT NULL DEFAULT 'COPY' CHECK (load_method IN ('COPY', 'INSERT'));
+COMMENT ON COLUMN dba."timportconfig".load_method IS 'How rows are written to target_table: COPY streams the data with COPY FROM STDIN (default), INSERT falls back to row-by-row executemany.';
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS chunk_size INT CHECK (chunk_size IS NULL OR chunk_size > 0);
+COMMENT ON COLUMN dba."timportconfig".chunk_size IS 'Rows per chunk for streaming imports. NULL reads the whole file into memory at once; a value bounds memory by reading, truncating and loading the source that many rows at a time.';
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS max_workers INT NOT NULL DEFAULT 1 CHECK (max_workers > 0);
+COMMENT ON COLUMN dba."timportconfig".max_workers IS 'Number of matched files processed concurrently in one run. 1 keeps the sequential behaviour; table creation and column additions are serialized across workers.';
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS skip_unchanged BOOLEAN NOT NULL DEFAULT FALSE;
+COMMENT ON COLUMN dba."timportconfig".skip_unchanged IS 'When TRUE, a file whose SHA-256 matches the latest active dataset for the same label is recorded as an Unchanged dataset pointing at that data instead of being reloaded (see dba.timportfingerprint and dba.vdatasetrows).';
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS staged_load BOOLEAN NOT NULL DEFAULT FALSE;
+COMMENT ON COLUMN dba."timportconfig".staged_load IS 'When TRUE, rows are first written to an UNLOGGED per-dataset staging table, truncated and cast in SQL, and moved into target_table with one INSERT ... SELECT in the same transaction as the dataset status update.';
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS infer_types BOOLEAN NOT NULL DEFAULT FALSE;
+COMMENT ON COLUMN dba."timportconfig".infer_types IS 'When TRUE and importstrategyid = 1, columns created by the import are typed BIGINT, NUMERIC, DATE, TIMESTAMP or BOOLEAN when every value fits, falling back to VARCHAR; typed columns are converted in bulk during the load.';
+ALTER TABLE dba."timportconfig" ADD COLUMN IF NOT EXISTS partition_by VARCHAR(20) CHECK (partition_by IS NULL OR partition_by IN ('datasetid', 'datasetdate'));
+COMMENT ON COLUMN dba."timportconfig".partition_by IS 'When set and importstrategyid = 1, target_table is created RANGE partitioned by datasetid (fixed-width ranges) or datasetdate (monthly, adds a datasetdate column); partitions are created on demand and expired with dba.pdropexpiredpartitions.';
+
 -- Creating a stored procedure for inserting a new timportconfig row
 CREATE OR REPLACE PROCEDURE dba.pimportconfigi(
     p_config_name VARCHAR,
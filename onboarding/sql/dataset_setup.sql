@@ -530,4 +530,137 @@ BEGIN
         RAISE NOTICE 'Line 391: Inserted data into tdatasettype and synchronized sequence';
     END IF;
     RAISE NOTICE 'Line 393: Completed tdatasettype insert block';
-END $OUTER$;
\ No newline at end of file
+END $OUTER$;
+
+-- Line 396: Add the 'Unchanged' status used when an import matches the previous file byte for byte
+DO $OUTER$
+BEGIN
+    RAISE NOTICE 'Line 396: Starting insert of Unchanged status into tdatastatus';
+    INSERT INTO dba.tdatastatus (statusname, description)
+    VALUES ('Unchanged', 'Source file was identical to the previous load; rows are read from the source dataset')
+    ON CONFLICT (statusname) DO NOTHING;
+    RAISE NOTICE 'Line 401: Completed Unchanged status insert block';
+END $OUTER$;
+
+-- Line 404: Create timportfingerprint table if it doesn't exist
+DO $OUTER$
+BEGIN
+    RAISE NOTICE 'Line 404: Starting creation of timportfingerprint table';
+    IF NOT EXISTS (SELECT 1 FROM pg_tables WHERE schemaname = 'dba' AND tablename = 'timportfingerprint') THEN
+        CREATE TABLE dba.timportfingerprint (
+            importfingerprintid SERIAL PRIMARY KEY,
+            config_id INT NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            contenthash CHAR(64) NOT NULL,
+            filesize BIGINT NOT NULL,
+            datasetid INT NOT NULL UNIQUE REFERENCES dba.tdataset (datasetid),
+            sourcedatasetid INT NOT NULL REFERENCES dba.tdataset (datasetid),
+            createddate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            createdby VARCHAR(50) NOT NULL DEFAULT CURRENT_USER
+        );
+
+        COMMENT ON TABLE dba.timportfingerprint IS 'Content-hash ledger of imported files, used by generic_import to skip reloading byte-identical files.';
+        COMMENT ON COLUMN dba.timportfingerprint.importfingerprintid IS 'Primary key for the ledger entry.';
+        COMMENT ON COLUMN dba.timportfingerprint.config_id IS 'timportconfig.config_id that imported the file.';
+        COMMENT ON COLUMN dba.timportfingerprint.filename IS 'Name of the source file.';
+        COMMENT ON COLUMN dba.timportfingerprint.contenthash IS 'Hex SHA-256 of the source file contents.';
+        COMMENT ON COLUMN dba.timportfingerprint.filesize IS 'Size of the source file in bytes.';
+        COMMENT ON COLUMN dba.timportfingerprint.datasetid IS 'Dataset created for this file.';
+        COMMENT ON COLUMN dba.timportfingerprint.sourcedatasetid IS 'Dataset whose rows hold the file contents: datasetid itself when the file was loaded, or the earlier dataset when it was Unchanged.';
+        COMMENT ON COLUMN dba.timportfingerprint.createddate IS 'Timestamp when the record was created.';
+        COMMENT ON COLUMN dba.timportfingerprint.createdby IS 'User who created the record.';
+        CREATE INDEX idx_timportfingerprint_contenthash ON dba.timportfingerprint (config_id, contenthash);
+        RAISE NOTICE 'Line 431: timportfingerprint table, comments and index created';
+    END IF;
+    RAISE NOTICE 'Line 433: Completed timportfingerprint block';
+END $OUTER$;
+
+-- Grant permissions on timportfingerprint
+DO $OUTER$
+BEGIN
+    RAISE NOTICE 'Line 437: Granting permissions on timportfingerprint';
+    GRANT SELECT, INSERT ON dba.timportfingerprint TO etl_user;
+    GRANT ALL ON dba.timportfingerprint TO yostfundsadmin;
+    GRANT USAGE, SELECT ON SEQUENCE dba.timportfingerprint_importfingerprintid_seq TO etl_user;
+    RAISE NOTICE 'Line 441: Permissions granted on timportfingerprint';
+END $OUTER$;
+
+-- Line 444: Create vdatasetrows view mapping each dataset to the dataset that holds its rows
+CREATE OR REPLACE VIEW dba.vdatasetrows AS
+SELECT
+    d.datasetid,
+    COALESCE(f.sourcedatasetid, d.datasetid) AS rowdatasetid
+FROM dba.tdataset d
+LEFT JOIN dba.timportfingerprint f ON f.datasetid = d.datasetid;
+
+COMMENT ON VIEW dba.vdatasetrows IS 'Maps datasetid to the datasetid whose rows should be read; differs only for datasets recorded as Unchanged. Join target tables on rowdatasetid.';
+GRANT SELECT ON dba.vdatasetrows TO etl_user;
+GRANT ALL ON dba.vdatasetrows TO yostfundsadmin;
+
+-- Line 456: Create timportstagetiming table if it doesn't exist
+DO $OUTER$
+BEGIN
+    RAISE NOTICE 'Line 456: Starting creation of timportstagetiming table';
+    IF NOT EXISTS (SELECT 1 FROM pg_tables WHERE schemaname = 'dba' AND tablename = 'timportstagetiming') THEN
+        CREATE TABLE dba.timportstagetiming (
+            importstagetimingid SERIAL PRIMARY KEY,
+            run_uuid VARCHAR(36) NOT NULL,
+            config_id INT NOT NULL,
+            recordtype VARCHAR(10) NOT NULL CHECK (recordtype IN ('file', 'run')),
+            filename VARCHAR(255),
+            datasetid INT REFERENCES dba.tdataset (datasetid),
+            success BOOLEAN,
+            filecount INT,
+            discoveryseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            validationseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            conversionseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            parseseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            schemasyncseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            loadseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            archiveseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            totalseconds NUMERIC(12, 3) NOT NULL DEFAULT 0,
+            rowsloaded BIGINT NOT NULL DEFAULT 0,
+            bytesparsed BIGINT NOT NULL DEFAULT 0,
+            stagedetails JSONB,
+            createddate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            createdby VARCHAR(50) NOT NULL DEFAULT CURRENT_USER
+        );
+
+        COMMENT ON TABLE dba.timportstagetiming IS 'Per-stage timings written by generic_import: one file record per imported file and one run record per run.';
+        COMMENT ON COLUMN dba.timportstagetiming.importstagetimingid IS 'Primary key for the timing record.';
+        COMMENT ON COLUMN dba.timportstagetiming.run_uuid IS 'run_uuid of the generic_import run, matching dba.tlogentry.';
+        COMMENT ON COLUMN dba.timportstagetiming.config_id IS 'timportconfig.config_id that was run.';
+        COMMENT ON COLUMN dba.timportstagetiming.recordtype IS 'file for a single imported file, run for the totals of the whole run.';
+        COMMENT ON COLUMN dba.timportstagetiming.filename IS 'Source file name; NULL on run records.';
+        COMMENT ON COLUMN dba.timportstagetiming.datasetid IS 'Dataset created for the file, if it got that far; NULL on run records.';
+        COMMENT ON COLUMN dba.timportstagetiming.success IS 'Whether the file, or every file of the run, imported successfully.';
+        COMMENT ON COLUMN dba.timportstagetiming.filecount IS 'Number of files processed; run records only.';
+        COMMENT ON COLUMN dba.timportstagetiming.discoveryseconds IS 'Filename parsing, hashing and dataset registration; run records add the directory scan.';
+        COMMENT ON COLUMN dba.timportstagetiming.validationseconds IS 'Invalid event checks and column length validation.';
+        COMMENT ON COLUMN dba.timportstagetiming.conversionseconds IS 'Parsing XLS/XLSX workbooks and writing the optional debug CSV.';
+        COMMENT ON COLUMN dba.timportstagetiming.parseseconds IS 'Reading the CSV, or its first chunk when streaming.';
+        COMMENT ON COLUMN dba.timportstagetiming.schemasyncseconds IS 'Creating the target table, adding columns and creating partitions.';
+        COMMENT ON COLUMN dba.timportstagetiming.loadseconds IS 'Writing rows to the target or staging table, including reading further chunks when streaming.';
+        COMMENT ON COLUMN dba.timportstagetiming.archiveseconds IS 'Moving the file to the archive directory, including the Empty status update for empty files.';
+        COMMENT ON COLUMN dba.timportstagetiming.totalseconds IS 'Elapsed time for the file, or wall time for the run. With max_workers above 1 the stage seconds of a run record can exceed it.';
+        COMMENT ON COLUMN dba.timportstagetiming.rowsloaded IS 'Rows written to the target table.';
+        COMMENT ON COLUMN dba.timportstagetiming.bytesparsed IS 'Bytes of source files parsed as CSV or workbooks.';
+        COMMENT ON COLUMN dba.timportstagetiming.stagedetails IS 'Seconds, rows and bytes for every stage as JSON.';
+        COMMENT ON COLUMN dba.timportstagetiming.createddate IS 'Timestamp when the record was created.';
+        COMMENT ON COLUMN dba.timportstagetiming.createdby IS 'User who created the record.';
+        CREATE INDEX idx_timportstagetiming_config ON dba.timportstagetiming (config_id, recordtype, createddate);
+        CREATE INDEX idx_timportstagetiming_run ON dba.timportstagetiming (run_uuid);
+        RAISE NOTICE 'Line 511: timportstagetiming table, comments and indexes created';
+    END IF;
+    RAISE NOTICE 'Line 513: Completed timportstagetiming block';
+END $OUTER$;
+
+-- Grant permissions on timportstagetiming
+DO $OUTER$
+BEGIN
+    RAISE NOTICE 'Line 517: Granting permissions on timportstagetiming';
+    GRANT SELECT, INSERT ON dba.timportstagetiming TO etl_user;
+    GRANT ALL ON dba.timportstagetiming TO yostfundsadmin;
+    GRANT USAGE, SELECT ON SEQUENCE dba.timportstagetiming_importstagetimingid_seq TO etl_user;
+    RAISE NOTICE 'Line 521: Permissions granted on timportstagetiming';
+END $OUTER$;
@@ -5,6 +5,8 @@ AS $$
 DECLARE
     starttime TIMESTAMP := CURRENT_TIMESTAMP;
     deletedrows INTEGER;
+    cutoffdate DATE := CURRENT_DATE - thresholddays;
+    partitionrec RECORD;
 BEGIN
     -- Purge tddllogs
     DELETE FROM dba.tddllogs
@@ -27,9 +29,42 @@ BEGIN
         ,format('Deleted %s rows older than %s days', deletedrows, thresholddays)
     );
     
-    -- Purge tlogentry
-    DELETE FROM dba.tlogentry
-    WHERE timestamp < CURRENT_DATE - INTERVAL '1 day' * thresholddays;
+    -- Purge tlogentry by dropping monthly partitions that end on or before the cutoff
+    CALL dba.pcreatelogpartitions(CURRENT_DATE, 3);
+    FOR partitionrec IN (
+        SELECT c.relname AS partitionname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = 'dba.tlogentry'::regclass
+          AND c.relname ~ '^tlogentry_p[0-9]{6}$'
+          AND (to_date(substring(c.relname FROM 12), 'YYYYMM') + INTERVAL '1 month')::DATE <= cutoffdate
+        ORDER BY c.relname
+    ) LOOP
+        EXECUTE format('SELECT COUNT(*) FROM dba.%I', partitionrec.partitionname) INTO deletedrows;
+        EXECUTE format('ALTER TABLE dba.tlogentry DETACH PARTITION dba.%I', partitionrec.partitionname);
+        EXECUTE format('DROP TABLE dba.%I', partitionrec.partitionname);
+        INSERT INTO dba.tmaintenancelog (
+            maintenancetime
+            ,operation
+            ,tablename
+            ,username
+            ,durationseconds
+            ,details
+        )
+        VALUES (
+            starttime
+            ,'DROP PARTITION'
+            ,'tLogEntry'
+            ,CURRENT_USER
+            ,EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - starttime))
+            ,format('Dropped partition %s with %s rows older than %s days', partitionrec.partitionname, deletedrows, thresholddays)
+        );
+    END LOOP;
+
+    -- Rows outside the monthly partitions sit in the default partition and are still deleted
+    DELETE FROM dba.tlogentry_default
+    WHERE timestamp < cutoffdate;
     GET DIAGNOSTICS deletedrows = ROW_COUNT;
     INSERT INTO dba.tmaintenancelog (
         maintenancetime
@@ -45,7 +80,7 @@ BEGIN
         ,'tLogEntry'
         ,CURRENT_USER
         ,EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - starttime))
-        ,format('Deleted %s rows older than %s days', deletedrows, thresholddays)
+        ,format('Deleted %s rows older than %s days from tlogentry_default', deletedrows, thresholddays)
     );
     
     -- Purge tmaintenancelog
@@ -89,8 +124,6 @@ BEGIN
         ,EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - starttime))
         ,format('Deleted %s rows older than %s days', deletedrows, thresholddays)
     );
-    
-    COMMIT;
 EXCEPTION
     WHEN OTHERS THEN
         INSERT INTO dba.tmaintenancelog (
@@ -109,7 +142,6 @@ EXCEPTION
             ,NULL
             ,'Error purging logs: ' || SQLERRM
         );
-        COMMIT;
         RAISE NOTICE 'Log purge failed: %', SQLERRM;
 END;
 $$;
@@ -0,0 +1,85 @@
+-- meetmax_event_state.sql
+-- Description: Per-event state for incremental MeetMax URL checks. meetmax_url_check.py records the last result for
+-- every event ID it probes, picks the IDs to probe on the next run from it, and fills in unprobed IDs from it when
+-- writing the full MeetMaxURLCheck snapshot CSV. tmeetmaxfrontier caches the highest valid event ID between runs.
+
+-- Create tmeetmaxeventstate table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tmeetmaxeventstate'
+    ) THEN
+        CREATE TABLE dba.tmeetmaxeventstate (
+              eventid INTEGER PRIMARY KEY
+            , url TEXT
+            , ifexists SMALLINT NOT NULL DEFAULT 0
+            , invalideventid BOOLEAN NOT NULL DEFAULT FALSE
+            , isdownloadable SMALLINT NOT NULL DEFAULT 0
+            , downloadlink TEXT
+            , statuscode VARCHAR(10)
+            , title TEXT
+            , firstchecked TIMESTAMP NOT NULL
+            , lastchecked TIMESTAMP NOT NULL
+            , lastsuccess TIMESTAMP
+            , lastvalid TIMESTAMP
+            , lastchanged TIMESTAMP
+            , changecount INTEGER NOT NULL DEFAULT 0
+            , failurecount INTEGER NOT NULL DEFAULT 0
+        );
+
+        COMMENT ON TABLE dba.tmeetmaxeventstate IS 'Last known MeetMax URL check result per event ID, used by meetmax_url_check.py to schedule incremental scans.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.eventid IS 'MeetMax event ID.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.url IS 'Company list page the last successful check used (public or private).';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.ifexists IS '1 if the last successful check found the event, 0 otherwise.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.invalideventid IS 'True if the last successful check showed the Invalid Event ID alert.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.isdownloadable IS '1 if the last successful check found a company list download.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.downloadlink IS 'Company list download URL from the last successful check.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.statuscode IS 'HTTP status of the last successful check, or Failed/Error if no check has succeeded yet.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.title IS 'Event title from the last successful check.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.firstchecked IS 'Timestamp of the first check of the event ID.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.lastchecked IS 'Timestamp of the last check, successful or not.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.lastsuccess IS 'Timestamp of the last check that returned a page; NULL if none has.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.lastvalid IS 'Timestamp of the last check that found the event (last seen).';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.lastchanged IS 'Timestamp of the last successful check whose result differed from the one before.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.changecount IS 'Number of successful checks whose result differed from the one before.';
+        COMMENT ON COLUMN dba.tmeetmaxeventstate.failurecount IS 'Consecutive failed checks since the last successful one.';
+
+        CREATE INDEX idx_tmeetmaxeventstate_lastchecked ON dba.tmeetmaxeventstate (lastchecked);
+
+        GRANT SELECT, INSERT, UPDATE ON TABLE dba.tmeetmaxeventstate TO etl_user;
+        GRANT ALL ON TABLE dba.tmeetmaxeventstate TO yostfundsadmin;
+    END IF;
+END $$;
+
+-- Create tmeetmaxfrontier table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tmeetmaxfrontier'
+    ) THEN
+        CREATE TABLE dba.tmeetmaxfrontier (
+              frontierid SERIAL PRIMARY KEY
+            , highestvalidid INTEGER NOT NULL
+            , probecount INTEGER NOT NULL
+            , run_uuid VARCHAR(36)
+            , discoveredat TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+
+        COMMENT ON TABLE dba.tmeetmaxfrontier IS 'Highest valid MeetMax event ID found by each frontier discovery in meetmax_url_check.py; the latest row is reused by later runs.';
+        COMMENT ON COLUMN dba.tmeetmaxfrontier.frontierid IS 'Unique identifier for the discovery.';
+        COMMENT ON COLUMN dba.tmeetmaxfrontier.highestvalidid IS 'Highest event ID found to exist.';
+        COMMENT ON COLUMN dba.tmeetmaxfrontier.probecount IS 'Event IDs checked to find it.';
+        COMMENT ON COLUMN dba.tmeetmaxfrontier.run_uuid IS 'run_uuid of the meetmax_url_check run that did the discovery.';
+        COMMENT ON COLUMN dba.tmeetmaxfrontier.discoveredat IS 'Timestamp of the discovery.';
+
+        CREATE INDEX idx_tmeetmaxfrontier_discoveredat ON dba.tmeetmaxfrontier (discoveredat);
+
+        GRANT SELECT, INSERT ON TABLE dba.tmeetmaxfrontier TO etl_user;
+        GRANT USAGE, SELECT ON SEQUENCE dba.tmeetmaxfrontier_frontierid_seq TO etl_user;
+        GRANT ALL ON TABLE dba.tmeetmaxfrontier TO yostfundsadmin;
+    END IF;
+END $$;
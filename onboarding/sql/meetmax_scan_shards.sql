@@ -0,0 +1,115 @@
+-- meetmax_scan_shards.sql
+-- Description: Work table, results staging table and shared request budget for sharded MeetMax URL checks.
+-- meetmax_url_check.py --workers splits a run's event IDs into shards in tmeetmaxscanshard; worker processes on this
+-- or other hosts claim them with FOR UPDATE SKIP LOCKED, stage their results in tmeetmaxscanresult, and draw every
+-- request from the token bucket in tratebudget so that adding workers never raises the request rate to the site.
+
+-- Create tmeetmaxscanshard table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tmeetmaxscanshard'
+    ) THEN
+        CREATE TABLE dba.tmeetmaxscanshard (
+              run_uuid VARCHAR(36) NOT NULL
+            , shardid INTEGER NOT NULL
+            , eventids INTEGER[] NOT NULL
+            , ratelimit DOUBLE PRECISION NOT NULL
+            , processes INTEGER NOT NULL
+            , status VARCHAR(10) NOT NULL DEFAULT 'pending'
+            , claimedby VARCHAR(255)
+            , claimedat TIMESTAMP
+            , completedat TIMESTAMP
+            , resultcount INTEGER
+            , createdat TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            , PRIMARY KEY (run_uuid, shardid)
+        );
+
+        COMMENT ON TABLE dba.tmeetmaxscanshard IS 'Shards of event IDs for sharded meetmax_url_check.py runs, claimed by worker processes with FOR UPDATE SKIP LOCKED.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.run_uuid IS 'run_uuid of the meetmax_url_check run the shard belongs to.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.shardid IS 'Shard number within the run.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.eventids IS 'Event IDs to check in the shard.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.ratelimit IS 'Requests per second all workers of the run may make together; split between them while dba.tratebudget cannot be reached.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.processes IS 'Processes the run starts, itself included; the rate limit is split by this or the number of distinct claimers, whichever is larger.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.status IS 'pending, claimed or done. A claimed shard whose lease has expired is claimed again. The run deletes its shards once their results are in its CSV.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.claimedby IS 'Host and process ID of the worker that last claimed the shard.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.claimedat IS 'Timestamp the claim was made or last renewed by its worker, the start of the lease.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.completedat IS 'Timestamp the shard results were staged.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.resultcount IS 'Number of results staged for the shard.';
+        COMMENT ON COLUMN dba.tmeetmaxscanshard.createdat IS 'Timestamp the shard was created.';
+
+        CREATE INDEX idx_tmeetmaxscanshard_status ON dba.tmeetmaxscanshard (run_uuid, status);
+
+        GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE dba.tmeetmaxscanshard TO etl_user;
+        GRANT ALL ON TABLE dba.tmeetmaxscanshard TO yostfundsadmin;
+    END IF;
+END $$;
+
+-- Create tmeetmaxscanresult table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tmeetmaxscanresult'
+    ) THEN
+        CREATE TABLE dba.tmeetmaxscanresult (
+              run_uuid VARCHAR(36) NOT NULL
+            , eventid INTEGER NOT NULL
+            , shardid INTEGER NOT NULL
+            , url TEXT
+            , ifexists SMALLINT NOT NULL
+            , invalideventid BOOLEAN NOT NULL
+            , isdownloadable SMALLINT NOT NULL
+            , downloadlink TEXT
+            , statuscode VARCHAR(10)
+            , title TEXT
+            , PRIMARY KEY (run_uuid, eventid)
+        );
+
+        COMMENT ON TABLE dba.tmeetmaxscanresult IS 'Results staged by sharded meetmax_url_check.py workers until the run merges them into its CSV.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.run_uuid IS 'run_uuid of the meetmax_url_check run.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.eventid IS 'MeetMax event ID.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.shardid IS 'Shard the result was checked in.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.url IS 'Company list page used (public or private).';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.ifexists IS '1 if the event exists, 0 otherwise.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.invalideventid IS 'True if the page showed the Invalid Event ID alert.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.isdownloadable IS '1 if a company list download was found.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.downloadlink IS 'Company list download URL.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.statuscode IS 'HTTP status of the page, or Failed/Error.';
+        COMMENT ON COLUMN dba.tmeetmaxscanresult.title IS 'Event title.';
+
+        GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE dba.tmeetmaxscanresult TO etl_user;
+        GRANT ALL ON TABLE dba.tmeetmaxscanresult TO yostfundsadmin;
+    END IF;
+END $$;
+
+-- Create tratebudget table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tratebudget'
+    ) THEN
+        CREATE TABLE dba.tratebudget (
+              budgetname VARCHAR(255) PRIMARY KEY
+            , rate DOUBLE PRECISION NOT NULL
+            , capacity DOUBLE PRECISION NOT NULL
+            , tokens DOUBLE PRECISION NOT NULL
+            , updatedat TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+        );
+
+        COMMENT ON TABLE dba.tratebudget IS 'Token buckets shared by processes on any host; each request takes one token with a single UPDATE.';
+        COMMENT ON COLUMN dba.tratebudget.budgetname IS 'Name of the budget, usually the host it limits.';
+        COMMENT ON COLUMN dba.tratebudget.rate IS 'Tokens added per second, the global request rate.';
+        COMMENT ON COLUMN dba.tratebudget.capacity IS 'Most tokens that can build up while idle, the largest burst.';
+        COMMENT ON COLUMN dba.tratebudget.tokens IS 'Tokens left at updatedat; negative when tokens have been reserved ahead.';
+        COMMENT ON COLUMN dba.tratebudget.updatedat IS 'Timestamp tokens was last brought up to date.';
+
+        GRANT SELECT, INSERT, UPDATE ON TABLE dba.tratebudget TO etl_user;
+        GRANT ALL ON TABLE dba.tratebudget TO yostfundsadmin;
+    END IF;
+END $$;
@@ -0,0 +1,107 @@
+-- partition_maintenance.sql
+-- Description: Retention for import target tables created with timportconfig.partition_by. Old data is removed by
+-- dropping whole range partitions instead of deleting rows.
+
+-- Create procedure to drop expired partitions of a partitioned target table
+CREATE OR REPLACE PROCEDURE dba.pdropexpiredpartitions(p_tablename VARCHAR, p_retentiondays INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    starttime TIMESTAMP := CURRENT_TIMESTAMP;
+    cutoffdate DATE := CURRENT_DATE - p_retentiondays;
+    partitionrec RECORD;
+    maxdatasetdate DATE;
+    referencedbyactive BOOLEAN;
+    deactivatedrows INTEGER;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = p_tablename::regclass) THEN
+        RAISE EXCEPTION 'Table % is not partitioned', p_tablename;
+    END IF;
+
+    FOR partitionrec IN (
+        SELECT format('%I.%I', n.nspname, c.relname) AS partitionname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = p_tablename::regclass
+        ORDER BY c.relname
+    ) LOOP
+        -- A partition expires once every dataset it holds, and every Unchanged dataset reading its rows through
+        -- dba.timportfingerprint, is dated before the cutoff; empty partitions are kept. A partition whose rows are
+        -- still the active snapshot of an Unchanged dataset is kept whatever its age.
+        EXECUTE format(
+            'WITH stored AS (
+                 SELECT DISTINCT p.datasetid FROM %s p
+             ), dependent AS (
+                 SELECT COALESCE(f.datasetid, s.datasetid) AS datasetid
+                 FROM stored s
+                 LEFT JOIN dba.timportfingerprint f ON f.sourcedatasetid = s.datasetid
+                 UNION
+                 SELECT s.datasetid FROM stored s
+             )
+             SELECT MAX(d.datasetdate)
+                 ,COALESCE(BOOL_OR(d.isactive AND d.datasetid NOT IN (SELECT datasetid FROM stored)), FALSE)
+             FROM dependent x
+             JOIN dba.tdataset d ON d.datasetid = x.datasetid',
+            partitionrec.partitionname
+        ) INTO maxdatasetdate, referencedbyactive;
+        CONTINUE WHEN maxdatasetdate IS NULL OR maxdatasetdate >= cutoffdate OR referencedbyactive;
+
+        -- Retire the datasets whose rows are dropped, including the (expired, inactive) Unchanged datasets that point at them
+        EXECUTE format(
+            'UPDATE dba.tdataset d
+             SET isactive = FALSE,
+                 effthrudate = CURRENT_TIMESTAMP,
+                 datastatusid = (SELECT datastatusid FROM dba.tdatastatus WHERE statusname = ''Deleted'')
+             WHERE d.datasetid IN (SELECT p.datasetid FROM %1$s p)
+                OR d.datasetid IN (SELECT f.datasetid FROM dba.timportfingerprint f WHERE f.sourcedatasetid IN (SELECT p.datasetid FROM %1$s p))',
+            partitionrec.partitionname
+        );
+        GET DIAGNOSTICS deactivatedrows = ROW_COUNT;
+
+        EXECUTE format('DROP TABLE %s', partitionrec.partitionname);
+
+        INSERT INTO dba.tmaintenancelog (
+            maintenancetime
+            ,operation
+            ,tablename
+            ,username
+            ,durationseconds
+            ,details
+        )
+        VALUES (
+            starttime
+            ,'DROP PARTITION'
+            ,partitionrec.partitionname
+            ,CURRENT_USER
+            ,EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - starttime))
+            ,format('Dropped partition of %s with datasets up to %s (retention %s days); marked %s datasets Deleted',
+                    p_tablename, maxdatasetdate, p_retentiondays, deactivatedrows)
+        );
+    END LOOP;
+EXCEPTION
+    WHEN OTHERS THEN
+        INSERT INTO dba.tmaintenancelog (
+            maintenancetime
+            ,operation
+            ,tablename
+            ,username
+            ,durationseconds
+            ,details
+        )
+        VALUES (
+            starttime
+            ,'DROP PARTITION'
+            ,p_tablename
+            ,CURRENT_USER
+            ,NULL
+            ,'Error dropping expired partitions: ' || SQLERRM
+        );
+        RAISE NOTICE 'Partition retention failed for %: %', p_tablename, SQLERRM;
+END;
+$$;
+
+COMMENT ON PROCEDURE dba.pdropexpiredpartitions(VARCHAR, INTEGER) IS 'Drops partitions of a partitioned import target table whose datasets, and the Unchanged datasets reading their rows, are all older than the retention window and not active through an Unchanged dataset, marking those datasets Deleted. Logs each drop to dba.tmaintenancelog.';
+
+-- Grant execute permission
+GRANT EXECUTE ON PROCEDURE dba.pdropexpiredpartitions(VARCHAR, INTEGER) TO etl_user;
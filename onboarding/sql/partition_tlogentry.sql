@@ -0,0 +1,91 @@
+-- partition_tlogentry.sql
+-- Description: Converts dba.tlogentry to a table range-partitioned by month on timestamp, so ppurgeoldlogs can
+-- drop whole months instead of deleting rows. Partitions are named tlogentry_pYYYYMM; rows outside every monthly
+-- partition land in tlogentry_default.
+
+-- Create procedure to create monthly tlogentry partitions
+CREATE OR REPLACE PROCEDURE dba.pcreatelogpartitions(p_fromdate DATE DEFAULT CURRENT_DATE, p_monthsahead INTEGER DEFAULT 3)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    monthstart DATE := date_trunc('month', p_fromdate)::DATE;
+    lastmonth DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => p_monthsahead))::DATE;
+    partitionname TEXT;
+    movedrows INTEGER;
+BEGIN
+    WHILE monthstart <= lastmonth LOOP
+        partitionname := 'tlogentry_p' || to_char(monthstart, 'YYYYMM');
+        IF NOT EXISTS (SELECT 1 FROM pg_tables WHERE schemaname = 'dba' AND tablename = partitionname) THEN
+            -- Build the partition standalone so rows already in the default partition can be moved before attaching
+            EXECUTE format('CREATE TABLE dba.%I (LIKE dba.tlogentry INCLUDING DEFAULTS)', partitionname);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM dba.tlogentry_default WHERE timestamp >= %L AND timestamp < %L RETURNING *)
+                 INSERT INTO dba.%I SELECT * FROM moved',
+                monthstart, (monthstart + INTERVAL '1 month')::DATE, partitionname
+            );
+            GET DIAGNOSTICS movedrows = ROW_COUNT;
+            EXECUTE format(
+                'ALTER TABLE dba.tlogentry ATTACH PARTITION dba.%I FOR VALUES FROM (%L) TO (%L)',
+                partitionname, monthstart, (monthstart + INTERVAL '1 month')::DATE
+            );
+            RAISE NOTICE 'Created partition dba.% (% rows moved from tlogentry_default)', partitionname, movedrows;
+        END IF;
+        monthstart := (monthstart + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$;
+
+COMMENT ON PROCEDURE dba.pcreatelogpartitions(DATE, INTEGER) IS 'Creates the monthly dba.tlogentry partitions from the month of p_fromdate through p_monthsahead months after the current one, moving any matching rows out of tlogentry_default.';
+
+-- Convert tlogentry to a partitioned table if it is still a plain table
+DO $$
+DECLARE
+    firstlogdate DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'dba' AND c.relname = 'tlogentry' AND c.relkind = 'r'
+    ) THEN
+        -- Keep the logid sequence when the old table is dropped
+        ALTER SEQUENCE dba.tlogentry_logid_seq OWNED BY NONE;
+        ALTER TABLE dba.tlogentry RENAME TO tlogentry_unpartitioned;
+        ALTER INDEX dba.tlogentry_pkey RENAME TO tlogentry_unpartitioned_pkey;
+        ALTER INDEX dba.idx_tlogentry_timestamp RENAME TO idx_tlogentry_unpartitioned_timestamp;
+        ALTER INDEX dba.idx_tlogentry_run_uuid RENAME TO idx_tlogentry_unpartitioned_run_uuid;
+
+        -- The primary key of a partitioned table has to include the partition key
+        CREATE TABLE dba.tlogentry (
+              LIKE dba.tlogentry_unpartitioned INCLUDING DEFAULTS INCLUDING COMMENTS
+            , PRIMARY KEY (logid, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+        ALTER SEQUENCE dba.tlogentry_logid_seq OWNED BY dba.tlogentry.logid;
+
+        COMMENT ON TABLE dba.tlogentry IS 'Stores log entries for ETL processes. Partitioned by month on timestamp.';
+
+        -- Indexes on the parent are created on every partition
+        CREATE INDEX idx_tlogentry_timestamp ON dba.tlogentry (timestamp);
+        CREATE INDEX idx_tlogentry_run_uuid ON dba.tlogentry (run_uuid);
+
+        CREATE TABLE dba.tlogentry_default PARTITION OF dba.tlogentry DEFAULT;
+
+        SELECT COALESCE(MIN(timestamp)::DATE, CURRENT_DATE) INTO firstlogdate FROM dba.tlogentry_unpartitioned;
+        CALL dba.pcreatelogpartitions(firstlogdate, 3);
+
+        INSERT INTO dba.tlogentry SELECT * FROM dba.tlogentry_unpartitioned;
+        DROP TABLE dba.tlogentry_unpartitioned;
+
+        GRANT ALL ON TABLE dba.tlogentry TO yostfundsadmin;
+        RAISE NOTICE 'Converted dba.tlogentry to monthly partitions starting %', firstlogdate;
+    ELSE
+        CALL dba.pcreatelogpartitions(CURRENT_DATE, 3);
+    END IF;
+END $$;
+
+-- Index used by replay_log_files.py to find entries already loaded; created here so it lands on the partitioned table
+CREATE INDEX IF NOT EXISTS idx_tlogentry_run_uuid_sourcelogid ON dba.tlogentry (run_uuid, sourcelogid);
+
+-- Grant permissions
+GRANT EXECUTE ON PROCEDURE dba.pcreatelogpartitions(DATE, INTEGER) TO etl_user;
+GRANT USAGE, SELECT ON SEQUENCE dba.tlogentry_logid_seq TO etl_user;
@@ -78,6 +78,50 @@ BEGIN
     END IF;
 END $$;
 
+-- Add the severity level written by log_utils.log_message
+ALTER TABLE dba.tlogentry ADD COLUMN IF NOT EXISTS loglevel VARCHAR(10);
+COMMENT ON COLUMN dba.tlogentry.loglevel IS 'Severity of the entry: DEBUG, INFO, WARN or ERROR.';
+
+-- Add the log_id written by log_utils.log_message, so entries replayed from log CSVs can be matched
+ALTER TABLE dba.tlogentry ADD COLUMN IF NOT EXISTS sourcelogid INTEGER;
+COMMENT ON COLUMN dba.tlogentry.sourcelogid IS 'log_id of the entry in the run''s log CSV; unique within run_uuid.';
+
+-- Create tlogconfig table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tlogconfig'
+    ) THEN
+        CREATE TABLE dba.tlogconfig (
+              logconfigid SERIAL PRIMARY KEY
+            , processtype VARCHAR(50)
+            , sink VARCHAR(10) CHECK (sink IN ('csv', 'txt', 'db'))
+            , minlevel VARCHAR(10) NOT NULL DEFAULT 'DEBUG' CHECK (minlevel IN ('DEBUG', 'INFO', 'WARN', 'ERROR'))
+            , samplerate NUMERIC(5, 4) CHECK (samplerate > 0 AND samplerate <= 1)
+            , maxperminute INT CHECK (maxperminute >= 0)
+            , isactive BOOLEAN NOT NULL DEFAULT TRUE
+            , createddate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            , createdby VARCHAR(50) NOT NULL DEFAULT CURRENT_USER
+        );
+
+        COMMENT ON TABLE dba.tlogconfig IS 'Log filtering rules read by log_utils.log_message. The most specific active rule wins; LOG_LEVEL, LOG_LEVELS and LOG_SAMPLING environment variables override it.';
+        COMMENT ON COLUMN dba.tlogconfig.logconfigid IS 'Primary key for the rule.';
+        COMMENT ON COLUMN dba.tlogconfig.processtype IS 'Process type the rule applies to (e.g., EventProcessing); NULL for all.';
+        COMMENT ON COLUMN dba.tlogconfig.sink IS 'Sink the minimum level applies to: csv, txt or db; NULL for all.';
+        COMMENT ON COLUMN dba.tlogconfig.minlevel IS 'Entries below this level are not written: DEBUG, INFO, WARN or ERROR.';
+        COMMENT ON COLUMN dba.tlogconfig.samplerate IS 'Fraction of DEBUG/INFO entries kept per stepcounter template; NULL keeps all. Read from rules without a sink.';
+        COMMENT ON COLUMN dba.tlogconfig.maxperminute IS 'DEBUG/INFO entries kept per stepcounter template per minute; NULL for no limit. Read from rules without a sink.';
+        COMMENT ON COLUMN dba.tlogconfig.isactive IS 'Whether the rule is applied.';
+        COMMENT ON COLUMN dba.tlogconfig.createddate IS 'Timestamp when the rule was created.';
+        COMMENT ON COLUMN dba.tlogconfig.createdby IS 'User who created the rule.';
+
+        GRANT ALL ON TABLE dba.tlogconfig TO yostfundsadmin;
+        GRANT SELECT ON TABLE dba.tlogconfig TO etl_user;
+    END IF;
+END $$;
+
 -- Create or replace function to log DDL changes
 CREATE OR REPLACE FUNCTION dba.flogddlchanges()
 RETURNS EVENT_TRIGGER AS $$
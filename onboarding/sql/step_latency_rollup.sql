@@ -0,0 +1,194 @@
+-- step_latency_rollup.sql
+-- Description: Daily latency rollup of dba.tlogentry per process type and stepcounter template, kept after the raw
+-- log partitions are dropped. Run CALL dba.prollupsteplatency(); once a day, before ppurgeoldlogs.
+
+-- Create function to normalize stepcounters; must match log_utils.stepcounter_template
+CREATE OR REPLACE FUNCTION dba.fstepcountertemplate(p_stepcounter TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    -- Any '_'-separated part containing a digit or a '.' (IDs, file names) becomes '*': event_123_append -> event_*_append
+    SELECT regexp_replace(COALESCE(p_stepcounter, ''), '[^_]*[0-9.][^_]*', '*', 'g');
+$$;
+
+COMMENT ON FUNCTION dba.fstepcountertemplate(TEXT) IS 'Collapses per-item parts of a stepcounter to *, so event_123 and event_456 share the template event_*. Same rule as log_utils.stepcounter_template.';
+
+-- Create tsteplatencydaily table if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_tables
+        WHERE schemaname = 'dba' AND tablename = 'tsteplatencydaily'
+    ) THEN
+        CREATE TABLE dba.tsteplatencydaily (
+              logdate DATE NOT NULL
+            , processtype VARCHAR(50) NOT NULL
+            , steptemplate VARCHAR(50) NOT NULL
+            , samplecount BIGINT NOT NULL
+            , totalseconds FLOAT NOT NULL
+            , minseconds FLOAT NOT NULL
+            , maxseconds FLOAT NOT NULL
+            , p50seconds FLOAT NOT NULL
+            , p95seconds FLOAT NOT NULL
+            , p99seconds FLOAT NOT NULL
+            , histogram INTEGER[] NOT NULL
+            , createddate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            , PRIMARY KEY (logdate, processtype, steptemplate)
+        );
+
+        COMMENT ON TABLE dba.tsteplatencydaily IS 'Daily stepruntime distribution per process type and stepcounter template, rolled up from dba.tlogentry by dba.prollupsteplatency.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.logdate IS 'Day of the log entries.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.processtype IS 'Process type of the log entries.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.steptemplate IS 'Stepcounter normalized by dba.fstepcountertemplate.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.samplecount IS 'Number of log entries with a stepruntime.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.totalseconds IS 'Sum of stepruntime in seconds.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.minseconds IS 'Smallest stepruntime in seconds.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.maxseconds IS 'Largest stepruntime in seconds.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.p50seconds IS 'Median stepruntime in seconds.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.p95seconds IS '95th percentile stepruntime in seconds.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.p99seconds IS '99th percentile stepruntime in seconds.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.histogram IS 'Entry counts in 21 log2 buckets: [1] under 1 ms, [k] from 2^(k-2) ms up to 2^(k-1) ms, [21] 2^19 ms (about 8.7 minutes) and over.';
+        COMMENT ON COLUMN dba.tsteplatencydaily.createddate IS 'Timestamp when the rollup row was written.';
+
+        GRANT ALL ON TABLE dba.tsteplatencydaily TO yostfundsadmin;
+        GRANT SELECT ON TABLE dba.tsteplatencydaily TO etl_user;
+    END IF;
+END $$;
+
+-- Create procedure to roll up step latency for one day, or every day since the last rollup
+CREATE OR REPLACE PROCEDURE dba.prollupsteplatency(p_logdate DATE DEFAULT NULL)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    starttime TIMESTAMP := CURRENT_TIMESTAMP;
+    firstdate DATE;
+    lastdate DATE := COALESCE(p_logdate, CURRENT_DATE - 1);
+    rollupdate DATE;
+    rolledrows INTEGER;
+BEGIN
+    IF p_logdate IS NOT NULL THEN
+        firstdate := p_logdate;
+    ELSE
+        SELECT COALESCE(MAX(logdate) + 1, (SELECT MIN(timestamp)::DATE FROM dba.tlogentry), lastdate)
+        INTO firstdate
+        FROM dba.tsteplatencydaily;
+    END IF;
+
+    rollupdate := firstdate;
+    WHILE rollupdate <= lastdate LOOP
+        -- Recompute the day from scratch so reruns and late replays are picked up
+        DELETE FROM dba.tsteplatencydaily WHERE logdate = rollupdate;
+
+        INSERT INTO dba.tsteplatencydaily (
+            logdate
+            ,processtype
+            ,steptemplate
+            ,samplecount
+            ,totalseconds
+            ,minseconds
+            ,maxseconds
+            ,p50seconds
+            ,p95seconds
+            ,p99seconds
+            ,histogram
+        )
+        WITH steps AS (
+            SELECT
+                processtype
+                ,LEFT(dba.fstepcountertemplate(stepcounter), 50) AS steptemplate
+                ,stepruntime
+                ,CASE
+                    WHEN stepruntime < 0.001 THEN 0
+                    ELSE LEAST(20, floor(log(2, (stepruntime * 1000)::NUMERIC))::INTEGER + 1)
+                 END AS bucket
+            FROM dba.tlogentry
+            WHERE timestamp >= rollupdate
+              AND timestamp < rollupdate + 1
+              AND stepruntime IS NOT NULL
+        ),
+        buckets AS (
+            SELECT processtype, steptemplate, bucket, COUNT(*)::INTEGER AS bucketcount
+            FROM steps
+            GROUP BY processtype, steptemplate, bucket
+        ),
+        histograms AS (
+            SELECT
+                k.processtype
+                ,k.steptemplate
+                ,array_agg(COALESCE(b.bucketcount, 0) ORDER BY g.bucket) AS histogram
+            FROM (SELECT DISTINCT processtype, steptemplate FROM buckets) k
+            CROSS JOIN generate_series(0, 20) AS g(bucket)
+            LEFT JOIN buckets b
+                ON b.processtype = k.processtype
+               AND b.steptemplate = k.steptemplate
+               AND b.bucket = g.bucket
+            GROUP BY k.processtype, k.steptemplate
+        )
+        SELECT
+            rollupdate
+            ,s.processtype
+            ,s.steptemplate
+            ,COUNT(*)
+            ,SUM(s.stepruntime)
+            ,MIN(s.stepruntime)
+            ,MAX(s.stepruntime)
+            ,percentile_cont(0.50) WITHIN GROUP (ORDER BY s.stepruntime)
+            ,percentile_cont(0.95) WITHIN GROUP (ORDER BY s.stepruntime)
+            ,percentile_cont(0.99) WITHIN GROUP (ORDER BY s.stepruntime)
+            ,h.histogram
+        FROM steps s
+        JOIN histograms h
+            ON h.processtype = s.processtype
+           AND h.steptemplate = s.steptemplate
+        GROUP BY s.processtype, s.steptemplate, h.histogram;
+        GET DIAGNOSTICS rolledrows = ROW_COUNT;
+
+        INSERT INTO dba.tmaintenancelog (
+            maintenancetime
+            ,operation
+            ,tablename
+            ,username
+            ,durationseconds
+            ,details
+        )
+        VALUES (
+            starttime
+            ,'ROLLUP'
+            ,'tStepLatencyDaily'
+            ,CURRENT_USER
+            ,EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - starttime))
+            ,format('Rolled up %s process type/step templates for %s', rolledrows, rollupdate)
+        );
+
+        rollupdate := rollupdate + 1;
+    END LOOP;
+EXCEPTION
+    WHEN OTHERS THEN
+        INSERT INTO dba.tmaintenancelog (
+            maintenancetime
+            ,operation
+            ,tablename
+            ,username
+            ,durationseconds
+            ,details
+        )
+        VALUES (
+            starttime
+            ,'ROLLUP'
+            ,'tStepLatencyDaily'
+            ,CURRENT_USER
+            ,NULL
+            ,'Error rolling up step latency: ' || SQLERRM
+        );
+        RAISE NOTICE 'Step latency rollup failed: %', SQLERRM;
+END;
+$$;
+
+COMMENT ON PROCEDURE dba.prollupsteplatency(DATE) IS 'Rolls dba.tlogentry stepruntime up into dba.tsteplatencydaily for p_logdate, or for every day after the last rollup through yesterday when called without a date.';
+
+-- Grant execute permission
+GRANT EXECUTE ON FUNCTION dba.fstepcountertemplate(TEXT) TO etl_user;
+GRANT EXECUTE ON PROCEDURE dba.prollupsteplatency(DATE) TO etl_user;
@@ -15,6 +15,9 @@ LOG_DIR = ROOT_DIR / 'logs'
 # Directory for archived files
 ARCHIVE_DIR = ROOT_DIR / 'archive'
 
+# Directory for on-disk caches kept between runs
+CACHE_DIR = ROOT_DIR / 'cache'
+
 # Directory for job scripts
 JOB_SCRIPTS_DIR = ROOT_DIR / 'jobscripts'
 
@@ -37,6 +40,7 @@ def initialize_directories():
     ensure_directory_exists(FILE_WATCHER_DIR)
     ensure_directory_exists(LOG_DIR)
     ensure_directory_exists(ARCHIVE_DIR)
+    ensure_directory_exists(CACHE_DIR)
     ensure_directory_exists(JOB_SCRIPTS_DIR)
     ensure_directory_exists(SYSTEM_SCRIPTS_DIR)
 
@@ -47,5 +51,6 @@ if __name__ == "__main__":
     print(f"File Watcher Directory: {FILE_WATCHER_DIR}")
     print(f"Log Directory: {LOG_DIR}")
     print(f"Archive Directory: {ARCHIVE_DIR}")
+    print(f"Cache Directory: {CACHE_DIR}")
     print(f"Job Scripts Directory: {JOB_SCRIPTS_DIR}")
     print(f"System Scripts Directory: {SYSTEM_SCRIPTS_DIR}")
\ No newline at end of file
@@ -4,9 +4,17 @@ import re
 import glob
 import uuid
 import time
+import io
+import itertools
+import hashlib
+import threading
+import contextlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 from pathlib import Path
 import grp  # For getgrnam
 # Add root directory to sys.path
@@ -18,7 +26,20 @@ import traceback
 from systemscripts.user_utils import get_username
 from systemscripts.log_utils import log_message
 from systemscripts.directory_management import ensure_directory_exists, LOG_DIR, FILE_WATCHER_DIR
-from systemscripts.xls_to_csv import xls_to_csv
+from systemscripts.xls_to_csv import read_excel_file, write_csv
+from systemscripts.import_stats import ImportTimings, IMPORT_STAGES
+
+# Set to 1 to also write each parsed workbook to LOG_DIR as a CSV for inspection
+DEBUG_CSV_ENV = "GENERIC_IMPORT_DEBUG_CSV"
+
+# Block size for hashing files when timportconfig.skip_unchanged is set
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# SQL types that infer_column_type can choose for auto-created columns; anything else stays VARCHAR
+INFERRED_SQL_TYPES = ("BIGINT", "NUMERIC", "DATE", "TIMESTAMP", "BOOLEAN")
+
+# Datasets per partition for tables with partition_by = 'datasetid'
+PARTITION_DATASETID_WIDTH = 10000
 
 # Database connection parameters
 DB_PARAMS = {
@@ -52,7 +73,8 @@ def get_config(config_id, log_file, run_uuid, user, script_start_time):
                 cur.execute("""
                     SELECT config_name, datasource, datasettype, source_directory, archive_directory,
                            file_pattern, file_type, metadata_label_source, metadata_label_location,
-                           dateconfig, datelocation, dateformat, delimiter, target_table, importstrategyid, is_active
+                           dateconfig, datelocation, dateformat, delimiter, target_table, importstrategyid, is_active,
+                           load_method, chunk_size, max_workers, skip_unchanged, staged_load, infer_types, partition_by
                     FROM dba.timportconfig
                     WHERE config_id = %s AND is_active = '1';
                 """, (config_id,))
@@ -62,6 +84,7 @@ def get_config(config_id, log_file, run_uuid, user, script_start_time):
                                 run_uuid=run_uuid, stepcounter="ConfigFetch_0", user=user, script_start_time=script_start_time)
                     return None
                 return {
+                    "config_id": config_id,
                     "config_name": config[0],
                     "datasource": config[1],
                     "datasettype": config[2],
@@ -76,7 +99,14 @@ def get_config(config_id, log_file, run_uuid, user, script_start_time):
                     "dateformat": config[11],
                     "delimiter": config[12],
                     "target_table": config[13],
-                    "importstrategyid": config[14]
+                    "importstrategyid": config[14],
+                    "load_method": config[16] or "COPY",
+                    "chunk_size": config[17],
+                    "max_workers": config[18] or 1,
+                    "skip_unchanged": bool(config[19]),
+                    "staged_load": bool(config[20]),
+                    "infer_types": bool(config[21]),
+                    "partition_by": config[22]
                 }
     except psycopg2.Error as e:
         log_message(log_file, "Error", f"Database error fetching config_id {config_id}: {str(e)}",
@@ -125,7 +155,7 @@ def parse_metadata(filename, config, field_source, field_location, delimiter, lo
     return None
 
 def table_exists(cursor, table_name, log_file, run_uuid, user, script_start_time):
-    """Check if a table exists in the database."""
+    """Check if a table exists in the database. Returns None if the check itself failed."""
     try:
         schema, table = table_name.split('.')
         cursor.execute("""
@@ -142,7 +172,7 @@ def table_exists(cursor, table_name, log_file, run_uuid, user, script_start_time
     except Exception as e:
         log_message(log_file, "Error", f"Failed to check table existence for {table_name}: {str(e)}",
                     run_uuid=run_uuid, stepcounter="TableCheck_1", user=user, script_start_time=script_start_time)
-        return False
+        return None
 
 def get_table_columns(cursor, table_name, log_file, run_uuid, user, script_start_time):
     """Get the columns of a table."""
@@ -180,6 +210,26 @@ def get_table_column_lengths(cursor, table_name, log_file, run_uuid, user, scrip
                     run_uuid=run_uuid, stepcounter="TableColumnLengths_1", user=user, script_start_time=script_start_time)
         return {}
 
+def get_table_column_types(cursor, table_name, log_file, run_uuid, user, script_start_time):
+    """Get the SQL type of each column in the table, as rendered by format_type (e.g. 'character varying(50)')."""
+    try:
+        cursor.execute("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = %s::regclass
+              AND a.attnum > 0
+              AND NOT a.attisdropped
+            ORDER BY a.attnum;
+        """, (table_name,))
+        column_types = {row[0]: row[1] for row in cursor.fetchall()}
+        log_message(log_file, "TableColumnTypes", f"Column types for {table_name}: {column_types}",
+                    run_uuid=run_uuid, stepcounter="TableColumnTypes_0", user=user, script_start_time=script_start_time)
+        return column_types
+    except Exception as e:
+        log_message(log_file, "Error", f"Failed to get column types for {table_name}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="TableColumnTypes_1", user=user, script_start_time=script_start_time)
+        return {}
+
 def get_column_lengths(df):
     """Determine the maximum length of data in each column with a safety margin."""
     lengths = {}
@@ -192,25 +242,121 @@ def get_column_lengths(df):
         lengths[col] = safe_length
     return lengths
 
-def get_empty_datastatus_id(cursor, log_file, run_uuid, user, script_start_time):
-    """Retrieve the datastatusid for the 'Empty' status."""
+def scan_columns(csv_path, chunk_size, infer_types=False):
+    """Measure, and with infer_types type, every column of a CSV in one pass of chunk_size rows at a time.
+
+    Returns (lengths, types): the largest get_column_lengths value per column and, if infer_types, the
+    infer_column_types results merged over all chunks (None otherwise).
+    """
+    lengths = {}
+    types = {} if infer_types else None
+    with pd.read_csv(csv_path, chunksize=chunk_size) as chunks:
+        for chunk in chunks:
+            for col, length in get_column_lengths(chunk).items():
+                lengths[col] = max(lengths.get(col, 0), length)
+            if infer_types:
+                for col, col_type in infer_column_types(chunk).items():
+                    types[col] = merge_column_types(types[col], col_type) if col in types else col_type
+    return lengths, types
+
+def infer_column_type(series):
+    """Infer BIGINT, NUMERIC, DATE, TIMESTAMP or BOOLEAN for a column, 'TEXT' on any conflict, or None when it has no values.
+
+    Every check runs on the whole column at once; values with leading zeros stay text so identifiers keep their digits.
+    """
+    values = series.dropna()
+    if pd.api.types.is_bool_dtype(values) and not values.empty:
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(values) and not values.empty:
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(values) and not values.empty:
+        return "BIGINT" if (values == values.round()).all() and values.abs().max() < 2 ** 63 else "NUMERIC"
+    if pd.api.types.is_datetime64_any_dtype(values) and not values.empty:
+        return "DATE" if (values.dt.normalize() == values).all() else "TIMESTAMP"
+    text = values.astype(str).str.strip()
+    text = text[text != '']
+    if text.empty:
+        return None
+    if text.str.lower().isin(["true", "false"]).all():
+        return "BOOLEAN"
+    if text.str.fullmatch(r'[+-]?\d+').all():
+        if text.str.fullmatch(r'[+-]?0\d+').any():
+            return "TEXT"
+        return "BIGINT" if text.str.lstrip('+-').str.len().max() <= 18 else "NUMERIC"
+    if text.str.fullmatch(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?').all():
+        return "NUMERIC"
+    if text.str.match(r'\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4}').all():
+        parsed = pd.to_datetime(text, errors='coerce')
+        if parsed.notna().all():
+            return "DATE" if (parsed.dt.normalize() == parsed).all() else "TIMESTAMP"
+    return "TEXT"
+
+def merge_column_types(first, second):
+    """Combine the types inferred for one column from two chunks, widening or falling back to TEXT on conflict."""
+    if first is None or first == second:
+        return second
+    if second is None:
+        return first
+    if {first, second} == {"BIGINT", "NUMERIC"}:
+        return "NUMERIC"
+    if {first, second} == {"DATE", "TIMESTAMP"}:
+        return "TIMESTAMP"
+    return "TEXT"
+
+def infer_column_types(df):
+    """Infer a SQL type per column with infer_column_type."""
+    return {col: infer_column_type(df[col]) for col in df.columns}
+
+def column_definition(column, column_lengths, column_types):
+    """Render the DDL type for a new column: the inferred type when there is one, else VARCHAR sized from the data."""
+    inferred_type = (column_types or {}).get(column)
+    if inferred_type in INFERRED_SQL_TYPES:
+        return inferred_type
+    return f"VARCHAR({min(column_lengths.get(column, 1000), 4000)})"  # Default to 1000, cap at 4000
+
+def cast_series(series, sql_type):
+    """Convert a column to the Python values COPY expects for a typed target column, in one vectorized pass.
+
+    Returns None for text-like types, which keep the truncation path.
+    """
+    if sql_type in ("bigint", "integer", "smallint"):
+        numbers = pd.to_numeric(series, errors='coerce')
+        return numbers.where(numbers == numbers.round()).astype('Int64')
+    if sql_type in ("numeric", "double precision", "real") or sql_type.startswith("numeric("):
+        return pd.to_numeric(series, errors='coerce')
+    if sql_type == "date":
+        return pd.to_datetime(series, errors='coerce').dt.strftime('%Y-%m-%d')
+    if sql_type.startswith("timestamp"):
+        return pd.to_datetime(series, errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if sql_type == "boolean":
+        if pd.api.types.is_bool_dtype(series):
+            return series
+        return series.astype(str).str.strip().str.lower().map({"true": True, "false": False})
+    return None
+
+def get_datastatus_id(cursor, statusname, log_file, run_uuid, user, script_start_time):
+    """Retrieve the datastatusid for a status name such as 'Empty' or 'Unchanged'."""
     try:
         cursor.execute("""
             SELECT datastatusid
             FROM dba.tdatastatus
-            WHERE statusname = 'Empty';
-        """)
+            WHERE statusname = %s;
+        """, (statusname,))
         row = cursor.fetchone()
         if row:
             return row[0]
-        log_message(log_file, "Error", "No 'Empty' status found in dba.tdatastatus",
+        log_message(log_file, "Error", f"No '{statusname}' status found in dba.tdatastatus",
                     run_uuid=run_uuid, stepcounter="DataStatusFetch_0", user=user, script_start_time=script_start_time)
         return None
     except psycopg2.Error as e:
-        log_message(log_file, "Error", f"Failed to fetch 'Empty' datastatusid: {str(e)}",
+        log_message(log_file, "Error", f"Failed to fetch '{statusname}' datastatusid: {str(e)}",
                     run_uuid=run_uuid, stepcounter="DataStatusFetch_1", user=user, script_start_time=script_start_time)
         return None
 
+def get_empty_datastatus_id(cursor, log_file, run_uuid, user, script_start_time):
+    """Retrieve the datastatusid for the 'Empty' status."""
+    return get_datastatus_id(cursor, 'Empty', log_file, run_uuid, user, script_start_time)
+
 def ensure_lookup_ids(cursor, datasource, dataset_type, user, log_file, run_uuid, script_start_time):
     """Ensure datasource and datasettype exist in tdatasource and tdatasettype, inserting if necessary."""
     try:
@@ -260,14 +406,90 @@ def ensure_lookup_ids(cursor, datasource, dataset_type, user, log_file, run_uuid
                     run_uuid=run_uuid, stepcounter="LookupInsert_2", user=user, script_start_time=script_start_time)
         return None, None
 
-def insert_dataset(cursor, config_name, dataset_date, label, datasource_id, dataset_type_id, log_file, run_uuid, user, script_start_time):
-    """Insert a new dataset into tdataset and return its ID."""
+class MetadataCache:
+    """Run-scoped cache of catalog and lookup queries shared by every file (and worker) of one generic_import run.
+
+    Entries for a table are dropped by invalidate_table() whenever its schema changes; failed lookups are never cached.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table_exists = {}
+        self._table_columns = {}
+        self._table_column_lengths = {}
+        self._table_column_types = {}
+        self._lookup_ids = {}
+        self._datastatus_ids = {}
+        self._partitions = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, store, key, fetch, is_valid=bool):
+        with self._lock:
+            if key in store:
+                self.hits += 1
+                return store[key]
+            self.misses += 1
+        value = fetch()
+        if is_valid(value):
+            with self._lock:
+                store[key] = value
+        return value
+
+    def table_exists(self, cursor, table_name, log_file, run_uuid, user, script_start_time):
+        return self._get(self._table_exists, table_name,
+                         lambda: table_exists(cursor, table_name, log_file, run_uuid, user, script_start_time),
+                         is_valid=lambda exists: exists is not None)
+
+    def table_columns(self, cursor, table_name, log_file, run_uuid, user, script_start_time):
+        return list(self._get(self._table_columns, table_name,
+                              lambda: get_table_columns(cursor, table_name, log_file, run_uuid, user, script_start_time)))
+
+    def table_column_lengths(self, cursor, table_name, log_file, run_uuid, user, script_start_time):
+        return dict(self._get(self._table_column_lengths, table_name,
+                              lambda: get_table_column_lengths(cursor, table_name, log_file, run_uuid, user, script_start_time)))
+
+    def table_column_types(self, cursor, table_name, log_file, run_uuid, user, script_start_time):
+        return dict(self._get(self._table_column_types, table_name,
+                              lambda: get_table_column_types(cursor, table_name, log_file, run_uuid, user, script_start_time)))
+
+    def lookup_ids(self, cursor, datasource, dataset_type, user, log_file, run_uuid, script_start_time):
+        return self._get(self._lookup_ids, (datasource, dataset_type),
+                         lambda: ensure_lookup_ids(cursor, datasource, dataset_type, user, log_file, run_uuid, script_start_time),
+                         is_valid=all)
+
+    def datastatus_id(self, cursor, statusname, log_file, run_uuid, user, script_start_time):
+        return self._get(self._datastatus_ids, statusname,
+                         lambda: get_datastatus_id(cursor, statusname, log_file, run_uuid, user, script_start_time))
+
+    def has_partition(self, partition_name):
+        with self._lock:
+            return partition_name in self._partitions
+
+    def add_partition(self, partition_name):
+        with self._lock:
+            self._partitions.add(partition_name)
+
+    def invalidate_table(self, table_name):
+        """Forget everything cached about table_name after CREATE TABLE or ALTER TABLE."""
+        with self._lock:
+            self._table_exists.pop(table_name, None)
+            self._table_columns.pop(table_name, None)
+            self._table_column_lengths.pop(table_name, None)
+            self._table_column_types.pop(table_name, None)
+
+def insert_dataset(cursor, config_name, dataset_date, label, datasource_id, dataset_type_id, log_file, run_uuid, user, script_start_time, active=True):
+    """Insert a new dataset into tdataset and return its ID.
+
+    With active=False the dataset is inserted inactive with 'New' status, for update_dataset_datastatus(activate=True)
+    to activate once its rows are loaded.
+    """
     try:
         cursor.execute("""
             INSERT INTO dba.tdataset (datasetdate, label, datasettypeid, datasourceid, datastatusid, isactive, createddate, createdby, effthrudate)
-            VALUES (%s, %s, %s, %s, 1, TRUE, CURRENT_TIMESTAMP, %s, '9999-01-01')
+            VALUES (%s, %s, %s, %s, CASE WHEN %s THEN 1 ELSE (SELECT datastatusid FROM dba.tdatastatus WHERE statusname = 'New') END,
+                    %s, CURRENT_TIMESTAMP, %s, '9999-01-01')
             RETURNING datasetid;
-        """, (dataset_date, label, dataset_type_id, datasource_id, user))
+        """, (dataset_date, label, dataset_type_id, datasource_id, active, active, user))
         dataset_id = cursor.fetchone()[0]
         log_message(log_file, "DatasetInsert", f"Inserted dataset {config_name} with datasetid {dataset_id}",
                     run_uuid=run_uuid, stepcounter="DatasetInsert_0", user=user, script_start_time=script_start_time)
@@ -292,36 +514,56 @@ def update_dataset_status(cursor, dataset_id, datasource_id, dataset_type_id, la
         """, (datasource_id, dataset_type_id, label, dataset_date, dataset_id))
         log_message(log_file, "DatasetUpdate", f"Deactivated other datasets for datasetid={dataset_id}, datasourceid={datasource_id}, datasettypeid={dataset_type_id}, label={label}, datasetdate={dataset_date}",
                     run_uuid=run_uuid, stepcounter="DatasetUpdate_0", user=user, script_start_time=script_start_time)
+        return True
     except psycopg2.Error as e:
         log_message(log_file, "Error", f"Failed to deactivate other datasets for datasetid {dataset_id}: {str(e)}\n{traceback.format_exc()}",
                     run_uuid=run_uuid, stepcounter="DatasetUpdate_1", user=user, script_start_time=script_start_time)
+        return False
 
-def update_dataset_empty_status(cursor, dataset_id, log_file, run_uuid, user, script_start_time):
-    """Update the dataset to set datastatusid to 'Empty'."""
-    empty_status_id = get_empty_datastatus_id(cursor, log_file, run_uuid, user, script_start_time)
-    if not empty_status_id:
-        log_message(log_file, "Error", f"Cannot update dataset {dataset_id} to 'Empty' status: datastatusid not found",
-                    run_uuid=run_uuid, stepcounter="DatasetEmptyUpdate_0", user=user, script_start_time=script_start_time)
+def update_dataset_datastatus(cursor, dataset_id, statusname, log_file, run_uuid, user, script_start_time, cache=None, activate=False):
+    """Update the dataset to set datastatusid to the named status, e.g. 'Empty' or 'Unchanged'.
+
+    With activate the dataset is also made active and update_dataset_status deactivates the datasets it replaces,
+    in the caller's transaction.
+    """
+    cache = cache or MetadataCache()
+    status_id = cache.datastatus_id(cursor, statusname, log_file, run_uuid, user, script_start_time)
+    if not status_id:
+        log_message(log_file, "Error", f"Cannot update dataset {dataset_id} to '{statusname}' status: datastatusid not found",
+                    run_uuid=run_uuid, stepcounter="DatasetStatusUpdate_0", user=user, script_start_time=script_start_time)
         return False
     try:
         cursor.execute("""
             UPDATE dba.tdataset
             SET datastatusid = %s
-            WHERE datasetid = %s;
-        """, (empty_status_id, dataset_id))
-        log_message(log_file, "DatasetEmptyUpdate", f"Updated dataset {dataset_id} to 'Empty' status (datastatusid={empty_status_id})",
-                    run_uuid=run_uuid, stepcounter="DatasetEmptyUpdate_1", user=user, script_start_time=script_start_time)
+                ,isactive = isactive OR %s
+            WHERE datasetid = %s
+            RETURNING datasourceid, datasettypeid, label, datasetdate;
+        """, (status_id, activate, dataset_id))
+        dataset_key = cursor.fetchone()
+        log_message(log_file, "DatasetStatusUpdate", f"Updated dataset {dataset_id} to '{statusname}' status (datastatusid={status_id})",
+                    run_uuid=run_uuid, stepcounter="DatasetStatusUpdate_1", user=user, script_start_time=script_start_time)
+        if activate:
+            return update_dataset_status(cursor, dataset_id, *dataset_key, log_file, run_uuid, user, script_start_time)
         return True
     except psycopg2.Error as e:
-        log_message(log_file, "Error", f"Failed to update dataset {dataset_id} to 'Empty' status: {str(e)}\n{traceback.format_exc()}",
-                    run_uuid=run_uuid, stepcounter="DatasetEmptyUpdate_2", user=user, script_start_time=script_start_time)
+        log_message(log_file, "Error", f"Failed to update dataset {dataset_id} to '{statusname}' status: {str(e)}\n{traceback.format_exc()}",
+                    run_uuid=run_uuid, stepcounter="DatasetStatusUpdate_2", user=user, script_start_time=script_start_time)
         return False
 
-def add_columns_to_table(cursor, table_name, new_columns, column_lengths, log_file, run_uuid, user, script_start_time):
-    """Add new columns or update existing ones to the target table with appropriate VARCHAR length."""
+def update_dataset_empty_status(cursor, dataset_id, log_file, run_uuid, user, script_start_time, cache=None, activate=False):
+    """Update the dataset to set datastatusid to 'Empty'."""
+    return update_dataset_datastatus(cursor, dataset_id, 'Empty', log_file, run_uuid, user, script_start_time, cache, activate)
+
+def add_columns_to_table(cursor, table_name, new_columns, column_lengths, log_file, run_uuid, user, script_start_time, cache=None, column_types=None):
+    """Add new columns or update existing ones to the target table with appropriate VARCHAR length.
+
+    column_types, from infer_column_types, gives new columns a typed definition instead of VARCHAR.
+    """
+    cache = cache or MetadataCache()
     try:
         # Get current column lengths
-        existing_lengths = get_table_column_lengths(cursor, table_name, log_file, run_uuid, user, script_start_time)
+        existing_lengths = cache.table_column_lengths(cursor, table_name, log_file, run_uuid, user, script_start_time)
         
         for column in new_columns:
             column_lower = column.lower().replace(' ', '_').replace('-', '_')
@@ -330,11 +572,12 @@ def add_columns_to_table(cursor, table_name, new_columns, column_lengths, log_fi
             
             if existing_length is None:
                 # Add new column
+                definition = column_definition(column, column_lengths, column_types)
                 cursor.execute(f"""
                     ALTER TABLE {table_name}
-                    ADD COLUMN IF NOT EXISTS "{column_lower}" VARCHAR({required_length});
+                    ADD COLUMN IF NOT EXISTS "{column_lower}" {definition};
                 """)
-                log_message(log_file, "SchemaUpdate", f"Added column {column_lower} as VARCHAR({required_length}) to {table_name}",
+                log_message(log_file, "SchemaUpdate", f"Added column {column_lower} as {definition} to {table_name}",
                             run_uuid=run_uuid, stepcounter=f"SchemaUpdate_{column_lower}", user=user, script_start_time=script_start_time)
             elif existing_length < required_length:
                 # Update existing column length
@@ -349,136 +592,331 @@ def add_columns_to_table(cursor, table_name, new_columns, column_lengths, log_fi
         log_message(log_file, "Error", f"Failed to add or update columns in {table_name}: {str(e)}",
                     run_uuid=run_uuid, stepcounter="SchemaUpdate_Error", user=user, script_start_time=script_start_time)
         return False
+    finally:
+        cache.invalidate_table(table_name)
+
+def is_invalid_event_frame(df, file_path, log_file, run_uuid, user, script_start_time):
+    """Check an already parsed workbook for 'Invalid Event ID' content. Returns (is_invalid, is_readable).
+
+    The frame is read with the first row as header, so the header cell is checked along with the first column.
+    """
+    if df.columns.empty:
+        log_message(log_file, "Warning", f"Workbook {file_path} has no columns. Treating as empty dataset.",
+                    run_uuid=run_uuid, stepcounter="FileValidation_1", user=user, script_start_time=script_start_time)
+        return False, False
+    first_column = pd.concat([pd.Series([df.columns[0]]), df.iloc[:, 0]], ignore_index=True).astype(str).str.strip()
+    if first_column.str.contains('Invalid Event ID', case=False, na=False).any():
+        log_message(log_file, "Warning", f"File {file_path} contains 'Invalid Event ID'. Treating as empty dataset.",
+                    run_uuid=run_uuid, stepcounter="FileValidation_0", user=user, script_start_time=script_start_time)
+        return True, True
+    return False, True
 
 def is_invalid_event_file(file_path, log_file, run_uuid, user, script_start_time):
     """Check if an XLS file contains 'Invalid Event ID' or similar content."""
     try:
-        # Try openpyxl first (default for project)
-        df = pd.read_excel(file_path, header=None, engine='openpyxl')
-        first_column = df.iloc[:, 0].astype(str).str.strip()
-        if first_column.str.contains('Invalid Event ID', case=False, na=False).any():
-            log_message(log_file, "Warning", f"File {file_path} contains 'Invalid Event ID' (openpyxl). Treating as empty dataset.",
-                        run_uuid=run_uuid, stepcounter="FileValidation_0", user=user, script_start_time=script_start_time)
-            return True, True  # is_invalid, is_readable
-        return False, True
-    except Exception as e_openpyxl:
-        # Try xlrd as fallback for legacy .xls files
-        try:
-            df = pd.read_excel(file_path, header=None, engine='xlrd')
-            first_column = df.iloc[:, 0].astype(str).str.strip()
-            if first_column.str.contains('Invalid Event ID', case=False, na=False).any():
-                log_message(log_file, "Warning", f"File {file_path} contains 'Invalid Event ID' (xlrd). Treating as empty dataset.",
-                            run_uuid=run_uuid, stepcounter="FileValidation_0", user=user, script_start_time=script_start_time)
-                return True, True
-            return False, True
-        except Exception as e_xlrd:
-            log_message(log_file, "Warning", f"Failed to read XLS {file_path} with openpyxl or xlrd: openpyxl error: {str(e_openpyxl)}, xlrd error: {str(e_xlrd)}. Treating as empty dataset.",
-                        run_uuid=run_uuid, stepcounter="FileValidation_1", user=user, script_start_time=script_start_time)
-            return False, False  # is_invalid, is_readable
+        df, _ = read_excel_file(file_path)
+    except Exception as e:
+        log_message(log_file, "Warning", f"Failed to read XLS {file_path} with openpyxl or xlrd: {str(e)}. Treating as empty dataset.",
+                    run_uuid=run_uuid, stepcounter="FileValidation_1", user=user, script_start_time=script_start_time)
+        return False, False  # is_invalid, is_readable
+    return is_invalid_event_frame(df, file_path, log_file, run_uuid, user, script_start_time)
+
+def copy_dataframe(cur, df, target_table):
+    """Stream a DataFrame into target_table with COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+    cur.copy_expert(f"""
+        COPY {target_table} ({','.join(f'"{col}"' for col in df.columns)})
+        FROM STDIN WITH (FORMAT csv, NULL '\\N')
+    """, buffer)
+
+def insert_dataframe(cur, df, target_table):
+    """Insert a DataFrame into target_table row by row with executemany."""
+    records = [tuple(row) for row in df.astype(object).where(df.notna(), None).to_numpy()]
+    placeholders = ",".join(["%s"] * len(df.columns))
+    insert_query = f"""
+        INSERT INTO {target_table} ({','.join(f'"{col}"' for col in df.columns)})
+        VALUES ({placeholders})
+    """
+    cur.executemany(insert_query, records)
+
+def prepare_chunk(df, column_map, column_mapping, dataset_id, metadata_label, event_date, table_columns_lower, table_column_lengths, truncated_counts,
+                  truncate=True, table_column_types=None, conversion_failures=None, dataset_date=None):
+    """Map, filter and truncate one DataFrame chunk so it matches the target table.
+
+    With truncate=False text values are passed through untouched, for staged loads that truncate in SQL.
+    Columns listed in table_column_types with a numeric, date or boolean type are converted with cast_series
+    instead; values that do not convert become NULL and are counted in conversion_failures.
+    """
+    df = df.rename(columns=column_map)
+    df["datasetid"] = dataset_id
+    if metadata_label and "metadata_label" in table_columns_lower:
+        df["metadata_label"] = metadata_label
+    if event_date and "event_date" in table_columns_lower:
+        df["event_date"] = event_date
+    if dataset_date and "datasetdate" in table_columns_lower:
+        df["datasetdate"] = dataset_date
+    df = df[list(column_mapping)].rename(columns=column_mapping)
+
+    typed_columns = set()
+    for col, sql_type in (table_column_types or {}).items():
+        if col not in df.columns:
+            continue
+        converted = cast_series(df[col], sql_type)
+        if converted is None:
+            continue
+        failed = int((df[col].notna() & (df[col].astype(str).str.strip() != '') & converted.isna()).sum())
+        if failed and conversion_failures is not None:
+            conversion_failures[col] = conversion_failures.get(col, 0) + failed
+        df[col] = converted
+        typed_columns.add(col)
+    if not truncate:
+        return df
+
+    # Truncate values to fit column lengths
+    for col in df.columns:
+        if col in typed_columns:
+            continue
+        max_length = table_column_lengths.get(col.lower(), 255)  # Default to 255 if unknown
+        if max_length:
+            values = df[col].astype(str)
+            # Counted like merge_stage_table: values longer than the column, before they are cut
+            long_count = int((values.str.len() > max_length).sum())
+            df[col] = values.str.slice(0, max_length)
+            if long_count:
+                truncated_counts[col] = truncated_counts.get(col, 0) + long_count
+    return df
+
+def partition_bounds(target_table, partition_by, dataset_id, dataset_date):
+    """Return (partition name, lower bound, upper bound) of the range partition that will hold a dataset's rows."""
+    schema, table = target_table.split('.')
+    if partition_by == "datasetdate":
+        lower = dataset_date.replace(day=1)
+        upper = (lower.replace(year=lower.year + 1, month=1) if lower.month == 12 else lower.replace(month=lower.month + 1))
+        suffix = f"_{lower.strftime('%Y%m')}"
+        return f'{schema}."{table[:63 - len(suffix)]}{suffix}"', f"'{lower.isoformat()}'", f"'{upper.isoformat()}'"
+    lower = (dataset_id // PARTITION_DATASETID_WIDTH) * PARTITION_DATASETID_WIDTH
+    suffix = f"_p{lower}"
+    return f'{schema}."{table[:63 - len(suffix)]}{suffix}"', str(lower), str(lower + PARTITION_DATASETID_WIDTH)
+
+def ensure_partition(cursor, target_table, partition_by, dataset_id, dataset_date, cache, log_file, run_uuid, user, script_start_time):
+    """Create the range partition for a dataset if it does not exist yet. Returns True when the partition is in place."""
+    partition_name, lower, upper = partition_bounds(target_table, partition_by, dataset_id, dataset_date)
+    if cache.has_partition(partition_name):
+        return True
+    try:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition_name}
+            PARTITION OF {target_table}
+            FOR VALUES FROM ({lower}) TO ({upper});
+        """)
+        cache.add_partition(partition_name)
+        log_message(log_file, "SchemaUpdate", f"Ensured partition {partition_name} of {target_table} for {partition_by} {lower} to {upper}",
+                    run_uuid=run_uuid, stepcounter="SchemaPartition_0", user=user, script_start_time=script_start_time)
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Error", f"Failed to create partition {partition_name} of {target_table} (is it partitioned by {partition_by}?): {str(e)}",
+                    run_uuid=run_uuid, stepcounter="SchemaPartition_1", user=user, script_start_time=script_start_time)
+        return False
 
-def load_data_to_postgres(df, target_table, dataset_id, metadata_label, event_date, log_file, run_uuid, user, script_start_time):
-    """Load DataFrame to PostgreSQL table with datasetid, metadata, and date, handling empty files."""
+def create_stage_table(cur, target_table, dataset_id, columns):
+    """Create an UNLOGGED all-TEXT staging table for one dataset next to target_table and return its name."""
+    schema, table = target_table.split('.')
+    stage_table = f'{schema}."{f"{table}_stage_{dataset_id}"[-63:]}"'
+    cur.execute(f"""
+        CREATE UNLOGGED TABLE {stage_table} (
+            {', '.join(f'"{col}" TEXT' for col in columns)}
+        );
+    """)
+    return stage_table
+
+def merge_stage_table(cur, stage_table, target_table, columns, column_types):
+    """Truncate and cast staged rows in SQL, move them into target_table with one INSERT ... SELECT, and drop the stage.
+
+    Returns (rows inserted, {column: values truncated}).
+    """
+    select_list = []
+    truncation_checks = []
+    for col in columns:
+        col_type = column_types.get(col, 'text')
+        match = re.fullmatch(r'character varying\((\d+)\)', col_type)
+        if match:
+            select_list.append(f'LEFT(s."{col}", {match.group(1)})')
+            truncation_checks.append((col, f'COUNT(*) FILTER (WHERE LENGTH(s."{col}") > {match.group(1)})'))
+        elif col_type in ('text', 'character varying'):
+            select_list.append(f's."{col}"')
+        else:
+            # Empty strings mean missing values for typed columns; anything else that does not cast fails the load
+            select_list.append(f'CAST(NULLIF(s."{col}", \'\') AS {col_type})')
+
+    truncated_counts = {}
+    if truncation_checks:
+        cur.execute(f"SELECT {', '.join(check for _, check in truncation_checks)} FROM {stage_table} s;")
+        counts = cur.fetchone()
+        truncated_counts = {col: count for (col, _), count in zip(truncation_checks, counts) if count}
+
+    cur.execute(f"""
+        INSERT INTO {target_table} ({', '.join(f'"{col}"' for col in columns)})
+        SELECT {', '.join(select_list)}
+        FROM {stage_table} s;
+    """)
+    inserted = cur.rowcount
+    cur.execute(f"DROP TABLE {stage_table};")
+    return inserted, truncated_counts
+
+def load_data_to_postgres(data, config, dataset_id, metadata_label, event_date, log_file, run_uuid, user, script_start_time, schema_lock=None, cache=None,
+                          dataset_date=None, timings=None, source_column_lengths=None, source_column_types=None):
+    """Load a DataFrame, or an iterable of DataFrame chunks, to PostgreSQL with datasetid, metadata, and date, handling empty files.
+
+    All chunks are written in a single transaction, so a failed chunk leaves no rows behind.
+    schema_lock serializes the column sync when several files load into the same table concurrently.
+    With staged_load set, chunks go to an UNLOGGED staging table first and reach target_table through a
+    single INSERT ... SELECT committed together with the dataset's activation and the deactivation of the
+    datasets it replaces; process_file inserts such datasets inactive.
+    With partition_by set, the range partition for this dataset is created first if needed; dataset_date
+    fills the datasetdate column of tables partitioned by date.
+    timings, if given, is charged with the schema_sync and load stages; reading further chunks of a
+    streamed CSV happens inside the load loop and counts as load.
+    source_column_lengths and source_column_types, keyed by source column, size and (with infer_types) type
+    columns added to the table; pass them for chunked sources so later chunks count too. Without them the
+    first chunk is measured and typed.
+    """
+    cache = cache or MetadataCache()
+    timings = timings or ImportTimings()
+    target_table = config["target_table"]
+    load_method = config.get("load_method") or "COPY"
+    staged = bool(config.get("staged_load"))
+    infer_types = bool(config.get("infer_types"))
+    chunks = iter([data]) if isinstance(data, pd.DataFrame) else iter(data)
     try:
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            first_chunk = pd.DataFrame()
         with psycopg2.connect(**DB_PARAMS) as conn:
             with conn.cursor() as cur:
-                # Get table columns and their lengths
-                table_columns = get_table_columns(cur, target_table, log_file, run_uuid, user, script_start_time)
-                table_columns_lower = [col.lower() for col in table_columns]
-                table_column_lengths = get_table_column_lengths(cur, target_table, log_file, run_uuid, user, script_start_time)
-                log_message(log_file, "DataLoadPrep", f"Table columns for {target_table}: {', '.join(table_columns)}",
-                            run_uuid=run_uuid, stepcounter="DataLoadPrep_0", user=user, script_start_time=script_start_time)
-                
                 # Convert DataFrame column names to lowercase
-                column_map = {col: col.lower().replace(' ', '_').replace('-', '_') for col in df.columns}
-                df = df.rename(columns=column_map)
-                df_columns = list(df.columns)
+                column_map = {col: col.lower().replace(' ', '_').replace('-', '_') for col in first_chunk.columns}
+                df_columns = list(column_map.values())
                 log_message(log_file, "DataLoadPrep", f"Source columns after lowercase: {', '.join(df_columns)}",
                             run_uuid=run_uuid, stepcounter="DataLoadPrep_1", user=user, script_start_time=script_start_time)
                 
-                # Add datasetid (mandatory), and metadata/date only if columns exist in table
-                df["datasetid"] = dataset_id
-                if metadata_label and "metadata_label" in table_columns_lower:
-                    df["metadata_label"] = metadata_label
-                if event_date and "event_date" in table_columns_lower:
-                    df["event_date"] = event_date
+                timings.begin("schema_sync")
+                with schema_lock or contextlib.nullcontext():
+                    # Get table columns
+                    table_columns = cache.table_columns(cur, target_table, log_file, run_uuid, user, script_start_time)
+                    log_message(log_file, "DataLoadPrep", f"Table columns for {target_table}: {', '.join(table_columns)}",
+                                run_uuid=run_uuid, stepcounter="DataLoadPrep_0", user=user, script_start_time=script_start_time)
+                    
+                    # Update table schema with new columns before mapping so they are loaded in this run
+                    new_columns = [col for col in df_columns if col.lower() not in [tc.lower() for tc in table_columns]]
+                    if new_columns and config["importstrategyid"] == 1:
+                        if source_column_lengths is None:
+                            source_column_lengths = get_column_lengths(first_chunk)
+                        column_lengths = {column_map.get(col, col): length for col, length in source_column_lengths.items()}
+                        column_types = None
+                        if infer_types:
+                            if source_column_types is None:
+                                source_column_types = infer_column_types(first_chunk)
+                            column_types = {column_map.get(col, col): col_type for col, col_type in source_column_types.items()}
+                        if not add_columns_to_table(cur, target_table, new_columns, column_lengths, log_file, run_uuid, user, script_start_time,
+                                                    cache, column_types):
+                            log_message(log_file, "Error", f"Failed to update schema for {target_table} with new columns: {', '.join(new_columns)}",
+                                        run_uuid=run_uuid, stepcounter="DataLoadPrep_3", user=user, script_start_time=script_start_time)
+                            return False
+                        conn.commit()
+                        table_columns = cache.table_columns(cur, target_table, log_file, run_uuid, user, script_start_time)
+                    table_column_lengths = cache.table_column_lengths(cur, target_table, log_file, run_uuid, user, script_start_time)
+                    table_column_types = cache.table_column_types(cur, target_table, log_file, run_uuid, user, script_start_time) if infer_types else None
+                    if config.get("partition_by"):
+                        if not ensure_partition(cur, target_table, config["partition_by"], dataset_id, dataset_date or datetime.now().date(), cache,
+                                                log_file, run_uuid, user, script_start_time):
+                            return False
+                        conn.commit()
+                table_columns_lower = [col.lower() for col in table_columns]
                 
-                # Filter DataFrame to match table columns (case-insensitive)
-                matching_columns = []
+                # Filter source columns to match table columns (case-insensitive)
+                extra_columns = (["datasetid"] + (["metadata_label"] if metadata_label else []) + (["event_date"] if event_date else [])
+                                 + (["datasetdate"] if dataset_date else []))
                 column_mapping = {}
-                for col in df_columns + ["datasetid", "metadata_label", "event_date"]:
+                for col in df_columns + [col for col in extra_columns if col not in df_columns]:
                     col_lower = col.lower()
                     for table_col in table_columns:
                         if col_lower == table_col.lower():
-                            matching_columns.append(col)
                             column_mapping[col] = table_col
                             break
                 
-                if not matching_columns:
-                    log_message(log_file, "Error", f"No matching columns between source ({', '.join(df.columns)}) and table ({', '.join(table_columns)})",
+                if not column_mapping:
+                    log_message(log_file, "Error", f"No matching columns between source ({', '.join(df_columns)}) and table ({', '.join(table_columns)})",
                                 run_uuid=run_uuid, stepcounter="DataLoad_2", user=user, script_start_time=script_start_time)
                     return False
                 
-                log_message(log_file, "DataLoadPrep", f"Matching columns after mapping: {', '.join(matching_columns)}",
+                log_message(log_file, "DataLoadPrep", f"Matching columns after mapping: {', '.join(column_mapping)}",
                             run_uuid=run_uuid, stepcounter="DataLoadPrep_2", user=user, script_start_time=script_start_time)
                 
-                df = df[matching_columns].rename(columns=column_mapping)
+                # Write rows chunk by chunk with COPY, or executemany when the config asks for the fallback
+                timings.begin("load")
+                load_start_time = time.time()
+                write_table = target_table
+                if staged:
+                    write_table = create_stage_table(cur, target_table, dataset_id, list(column_mapping.values()))
+                    log_message(log_file, "DataLoadPrep", f"Staging rows for {target_table} in {write_table}",
+                                run_uuid=run_uuid, stepcounter="DataLoadPrep_Stage", user=user, script_start_time=script_start_time)
+                row_count = 0
+                chunk_count = 0
+                truncated_counts = {}
+                conversion_failures = {}
+                chunk = first_chunk
+                while chunk is not None:
+                    df = prepare_chunk(chunk, column_map, column_mapping, dataset_id, metadata_label, event_date,
+                                       table_columns_lower, table_column_lengths, truncated_counts, truncate=not staged,
+                                       table_column_types=table_column_types, conversion_failures=conversion_failures,
+                                       dataset_date=dataset_date)
+                    if not df.empty:
+                        if load_method == "INSERT":
+                            insert_dataframe(cur, df, write_table)
+                        else:
+                            copy_dataframe(cur, df, write_table)
+                        row_count += len(df)
+                    chunk_count += 1
+                    chunk = next(chunks, None)
                 
-                # Update table schema with new columns
-                new_columns = [col for col in df_columns if col.lower() not in [tc.lower() for tc in table_columns]]
-                if new_columns and config["importstrategyid"] == 1:
-                    column_lengths = get_column_lengths(df)
-                    if not add_columns_to_table(cur, target_table, new_columns, column_lengths, log_file, run_uuid, user, script_start_time):
-                        log_message(log_file, "Error", f"Failed to update schema for {target_table} with new columns: {', '.join(new_columns)}",
-                                    run_uuid=run_uuid, stepcounter="DataLoadPrep_3", user=user, script_start_time=script_start_time)
-                        return False
-                    conn.commit()
+                if staged:
+                    column_types = cache.table_column_types(cur, target_table, log_file, run_uuid, user, script_start_time)
+                    merge_start_time = time.time()
+                    row_count, truncated_counts = merge_stage_table(cur, write_table, target_table, list(column_mapping.values()), column_types)
+                    log_message(log_file, "DataLoad", f"Merged {row_count} staged rows into {target_table} in {time.time() - merge_start_time:.3f}s",
+                                run_uuid=run_uuid, stepcounter="DataLoad_Merge", user=user, script_start_time=script_start_time)
                 
-                # Check if DataFrame is empty
-                if df.empty:
-                    log_message(log_file, "Warning", f"CSV contains headers but no data rows for {target_table}. Columns processed: {', '.join(df.columns)}. Marking dataset as 'Empty'.",
-                                run_uuid=run_uuid, stepcounter="DataLoad_4", user=user, script_start_time=script_start_time)
-                    if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time):
-                        return False
-                    conn.commit()
-                    return True
+                for col, count in conversion_failures.items():
+                    log_message(log_file, "Warning", f"Loaded {count} values in column {col} as NULL because they do not convert to {table_column_types[col]}",
+                                run_uuid=run_uuid, stepcounter=f"DataLoad_Convert_{col}", user=user, script_start_time=script_start_time)
+                for col, count in truncated_counts.items():
+                    log_message(log_file, "Warning", f"Truncated {count} values in column {col} to {table_column_lengths.get(col.lower(), 255)} characters",
+                                run_uuid=run_uuid, stepcounter=f"DataLoad_Truncate_{col}", user=user, script_start_time=script_start_time)
                 
-                # Truncate values to fit column lengths
-                for col in df.columns:
-                    col_lower = col.lower()
-                    max_length = table_column_lengths.get(col_lower, 255)  # Default to 255 if unknown
-                    if max_length:
-                        # Convert to string and truncate
-                        df[col] = df[col].astype(str).str.slice(0, max_length)
-                        # Log any truncated values
-                        long_values = df[df[col].str.len() >= max_length][col]
-                        if not long_values.empty:
-                            log_message(log_file, "Warning", f"Truncated {len(long_values)} values in column {col} to {max_length} characters",
-                                        run_uuid=run_uuid, stepcounter=f"DataLoad_Truncate_{col}", user=user, script_start_time=script_start_time)
-                
-                # Convert DataFrame to list of tuples
-                records = [tuple(row) for row in df.to_numpy()]
-                if not records:
-                    log_message(log_file, "Warning", f"No records to insert into {target_table}. Columns processed: {', '.join(df.columns)}. Marking dataset as 'Empty'.",
-                                run_uuid=run_uuid, stepcounter="DataLoad_5", user=user, script_start_time=script_start_time)
-                    if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time):
+                # Mark the dataset as 'Empty' if no chunk carried data rows
+                if not row_count:
+                    log_message(log_file, "Warning", f"CSV contains headers but no data rows for {target_table}. Columns processed: {', '.join(column_mapping.values())}. Marking dataset as 'Empty'.",
+                                run_uuid=run_uuid, stepcounter="DataLoad_4", user=user, script_start_time=script_start_time)
+                    if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time, cache, activate=staged):
+                        conn.rollback()
                         return False
                     conn.commit()
                     return True
                 
-                # Prepare insert query
-                placeholders = ",".join(["%s"] * len(df.columns))
-                insert_query = f"""
-                    INSERT INTO {target_table} ({','.join(f'"{col}"' for col in df.columns)})
-                    VALUES ({placeholders})
-                """
-                
-                # Execute insert
-                log_message(log_file, "DataLoadPrep", f"Executing INSERT query for {len(records)} records into {target_table}",
-                            run_uuid=run_uuid, stepcounter="DataLoadPrep_4", user=user, script_start_time=script_start_time)
-                cur.executemany(insert_query, records)
+                # Staged rows become visible in the same commit that activates the dataset and retires the previous one
+                if staged and not update_dataset_datastatus(cur, dataset_id, 'Active', log_file, run_uuid, user, script_start_time, cache, activate=True):
+                    conn.rollback()
+                    return False
                 conn.commit()
-                log_message(log_file, "DataLoad", f"Loaded {len(records)} rows to {target_table} with columns: {', '.join(df.columns)}",
+                timings.count("load", rows=row_count)
+                load_seconds = time.time() - load_start_time
+                rows_per_second = row_count / load_seconds if load_seconds > 0 else float(row_count)
+                log_message(log_file, "DataLoad", f"Loaded {row_count} rows in {chunk_count} chunk(s) to {target_table} with columns: {', '.join(column_mapping.values())}",
                             run_uuid=run_uuid, stepcounter="DataLoad_0", user=user, script_start_time=script_start_time)
+                log_message(log_file, "DataLoad", f"{load_method} throughput for {target_table}: {row_count} rows in {load_seconds:.3f}s ({rows_per_second:.1f} rows/sec)",
+                            run_uuid=run_uuid, stepcounter="DataLoad_Throughput", user=user, script_start_time=script_start_time)
                 return True
     except psycopg2.Error as e:
         log_message(log_file, "Error", f"Database error loading to {target_table}: {str(e)}\n{traceback.format_exc()}",
@@ -489,6 +927,398 @@ def load_data_to_postgres(df, target_table, dataset_id, metadata_label, event_da
                     run_uuid=run_uuid, stepcounter="DataLoad_5", user=user, script_start_time=script_start_time)
         return False
 
+def archive_file(file_path, config, log_file, run_uuid, user, script_start_time):
+    """Move a processed file to the archive directory, readable by etl_group. Returns True on success."""
+    filename = os.path.basename(file_path)
+    archive_path = os.path.join(config["archive_directory"], filename)
+    try:
+        shutil.move(file_path, archive_path)
+        os.chmod(archive_path, 0o660)
+        try:
+            group_id = grp.getgrnam('etl_group').gr_gid
+            os.chown(archive_path, os.getuid(), group_id)
+            log_message(log_file, "Processing", f"Moved {filename} to {archive_path}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_12", user=user, script_start_time=script_start_time)
+        except KeyError:
+            log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {archive_path}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
+        return True
+    except Exception as e:
+        log_message(log_file, "Error", f"Failed to move {filename} to archive: {str(e)}\n{traceback.format_exc()}",
+                    run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
+        return False
+
+def file_sha256(file_path):
+    """Return the hex SHA-256 digest and size in bytes of a file, reading it in fixed-size blocks."""
+    digest = hashlib.sha256()
+    file_size = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+            file_size += len(block)
+    return digest.hexdigest(), file_size
+
+def find_unchanged_source(cursor, config_id, datasource_id, dataset_type_id, label, content_hash, log_file, run_uuid, user, script_start_time):
+    """Return the row-holding datasetid if the latest active dataset for this label was imported from identical content, else None."""
+    try:
+        cursor.execute("""
+            SELECT f.contenthash, f.sourcedatasetid
+            FROM dba.tdataset d
+            LEFT JOIN dba.timportfingerprint f ON f.datasetid = d.datasetid AND f.config_id = %s
+            WHERE d.datasourceid = %s
+              AND d.datasettypeid = %s
+              AND d.label = %s
+              AND d.isactive = TRUE
+            ORDER BY d.datasetdate DESC, d.datasetid DESC
+            LIMIT 1;
+        """, (config_id, datasource_id, dataset_type_id, label))
+        row = cursor.fetchone()
+        if row and row[0] == content_hash:
+            return row[1]
+        return None
+    except psycopg2.Error as e:
+        log_message(log_file, "Error", f"Failed to look up fingerprint for label {label}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Fingerprint_0", user=user, script_start_time=script_start_time)
+        return None
+
+def record_fingerprint(cursor, config_id, filename, content_hash, file_size, dataset_id, source_dataset_id, log_file, run_uuid, user, script_start_time):
+    """Record a file's content hash against its dataset in dba.timportfingerprint."""
+    try:
+        cursor.execute("""
+            INSERT INTO dba.timportfingerprint (config_id, filename, contenthash, filesize, datasetid, sourcedatasetid, createdby)
+            VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """, (config_id, filename, content_hash, file_size, dataset_id, source_dataset_id, user))
+        log_message(log_file, "Fingerprint", f"Recorded sha256 {content_hash} for {filename} on datasetid {dataset_id} (rows in datasetid {source_dataset_id})",
+                    run_uuid=run_uuid, stepcounter="Fingerprint_1", user=user, script_start_time=script_start_time)
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Error", f"Failed to record fingerprint for {filename}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Fingerprint_2", user=user, script_start_time=script_start_time)
+        return False
+
+def process_file(file_path, config, cache, schema_lock, dataset_lock, log_file, run_uuid, user, script_start_time, timings=None):
+    """Validate, convert, parse and load a single matched file, then archive it. Returns True on success.
+
+    Stage timings, rows and bytes are recorded in timings; the caller finishes them once this returns.
+    """
+    filename = os.path.basename(file_path)
+    file_success = True
+    timings = timings or ImportTimings(filename)
+    timings.begin("discovery")
+    log_message(log_file, "Processing", f"Processing file: {filename}",
+                run_uuid=run_uuid, stepcounter=f"File_{filename}_0", user=user, script_start_time=script_start_time)
+
+    # Parse date from filename
+    date_string = parse_metadata(filename, config, config["dateconfig"], config["datelocation"], config["delimiter"], log_file, run_uuid, user, script_start_time)
+    if date_string:
+        try:
+            dataset_date = datetime.strptime(date_string, '%Y%m%dT%H%M%S').date()
+            log_message(log_file, "Processing", f"Parsed dataset_date {dataset_date} from filename '{filename}'",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_Date", user=user, script_start_time=script_start_time)
+        except ValueError as e:
+            log_message(log_file, "Error", f"Failed to parse date '{date_string}' with format {config['dateformat']}: {str(e)}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_Date", user=user, script_start_time=script_start_time)
+            dataset_date = datetime.now().date()
+    else:
+        dataset_date = datetime.now().date()
+
+    # Parse label
+    label = parse_metadata(filename, config, config["metadata_label_source"], config["metadata_label_location"], config["delimiter"], log_file, run_uuid, user, script_start_time)
+    if not label:
+        label = config["config_name"]
+
+    # Fingerprint the file so byte-identical repeats can skip the load
+    content_hash, file_size = None, None
+    if config.get("skip_unchanged"):
+        try:
+            content_hash, file_size = file_sha256(file_path)
+        except OSError as e:
+            log_message(log_file, "Warning", f"Failed to hash {filename}, loading it in full: {str(e)}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_Hash", user=user, script_start_time=script_start_time)
+    if file_size:
+        timings.count("discovery", nbytes=file_size)
+    try:
+        source_bytes = file_size or os.path.getsize(file_path)
+    except OSError:
+        source_bytes = 0
+
+    source_dataset_id = None
+    # Staged loads keep the dataset inactive, and the previous one active, until the merge commits
+    staged = bool(config.get("staged_load"))
+    with psycopg2.connect(**DB_PARAMS) as conn:
+        with conn.cursor() as cur:
+            try:
+                with dataset_lock:
+                    datasource_id, dataset_type_id = cache.lookup_ids(cur, config["datasource"], config["datasettype"], user, log_file, run_uuid, script_start_time)
+                    if not datasource_id or not dataset_type_id:
+                        log_message(log_file, "Error", f"Failed to ensure lookup IDs for file {filename}. Skipping.",
+                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_1", user=user, script_start_time=script_start_time)
+                        file_success = False
+                        return file_success
+
+                    # Compare against the latest active dataset before update_dataset_status deactivates it
+                    if content_hash:
+                        source_dataset_id = find_unchanged_source(cur, config["config_id"], datasource_id, dataset_type_id, label, content_hash,
+                                                                  log_file, run_uuid, user, script_start_time)
+
+                    dataset_id = insert_dataset(cur, config["config_name"], dataset_date, label, datasource_id, dataset_type_id, log_file, run_uuid, user, script_start_time,
+                                                active=not staged)
+                    if not dataset_id:
+                        log_message(log_file, "Error", f"Failed to create dataset for file {filename}. Skipping.",
+                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_2", user=user, script_start_time=script_start_time)
+                        file_success = False
+                        return file_success
+                    timings.dataset_id = dataset_id
+                    conn.commit()
+
+                    if not staged:
+                        update_dataset_status(cur, dataset_id, datasource_id, dataset_type_id, label, dataset_date, log_file, run_uuid, user, script_start_time)
+                        conn.commit()
+
+                    # Fall back to a full load if the dataset cannot be marked Unchanged
+                    if source_dataset_id and not (
+                            update_dataset_datastatus(cur, dataset_id, 'Unchanged', log_file, run_uuid, user, script_start_time, cache, activate=staged)
+                            and record_fingerprint(cur, config["config_id"], filename, content_hash, file_size, dataset_id, source_dataset_id,
+                                                   log_file, run_uuid, user, script_start_time)):
+                        conn.rollback()
+                        source_dataset_id = None
+                    conn.commit()
+            except Exception as e:
+                log_message(log_file, "Error", f"Unexpected error in dataset setup for {filename}: {str(e)}\n{traceback.format_exc()}",
+                            run_uuid=run_uuid, stepcounter=f"File_{filename}_3", user=user, script_start_time=script_start_time)
+                file_success = False
+                return file_success
+
+    if source_dataset_id:
+        log_message(log_file, "Processing", f"{filename} is identical to the file loaded as datasetid {source_dataset_id}; recorded datasetid {dataset_id} as 'Unchanged' without reloading rows",
+                    run_uuid=run_uuid, stepcounter=f"File_{filename}_Unchanged", user=user, script_start_time=script_start_time)
+        timings.begin("archive")
+        timings.count("archive", nbytes=source_bytes)
+        return archive_file(file_path, config, log_file, run_uuid, user, script_start_time)
+
+    # Parse workbooks once; the invalid-event check and the load both use this frame
+    excel_df = None
+    if config["file_type"] in ["XLS", "XLSX"]:
+        timings.begin("conversion")
+        try:
+            excel_df, engine = read_excel_file(file_path)
+            timings.count("conversion", rows=len(excel_df), nbytes=source_bytes)
+            log_message(log_file, "Conversion", f"Parsed {filename} with {engine}: {len(excel_df)} rows",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_5", user=user, script_start_time=script_start_time)
+            timings.begin("validation")
+            is_invalid, is_readable = is_invalid_event_frame(excel_df, file_path, log_file, run_uuid, user, script_start_time)
+        except Exception as e:
+            log_message(log_file, "Warning", f"Failed to read XLS {file_path} with openpyxl or xlrd: {str(e)}. Treating as empty dataset.",
+                        run_uuid=run_uuid, stepcounter="FileValidation_1", user=user, script_start_time=script_start_time)
+            is_invalid, is_readable = False, False
+        if is_invalid or not is_readable:
+            timings.begin("archive")
+            timings.count("archive", nbytes=source_bytes)
+            with psycopg2.connect(**DB_PARAMS) as conn:
+                with conn.cursor() as cur:
+                    if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time, cache, activate=staged):
+                        file_success = False
+                    elif not archive_file(file_path, config, log_file, run_uuid, user, script_start_time):
+                        file_success = False
+                    conn.commit()
+            return file_success
+
+    csv_path = file_path
+    if excel_df is not None and os.environ.get(DEBUG_CSV_ENV) == "1":
+        timings.begin("conversion")
+        debug_csv_path = LOG_DIR / f"{os.path.splitext(filename)[0]}.csv"
+        try:
+            write_csv(excel_df, debug_csv_path)
+            log_message(log_file, "Debug", f"Wrote debug CSV {debug_csv_path} for {filename}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_XLS2CSV_0", user=user, script_start_time=script_start_time)
+        except Exception as e:
+            log_message(log_file, "Warning", f"Failed to write debug CSV {debug_csv_path}: {str(e)}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_XLS2CSV_1", user=user, script_start_time=script_start_time)
+
+    timings.begin("parse")
+    chunk_size = config.get("chunk_size")
+    reader = None
+    try:
+        if excel_df is not None:
+            df = excel_df
+        elif chunk_size:
+            # Streaming mode: keep only one chunk of the source in memory at a time
+            reader = pd.read_csv(csv_path, chunksize=chunk_size)
+            df = next(reader, pd.DataFrame())
+        else:
+            df = pd.read_csv(csv_path)
+        if excel_df is None:
+            # Streamed files are read during the load; only the first chunk is parsed here
+            timings.count("parse", rows=len(df) if reader is None else 0, nbytes=source_bytes)
+        if df.empty and df.columns.empty:
+            log_message(log_file, "Warning", f"CSV {csv_path} has no headers or data. Marking dataset as 'Empty' and archiving.",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_8", user=user, script_start_time=script_start_time)
+            timings.begin("archive")
+            timings.count("archive", nbytes=source_bytes)
+            with psycopg2.connect(**DB_PARAMS) as conn:
+                with conn.cursor() as cur:
+                    if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time, cache, activate=staged):
+                        file_success = False
+                    elif not archive_file(file_path, config, log_file, run_uuid, user, script_start_time):
+                        file_success = False
+                    conn.commit()
+            if reader is not None:
+                reader.close()
+            return file_success
+        if reader is not None:
+            log_message(log_file, "Processing", f"Streaming {csv_path} in chunks of {chunk_size} rows; first chunk has {len(df)} rows with columns: {', '.join(df.columns)}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_7", user=user, script_start_time=script_start_time)
+        else:
+            log_message(log_file, "Processing", f"Read {len(df)} rows from {csv_path} with columns: {', '.join(df.columns)}",
+                        run_uuid=run_uuid, stepcounter=f"File_{filename}_7", user=user, script_start_time=script_start_time)
+        
+        # Validate data for long values; streamed files are measured (and typed) over every chunk, not just the first
+        timings.begin("validation")
+        column_types = None
+        if reader is not None:
+            column_lengths, column_types = scan_columns(csv_path, chunk_size, config.get("infer_types"))
+        else:
+            column_lengths = get_column_lengths(df)
+        for col, length in column_lengths.items():
+            if length > 1000:
+                log_message(log_file, "Warning", f"Column {col} has maximum length {length} exceeding 1000 characters. Values may be truncated.",
+                            run_uuid=run_uuid, stepcounter=f"File_{filename}_Validate_{col}", user=user, script_start_time=script_start_time)
+        
+        log_message(log_file, "Processing", f"Computed column lengths: {column_lengths}",
+                    run_uuid=run_uuid, stepcounter=f"File_{filename}_9", user=user, script_start_time=script_start_time)
+    except Exception as e:
+        log_message(log_file, "Error", f"Failed to read CSV {csv_path}: {str(e)}\n{traceback.format_exc()}",
+                    run_uuid=run_uuid, stepcounter=f"File_{filename}_8", user=user, script_start_time=script_start_time)
+        file_success = False
+        if reader is not None:
+            reader.close()
+        return file_success
+
+    timings.begin("schema_sync")
+    with psycopg2.connect(**DB_PARAMS) as conn:
+        with conn.cursor() as cur:
+            try:
+                table_name = config["target_table"].split('.')[-1]
+                with schema_lock:
+                    if not cache.table_exists(cur, config["target_table"], log_file, run_uuid, user, script_start_time):
+                        if config["importstrategyid"] == 1:
+                            # Streamed files were typed from every chunk above
+                            if reader is None and config.get("infer_types"):
+                                column_types = infer_column_types(df)
+                            partition_by = config.get("partition_by")
+                            columns = []
+                            # The primary key of a partitioned table has to include the partition key
+                            columns.append(f'"{table_name}id" SERIAL' if partition_by else f'"{table_name}id" SERIAL PRIMARY KEY')
+                            columns.append('"datasetid" INT NOT NULL REFERENCES dba.tdataset(datasetid)')
+                            if partition_by == "datasetdate":
+                                columns.append('"datasetdate" DATE NOT NULL')
+                            for col in df.columns:
+                                col_lower = col.lower().replace(' ', '_').replace('-', '_')
+                                columns.append(f'"{col_lower}" {column_definition(col, column_lengths, column_types)}')
+                            if partition_by:
+                                columns.append(f'PRIMARY KEY ("{table_name}id", "{partition_by}")')
+                            create_query = f"""
+                                CREATE TABLE {config["target_table"]} (
+                                    {', '.join(columns)}
+                                ){f' PARTITION BY RANGE ("{partition_by}")' if partition_by else ''};
+                            """
+                            try:
+                                cur.execute(create_query)
+                                conn.commit()
+                                cache.invalidate_table(config["target_table"])
+                                log_message(log_file, "SchemaUpdate", f"Created table {config['target_table']} with columns: {table_name}id, datasetid, {', '.join(col.lower() for col in df.columns)}",
+                                            run_uuid=run_uuid, stepcounter="SchemaCreate_0", user=user, script_start_time=script_start_time)
+                            except psycopg2.Error as e:
+                                cache.invalidate_table(config["target_table"])
+                                log_message(log_file, "Error", f"Failed to create table {config['target_table']}: {str(e)}\n{traceback.format_exc()}",
+                                            run_uuid=run_uuid, stepcounter="SchemaCreate_1", user=user, script_start_time=script_start_time)
+                                file_success = False
+                                return file_success
+                        else:
+                            log_message(log_file, "Error", f"Table {config['target_table']} does not exist and importstrategyid {config['importstrategyid']} does not allow creation",
+                                        run_uuid=run_uuid, stepcounter="SchemaCheck_0", user=user, script_start_time=script_start_time)
+                            file_success = False
+                            return file_success
+
+                table_columns = cache.table_columns(cur, config["target_table"], log_file, run_uuid, user, script_start_time)
+                source_columns = list(df.columns)
+                log_message(log_file, "SchemaCheck", f"Table columns: {', '.join(table_columns)}",
+                            run_uuid=run_uuid, stepcounter="SchemaCheck_1", user=user, script_start_time=script_start_time)
+                log_message(log_file, "SchemaCheck", f"Source columns: {', '.join(source_columns)}",
+                            run_uuid=run_uuid, stepcounter="SchemaCheck_2", user=user, script_start_time=script_start_time)
+
+                metadata_label = parse_metadata(filename, config, config["metadata_label_source"],
+                                               config["metadata_label_location"], config["delimiter"],
+                                               log_file, run_uuid, user, script_start_time)
+                event_date = parse_metadata(filename, config, config["dateconfig"],
+                                            config["datelocation"], config["delimiter"],
+                                            log_file, run_uuid, user, script_start_time)
+
+                timings.begin("load")
+                log_message(log_file, "Processing", f"Calling load_data_to_postgres for {filename} with dataset_id {dataset_id}",
+                            run_uuid=run_uuid, stepcounter=f"File_{filename}_11", user=user, script_start_time=script_start_time)
+                if reader is not None:
+                    data = itertools.chain([df], reader)
+                elif chunk_size and len(df) > chunk_size:
+                    # Workbooks are already in memory; slicing still bounds each COPY buffer
+                    data = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+                else:
+                    data = df
+                loaded = load_data_to_postgres(data, config, dataset_id, metadata_label, event_date,
+                                               log_file, run_uuid, user, script_start_time, schema_lock, cache, dataset_date, timings,
+                                               source_column_lengths=column_lengths, source_column_types=column_types)
+                if reader is not None:
+                    reader.close()
+                if loaded:
+                    if content_hash and not record_fingerprint(cur, config["config_id"], filename, content_hash, file_size, dataset_id, dataset_id,
+                                                               log_file, run_uuid, user, script_start_time):
+                        log_message(log_file, "Warning", f"Loaded {filename} but could not record its fingerprint; the next identical file will be reloaded",
+                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_Fingerprint", user=user, script_start_time=script_start_time)
+                    conn.commit()
+                    timings.begin("archive")
+                    timings.count("archive", nbytes=source_bytes)
+                    if not archive_file(file_path, config, log_file, run_uuid, user, script_start_time):
+                        file_success = False
+                else:
+                    log_message(log_file, "Error", f"Failed to load data from {filename} to {config['target_table']}",
+                                run_uuid=run_uuid, stepcounter=f"File_{filename}_14", user=user, script_start_time=script_start_time)
+                    file_success = False
+            except Exception as e:
+                log_message(log_file, "Error", f"Unexpected error processing {filename}: {str(e)}\n{traceback.format_exc()}",
+                            run_uuid=run_uuid, stepcounter=f"File_{filename}_15", user=user, script_start_time=script_start_time)
+                file_success = False
+                return file_success
+
+    return file_success
+
+def record_import_timings(config_id, run_timings, file_timings, log_file, run_uuid, user, script_start_time):
+    """Write one dba.timportstagetiming row per file and one for the run. Returns True on success."""
+    records = [("file", t) for t in file_timings] + [("run", run_timings)]
+    values = [
+        (run_uuid, config_id, record_type, t.filename, t.dataset_id, t.success, t.files if record_type == "run" else None,
+         *(round(t.seconds[stage], 3) for stage in IMPORT_STAGES), round(t.total_seconds or 0, 3),
+         t.rows["load"], t.bytes["conversion"] + t.bytes["parse"], json.dumps(t.detail()))
+        for record_type, t in records
+    ]
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO dba.timportstagetiming (
+                        run_uuid, config_id, recordtype, filename, datasetid, success, filecount,
+                        discoveryseconds, validationseconds, conversionseconds, parseseconds, schemasyncseconds,
+                        loadseconds, archiveseconds, totalseconds, rowsloaded, bytesparsed, stagedetails
+                    ) VALUES %s
+                """, values)
+                conn.commit()
+        log_message(log_file, "Processing", f"Recorded stage timings for {len(file_timings)} file(s) and the run",
+                    run_uuid=run_uuid, stepcounter="StageTiming_0", user=user, script_start_time=script_start_time)
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to record stage timings: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="StageTiming_1", user=user, script_start_time=script_start_time)
+        return False
+
 def generic_import(config_id):
     """Generic import script to process files based on timportconfig."""
     script_start_time = time.time()
@@ -517,6 +1347,8 @@ def generic_import(config_id):
     ensure_directory_exists(config["source_directory"])
     ensure_directory_exists(config["archive_directory"])
 
+    run_timings = ImportTimings()
+    run_timings.begin("discovery")
     files = []
     try:
         regex_pattern = config["file_pattern"].replace('\\\\', '\\')
@@ -531,10 +1363,10 @@ def generic_import(config_id):
                 if os.path.isfile(full_path):
                     files.append(full_path)
                     log_message(log_file, "FileSearch", f"Matched file: {filename}",
-                                run_uuid=run_uuid, stepcounter=f"FileSearch_Match_{filename}", user=user, script_start_time=script_start_time)
+                                run_uuid=run_uuid, stepcounter=f"FileSearch_Match_{filename}", user=user, script_start_time=script_start_time, level="DEBUG")
             else:
                 log_message(log_file, "FileSearch", f"File {filename} does not match pattern {regex_pattern}",
-                            run_uuid=run_uuid, stepcounter=f"FileSearch_NoMatch_{filename}", user=user, script_start_time=script_start_time)
+                            run_uuid=run_uuid, stepcounter=f"FileSearch_NoMatch_{filename}", user=user, script_start_time=script_start_time, level="DEBUG")
         
         if not files:
             log_message(log_file, "Warning", f"No files found matching pattern {regex_pattern} in {config['source_directory']}",
@@ -552,268 +1384,45 @@ def generic_import(config_id):
                     run_uuid=run_uuid, stepcounter="FileSearch_4", user=user, script_start_time=script_start_time)
         return
 
-    success = True
-    dataset_ids = []
-    for file_path in files:
-        filename = os.path.basename(file_path)
-        file_success = True
-        log_message(log_file, "Processing", f"Processing file: {filename}",
-                    run_uuid=run_uuid, stepcounter=f"File_{filename}_0", user=user, script_start_time=script_start_time)
-
-        # Parse date from filename
-        date_string = parse_metadata(filename, config, config["dateconfig"], config["datelocation"], config["delimiter"], log_file, run_uuid, user, script_start_time)
-        if date_string:
-            try:
-                dataset_date = datetime.strptime(date_string, '%Y%m%dT%H%M%S').date()
-                log_message(log_file, "Processing", f"Parsed dataset_date {dataset_date} from filename '{filename}'",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_Date", user=user, script_start_time=script_start_time)
-            except ValueError as e:
-                log_message(log_file, "Error", f"Failed to parse date '{date_string}' with format {config['dateformat']}: {str(e)}",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_Date", user=user, script_start_time=script_start_time)
-                dataset_date = datetime.now().date()
-        else:
-            dataset_date = datetime.now().date()
-
-        # Parse label
-        label = parse_metadata(filename, config, config["metadata_label_source"], config["metadata_label_location"], config["delimiter"], log_file, run_uuid, user, script_start_time)
-        if not label:
-            label = config["config_name"]
-
-        with psycopg2.connect(**DB_PARAMS) as conn:
-            with conn.cursor() as cur:
+    run_timings.begin(None)
+    max_workers = max(1, config.get("max_workers") or 1)
+    cache = MetadataCache()
+    schema_lock = threading.Lock()
+    dataset_lock = threading.Lock()
+    # Each worker records into its own file's timings; they are finished and merged here once it returns
+    file_timings = {file_path: ImportTimings(os.path.basename(file_path)) for file_path in files}
+    results = []
+    if max_workers == 1 or len(files) == 1:
+        for file_path in files:
+            results.append(process_file(file_path, config, cache, schema_lock, dataset_lock, log_file, run_uuid, user, script_start_time,
+                                        file_timings[file_path]))
+            file_timings[file_path].finish(results[-1])
+    else:
+        log_message(log_file, "Processing", f"Processing {len(files)} files with {max_workers} workers",
+                    run_uuid=run_uuid, stepcounter="Processing_Workers", user=user, script_start_time=script_start_time)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(process_file, file_path, config, cache, schema_lock, dataset_lock,
+                                       log_file, run_uuid, user, script_start_time, file_timings[file_path]): file_path for file_path in files}
+            for future in as_completed(futures):
                 try:
-                    datasource_id, dataset_type_id = ensure_lookup_ids(cur, config["datasource"], config["datasettype"], user, log_file, run_uuid, script_start_time)
-                    if not datasource_id or not dataset_type_id:
-                        log_message(log_file, "Error", f"Failed to ensure lookup IDs for file {filename}. Skipping.",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_1", user=user, script_start_time=script_start_time)
-                        success = False
-                        file_success = False
-                        continue
-
-                    dataset_id = insert_dataset(cur, config["config_name"], dataset_date, label, datasource_id, dataset_type_id, log_file, run_uuid, user, script_start_time)
-                    if not dataset_id:
-                        log_message(log_file, "Error", f"Failed to create dataset for file {filename}. Skipping.",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_2", user=user, script_start_time=script_start_time)
-                        success = False
-                        file_success = False
-                        continue
-                    dataset_ids.append((dataset_id, datasource_id, dataset_type_id, label, dataset_date))
-                    conn.commit()
-
-                    update_dataset_status(cur, dataset_id, datasource_id, dataset_type_id, label, dataset_date, log_file, run_uuid, user, script_start_time)
-                    conn.commit()
+                    results.append(future.result())
                 except Exception as e:
-                    log_message(log_file, "Error", f"Unexpected error in dataset setup for {filename}: {str(e)}\n{traceback.format_exc()}",
-                                run_uuid=run_uuid, stepcounter=f"File_{filename}_3", user=user, script_start_time=script_start_time)
-                    success = False
-                    file_success = False
-                    continue
-
-        # Check if the file is an 'Invalid Event ID' file or unreadable
-        if config["file_type"] in ["XLS", "XLSX"]:
-            is_invalid, is_readable = is_invalid_event_file(file_path, log_file, run_uuid, user, script_start_time)
-            if is_invalid or not is_readable:
-                with psycopg2.connect(**DB_PARAMS) as conn:
-                    with conn.cursor() as cur:
-                        if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time):
-                            success = False
-                            file_success = False
-                        else:
-                            archive_path = os.path.join(config["archive_directory"], filename)
-                            try:
-                                shutil.move(file_path, archive_path)
-                                os.chmod(archive_path, 0o660)
-                                try:
-                                    group_id = grp.getgrnam('etl_group').gr_gid
-                                    os.chown(archive_path, os.getuid(), group_id)
-                                    log_message(log_file, "Processing", f"Moved {filename} to {archive_path}",
-                                                run_uuid=run_uuid, stepcounter=f"File_{filename}_12", user=user, script_start_time=script_start_time)
-                                except KeyError:
-                                    log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {archive_path}",
-                                                run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
-                            except Exception as e:
-                                log_message(log_file, "Error", f"Failed to move {filename} to archive: {str(e)}\n{traceback.format_exc()}",
-                                            run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
-                                success = False
-                                file_success = False
-                        conn.commit()
-                continue
-
-        csv_path = file_path
-        if config["file_type"] in ["XLS", "XLSX"]:
-            csv_path = os.path.splitext(file_path)[0] + '.csv'
-            try:
-                log_message(log_file, "Debug", f"Calling xls_to_csv for {file_path}, expected CSV: {csv_path}",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_XLS2CSV_0", user=user, script_start_time=script_start_time)
-                os.environ["PARENT_LOG_FILE"] = str(log_file)
-                xls_to_csv(file_path)
-                log_message(log_file, "Debug", f"Finished xls_to_csv call for {file_path}",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_XLS2CSV_1", user=user, script_start_time=script_start_time)
-                if not os.path.exists(csv_path):
-                    log_message(log_file, "Error", f"CSV not found at {csv_path} after xls_to_csv for {filename}",
-                                run_uuid=run_uuid, stepcounter=f"File_{filename}_4", user=user, script_start_time=script_start_time)
-                    success = False
-                    file_success = False
-                    continue
-                log_message(log_file, "Conversion", f"Converted {filename} to {csv_path}",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_5", user=user, script_start_time=script_start_time)
-            except Exception as e:
-                log_message(log_file, "Error", f"Conversion error for {filename}: {str(e)}\n{traceback.format_exc()}",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_6", user=user, script_start_time=script_start_time)
-                success = False
-                file_success = False
-                continue
-
-        try:
-            df = pd.read_csv(csv_path)
-            if df.empty and df.columns.empty:
-                log_message(log_file, "Warning", f"CSV {csv_path} has no headers or data. Marking dataset as 'Empty' and archiving.",
-                            run_uuid=run_uuid, stepcounter=f"File_{filename}_8", user=user, script_start_time=script_start_time)
-                with psycopg2.connect(**DB_PARAMS) as conn:
-                    with conn.cursor() as cur:
-                        if not update_dataset_empty_status(cur, dataset_id, log_file, run_uuid, user, script_start_time):
-                            success = False
-                            file_success = False
-                        else:
-                            archive_path = os.path.join(config["archive_directory"], filename)
-                            try:
-                                shutil.move(file_path, archive_path)
-                                os.chmod(archive_path, 0o660)
-                                try:
-                                    group_id = grp.getgrnam('etl_group').gr_gid
-                                    os.chown(archive_path, os.getuid(), group_id)
-                                    log_message(log_file, "Processing", f"Moved {filename} to {archive_path}",
-                                                run_uuid=run_uuid, stepcounter=f"File_{filename}_12", user=user, script_start_time=script_start_time)
-                                except KeyError:
-                                    log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {archive_path}",
-                                                run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
-                            except Exception as e:
-                                log_message(log_file, "Error", f"Failed to move {filename} to archive: {str(e)}\n{traceback.format_exc()}",
-                                            run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
-                                success = False
-                                file_success = False
-                        conn.commit()
-                if csv_path != file_path and os.path.exists(csv_path):
-                    try:
-                        os.remove(csv_path)
-                        log_message(log_file, "Processing", f"Removed temporary CSV {csv_path}",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_16", user=user, script_start_time=script_start_time)
-                    except Exception as e:
-                        log_message(log_file, "Error", f"Failed to remove temporary CSV {csv_path}: {str(e)}\n{traceback.format_exc()}",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_17", user=user, script_start_time=script_start_time)
-                continue
-            log_message(log_file, "Processing", f"Read {len(df)} rows from {csv_path} with columns: {', '.join(df.columns)}",
-                        run_uuid=run_uuid, stepcounter=f"File_{filename}_7", user=user, script_start_time=script_start_time)
-            
-            # Validate data for long values
-            column_lengths = get_column_lengths(df)
-            for col, length in column_lengths.items():
-                if length > 1000:
-                    log_message(log_file, "Warning", f"Column {col} has maximum length {length} exceeding 1000 characters. Values may be truncated.",
-                                run_uuid=run_uuid, stepcounter=f"File_{filename}_Validate_{col}", user=user, script_start_time=script_start_time)
-            
-            log_message(log_file, "Processing", f"Computed column lengths: {column_lengths}",
-                        run_uuid=run_uuid, stepcounter=f"File_{filename}_9", user=user, script_start_time=script_start_time)
-        except Exception as e:
-            log_message(log_file, "Error", f"Failed to read CSV {csv_path}: {str(e)}\n{traceback.format_exc()}",
-                        run_uuid=run_uuid, stepcounter=f"File_{filename}_8", user=user, script_start_time=script_start_time)
-            success = False
-            file_success = False
-            if csv_path != file_path and os.path.exists(csv_path):
-                os.remove(csv_path)
-            continue
+                    log_message(log_file, "Error", f"Worker failed for {os.path.basename(futures[future])}: {str(e)}\n{traceback.format_exc()}",
+                                run_uuid=run_uuid, stepcounter=f"File_{os.path.basename(futures[future])}_Worker", user=user, script_start_time=script_start_time)
+                    results.append(False)
+                file_timings[futures[future]].finish(results[-1])
+    success = all(results)
+    log_message(log_file, "Processing", f"Metadata cache served {cache.hits} lookups and queried the database {cache.misses} times",
+                run_uuid=run_uuid, stepcounter="Processing_MetadataCache", user=user, script_start_time=script_start_time)
 
-        with psycopg2.connect(**DB_PARAMS) as conn:
-            with conn.cursor() as cur:
-                try:
-                    table_name = config["target_table"].split('.')[-1]
-                    if not table_exists(cur, config["target_table"], log_file, run_uuid, user, script_start_time):
-                        if config["importstrategyid"] == 1:
-                            columns = []
-                            columns.append(f'"{table_name}id" SERIAL PRIMARY KEY')
-                            columns.append('"datasetid" INT NOT NULL REFERENCES dba.tdataset(datasetid)')
-                            for col in df.columns:
-                                col_lower = col.lower().replace(' ', '_').replace('-', '_')
-                                varchar_length = min(column_lengths.get(col, 1000), 4000)  # Default to 1000, cap at 4000
-                                columns.append(f'"{col_lower}" VARCHAR({varchar_length})')
-                            create_query = f"""
-                                CREATE TABLE {config["target_table"]} (
-                                    {', '.join(columns)}
-                                );
-                            """
-                            try:
-                                cur.execute(create_query)
-                                conn.commit()
-                                log_message(log_file, "SchemaUpdate", f"Created table {config['target_table']} with columns: {table_name}id, datasetid, {', '.join(col.lower() for col in df.columns)}",
-                                            run_uuid=run_uuid, stepcounter="SchemaCreate_0", user=user, script_start_time=script_start_time)
-                            except psycopg2.Error as e:
-                                log_message(log_file, "Error", f"Failed to create table {config['target_table']}: {str(e)}\n{traceback.format_exc()}",
-                                            run_uuid=run_uuid, stepcounter="SchemaCreate_1", user=user, script_start_time=script_start_time)
-                                success = False
-                                file_success = False
-                                continue
-                        else:
-                            log_message(log_file, "Error", f"Table {config['target_table']} does not exist and importstrategyid {config['importstrategyid']} does not allow creation",
-                                        run_uuid=run_uuid, stepcounter="SchemaCheck_0", user=user, script_start_time=script_start_time)
-                            success = False
-                            file_success = False
-                            continue
-
-                    table_columns = get_table_columns(cur, config["target_table"], log_file, run_uuid, user, script_start_time)
-                    source_columns = list(df.columns)
-                    log_message(log_file, "SchemaCheck", f"Table columns: {', '.join(table_columns)}",
-                                run_uuid=run_uuid, stepcounter="SchemaCheck_1", user=user, script_start_time=script_start_time)
-                    log_message(log_file, "SchemaCheck", f"Source columns: {', '.join(source_columns)}",
-                                run_uuid=run_uuid, stepcounter="SchemaCheck_2", user=user, script_start_time=script_start_time)
-
-                    metadata_label = parse_metadata(filename, config, config["metadata_label_source"],
-                                                   config["metadata_label_location"], config["delimiter"],
-                                                   log_file, run_uuid, user, script_start_time)
-                    event_date = parse_metadata(filename, config, config["dateconfig"],
-                                                config["datelocation"], config["delimiter"],
-                                                log_file, run_uuid, user, script_start_time)
-
-                    log_message(log_file, "Processing", f"Calling load_data_to_postgres for {filename} with dataset_id {dataset_id}",
-                                run_uuid=run_uuid, stepcounter=f"File_{filename}_11", user=user, script_start_time=script_start_time)
-                    if load_data_to_postgres(df, config["target_table"], dataset_id, metadata_label, event_date,
-                                            log_file, run_uuid, user, script_start_time):
-                        archive_path = os.path.join(config["archive_directory"], filename)
-                        try:
-                            shutil.move(file_path, archive_path)
-                            os.chmod(archive_path, 0o660)
-                            try:
-                                group_id = grp.getgrnam('etl_group').gr_gid
-                                os.chown(archive_path, os.getuid(), group_id)
-                                log_message(log_file, "Processing", f"Moved {filename} to {archive_path}",
-                                            run_uuid=run_uuid, stepcounter=f"File_{filename}_12", user=user, script_start_time=script_start_time)
-                            except KeyError:
-                                log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {archive_path}",
-                                            run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
-                        except Exception as e:
-                            log_message(log_file, "Error", f"Failed to move {filename} to archive: {str(e)}\n{traceback.format_exc()}",
-                                        run_uuid=run_uuid, stepcounter=f"File_{filename}_13", user=user, script_start_time=script_start_time)
-                            success = False
-                            file_success = False
-                    else:
-                        log_message(log_file, "Error", f"Failed to load data from {filename} to {config['target_table']}",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_14", user=user, script_start_time=script_start_time)
-                        success = False
-                        file_success = False
-                except Exception as e:
-                    log_message(log_file, "Error", f"Unexpected error processing {filename}: {str(e)}\n{traceback.format_exc()}",
-                                run_uuid=run_uuid, stepcounter=f"File_{filename}_15", user=user, script_start_time=script_start_time)
-                    success = False
-                    file_success = False
-                    continue
-
-                if csv_path != file_path and os.path.exists(csv_path):
-                    try:
-                        os.remove(csv_path)
-                        log_message(log_file, "Processing", f"Removed temporary CSV {csv_path}",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_16", user=user, script_start_time=script_start_time)
-                    except Exception as e:
-                        log_message(log_file, "Error", f"Failed to remove temporary CSV {csv_path}: {str(e)}\n{traceback.format_exc()}",
-                                    run_uuid=run_uuid, stepcounter=f"File_{filename}_17", user=user, script_start_time=script_start_time)
+    for timings in file_timings.values():
+        run_timings.merge(timings)
+        log_message(log_file, "Processing", f"Stage timings for {timings.filename}: {timings.summary()} (total {timings.total_seconds:.3f}s)",
+                    run_uuid=run_uuid, stepcounter=f"File_{timings.filename}_Timings", user=user, script_start_time=script_start_time)
+    run_timings.finish(success)
+    log_message(log_file, "Processing", f"Stage timings for {len(files)} file(s): {run_timings.summary()} (wall {run_timings.total_seconds:.3f}s)",
+                run_uuid=run_uuid, stepcounter="Processing_Timings", user=user, script_start_time=script_start_time)
+    record_import_timings(config_id, run_timings, list(file_timings.values()), log_file, run_uuid, user, script_start_time)
 
     log_message(log_file, "Finalization", f"Completed processing for config_id {config_id} with overall success={success}",
                 run_uuid=run_uuid, stepcounter="Finalization_0", user=user, script_start_time=script_start_time)
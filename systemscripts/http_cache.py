@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+
+# Default size limit for a cache directory; least recently used entries are removed beyond it
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Lookup outcomes counted in stats(): a 304 reply, a 200 reply with the cached body digest, and anything else
+CACHE_OUTCOMES = ("not_modified", "unchanged", "miss")
+
+def body_digest(text):
+    """SHA-256 hex digest of a response body, used to spot unchanged pages from servers that send no validators."""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+class HttpCache:
+    """On-disk HTTP cache keyed by URL, one JSON file per URL.
+
+    An entry holds the response's ETag and Last-Modified validators, the status code, a digest of the body and the
+    result the caller parsed from it, but not the body itself. fetch_url and fetch_url_async send the validators as
+    If-None-Match/If-Modified-Since and count a 304 as a hit; callers then reuse the stored result, and without
+    validators compare body_digest to the stored one before parsing again. Entries beyond max_bytes are removed
+    least recently used first, using file modification times as the usage order across runs. Thread-safe.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        os.makedirs(self.directory, exist_ok=True)
+        # {file name: size}, least recently used first
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json") and entry.is_file()]
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            size = entry.stat().st_size
+            self._index[entry.name] = size
+            self._total_bytes += size
+
+    def _name(self, url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json"
+
+    def get(self, url):
+        """Return the entry for url as a dict, or None; a returned entry becomes the most recently used."""
+        name = self._name(url)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name not in self._index:
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                self._remove(name)
+                return None
+            self._index.move_to_end(name)
+        return entry if entry.get("url") == url else None
+
+    def validators(self, url):
+        """Conditional request headers for url: If-None-Match and If-Modified-Since from the cached entry, if any."""
+        entry = self.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, headers, digest, result, status_code=200):
+        """Store the validators from response headers, the body digest and the parsed result for url."""
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        entry = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "status_code": status_code,
+            "digest": digest,
+            "result": result,
+            "stored_at": time.time()
+        }
+        data = json.dumps(entry).encode("utf-8")
+        name = self._name(url)
+        with self._lock:
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(temp_path, 0o660)
+                os.replace(temp_path, os.path.join(self.directory, name))
+            except OSError:
+                self._stats["write_errors"] += 1
+                return
+            self._total_bytes += len(data) - self._index.pop(name, 0)
+            self._index[name] = len(data)
+            self._stats["stores"] += 1
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                self._remove(next(iter(self._index)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, name):
+        """Drop an entry from the index and the disk; the caller holds the lock."""
+        self._total_bytes -= self._index.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def record(self, outcome):
+        """Count a lookup outcome, one of CACHE_OUTCOMES."""
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        """Lookup outcomes, stores, evictions, entry count and size so far."""
+        with self._lock:
+            stats = {outcome: self._stats[outcome] for outcome in CACHE_OUTCOMES}
+            stats.update(stores=self._stats["stores"], evictions=self._stats["evictions"], write_errors=self._stats["write_errors"],
+                         entries=len(self._index), bytes=self._total_bytes)
+        return stats
+
+    def summary(self):
+        """One-line hit/miss counts and cache size, for the run log."""
+        stats = self.stats()
+        lookups = sum(stats[outcome] for outcome in CACHE_OUTCOMES)
+        hits = stats["not_modified"] + stats["unchanged"]
+        hit_rate = hits / lookups if lookups else 0.0
+        return (f"{hits}/{lookups} hits ({hit_rate:.0%}: {stats['not_modified']} not modified, {stats['unchanged']} unchanged body), "
+                f"{stats['miss']} misses, {stats['stores']} stored, {stats['evictions']} evicted, "
+                f"{stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f} MB")
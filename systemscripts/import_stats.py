@@ -0,0 +1,74 @@
+import time
+
+# Stages timed for each imported file, in the order they run
+IMPORT_STAGES = ("discovery", "validation", "conversion", "parse", "schema_sync", "load", "archive")
+
+class ImportTimings:
+    """Wall-clock seconds, rows and bytes per import stage for one file, or for a whole run once merged.
+
+    A file's timings are recorded by the single worker that processes it: the first begin(stage) starts
+    the clock, each later one closes the previous stage, and finish() closes the last. Time spent in a nested
+    call is charged to whichever stage is current, so every second of the file lands in exactly one stage.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.dataset_id = None
+        self.success = None
+        self.seconds = dict.fromkeys(IMPORT_STAGES, 0.0)
+        self.rows = dict.fromkeys(IMPORT_STAGES, 0)
+        self.bytes = dict.fromkeys(IMPORT_STAGES, 0)
+        self.files = 0
+        self.started = None
+        self.total_seconds = None
+        self._stage = None
+        self._stage_started = None
+
+    def begin(self, stage):
+        """Close the current stage, if any, and start timing stage."""
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now
+        if self._stage:
+            self.seconds[self._stage] += now - self._stage_started
+        self._stage = stage
+        self._stage_started = now
+
+    def count(self, stage, rows=0, nbytes=0):
+        """Add rows and bytes handled by stage."""
+        self.rows[stage] += rows or 0
+        self.bytes[stage] += nbytes or 0
+
+    def finish(self, success):
+        """Close the current stage and record the outcome and total elapsed time."""
+        self.begin(None)
+        self.success = bool(success)
+        self.total_seconds = time.perf_counter() - self.started
+        return self
+
+    def merge(self, other):
+        """Add another file's stage totals into these (run) timings."""
+        for stage in IMPORT_STAGES:
+            self.seconds[stage] += other.seconds[stage]
+            self.rows[stage] += other.rows[stage]
+            self.bytes[stage] += other.bytes[stage]
+        self.files += 1
+
+    def detail(self):
+        """Per-stage seconds, rows and bytes as a JSON-serializable dict."""
+        return {stage: {"seconds": round(self.seconds[stage], 6), "rows": self.rows[stage], "bytes": self.bytes[stage]}
+                for stage in IMPORT_STAGES}
+
+    def summary(self):
+        """One-line summary of the stages that took time or handled data, for the run log."""
+        parts = []
+        for stage in IMPORT_STAGES:
+            if not (self.seconds[stage] or self.rows[stage] or self.bytes[stage]):
+                continue
+            part = f"{stage}={self.seconds[stage]:.3f}s"
+            if self.rows[stage]:
+                part += f"/{self.rows[stage]} rows"
+            if self.bytes[stage]:
+                part += f"/{self.bytes[stage]} bytes"
+            parts.append(part)
+        return ", ".join(parts)
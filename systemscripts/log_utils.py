@@ -1,9 +1,14 @@
 import csv
+import re
 import uuid
 import time
 from datetime import datetime
 import threading
+import queue
+import atexit
 import os
+import sys
+import traceback
 import psycopg2
 from psycopg2.extras import execute_values
 
@@ -21,37 +26,532 @@ DB_PARAMS = {
     "host": "localhost"
 }
 
+# Set to 0 to write every entry from the calling thread instead of the background writer
+LOG_ASYNC_ENV = "LOG_ASYNC"
+
+# Background writer limits: entries waiting before log_message blocks, rows per INSERT, seconds between flushes
+LOG_QUEUE_SIZE = 10000
+LOG_DB_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL = 1.0
+
+# Width of the processtype, stepcounter and username columns of dba.tlogentry; longer values are cut so one
+# entry cannot fail the whole batch
+TLOGENTRY_NAME_LENGTH = 50
+
+# Severity levels; an entry is written to a sink only if its level is at or above that sink's minimum
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+LOG_SINKS = ("csv", "txt", "db")
+
+# Level implied by the process type when log_message is called without one
+PROCESS_TYPE_LEVELS = {"Debug": "DEBUG", "Warning": "WARN", "Error": "ERROR"}
+
+# Environment overrides, applied on top of dba.tlogconfig:
+#   LOG_LEVEL=INFO                          minimum level for every sink and process type
+#   LOG_LEVELS=FileSearch=WARN,*:db=INFO    [processtype][:sink]=LEVEL rules
+#   LOG_SAMPLING=EventProcessing=0.1/600    processtype=samplerate[/maxperminute] for DEBUG/INFO entries
+LOG_LEVEL_ENV = "LOG_LEVEL"
+LOG_LEVELS_ENV = "LOG_LEVELS"
+LOG_SAMPLING_ENV = "LOG_SAMPLING"
+
+# Seconds between reloads of dba.tlogconfig
+LOG_CONFIG_REFRESH = 300
+# Seconds before retrying a failed reload; doubles with each failure up to LOG_CONFIG_REFRESH
+LOG_CONFIG_RETRY = 15
+
+# Define column order for CSV
+CSV_COLUMNS = [
+    "log_id",
+    "timestamp",
+    "run_uuid",
+    "process_type",
+    "stepcounter",
+    "user",
+    "step_runtime",
+    "total_runtime",
+    "message",
+    "level"
+]
+
+TXT_HEADER = (
+    "run_uuid | timestamp | process_type | message\n"
+    "------------------------------------|---------------------|------------------|--------------------------------\n"
+)
+
+class LogWriter:
+    """Writes log entries to the CSV/TXT files and dba.tlogentry.
+
+    File handles stay open for the life of the writer and are flushed after every batch.
+    Database rows are inserted in batches of up to LOG_DB_BATCH_SIZE over one reused connection.
+    With start() the writer drains a bounded queue from a daemon thread; write() can also be called directly.
+    The thread reports errors to stderr and keeps going, so a log file it cannot open costs only its own entries.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self.files = {}
+        self.conn = None
+        self.pending = []
+        self.thread = None
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        last_flush = time.time()
+        while True:
+            timeout = max(0.0, LOG_FLUSH_INTERVAL - (time.time() - last_flush))
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            batch = []
+            done = []
+            # Drain whatever else is already waiting so it shares one file flush and one INSERT
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    done.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= LOG_DB_BATCH_SIZE:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            try:
+                if batch:
+                    errors = []
+                    self.write(batch, flush_db=False, errors=errors)
+                    for log_file, e in errors:
+                        self._report(f"Failed to write log entry to {log_file}: {e}")
+                if done or len(self.pending) >= LOG_DB_BATCH_SIZE or time.time() - last_flush >= LOG_FLUSH_INTERVAL:
+                    self.flush_db()
+                    last_flush = time.time()
+            except Exception:
+                self._report(f"Log writer error:\n{traceback.format_exc()}")
+            finally:
+                for event in done:
+                    event.set()
+
+    def _report(self, message):
+        """Report a failure of the writer itself, which has no log to write it to."""
+        try:
+            sys.stderr.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | LogWriter | {message}\n")
+            sys.stderr.flush()
+        except Exception:
+            pass
+
+    def _handles(self, log_file):
+        handles = self.files.get(log_file)
+        if handles is None:
+            csv_file = f"{log_file}.csv"
+            txt_file = f"{log_file}.txt"
+            csv_handle = open(csv_file, "a", newline="")
+            txt_handle = open(txt_file, "a")
+            os.chmod(csv_file, 0o660)
+            os.chmod(txt_file, 0o660)
+            writer = csv.DictWriter(csv_handle, fieldnames=CSV_COLUMNS)
+            if csv_handle.tell() == 0:
+                writer.writeheader()
+            if txt_handle.tell() == 0:
+                txt_handle.write(TXT_HEADER)
+            handles = self.files[log_file] = (csv_handle, writer, txt_handle)
+        return handles
+
+    def write(self, entries, flush_db=True, errors=None):
+        """Append entries to their log files and queue them for dba.tlogentry.
+
+        An entry whose log file cannot be opened or written raises, unless errors is a list: then
+        (log_file, exception) is appended to it and the remaining entries are still written.
+        """
+        with self.lock:
+            touched = set()
+            for log_file, log_entry, sinks in entries:
+                try:
+                    csv_handle, writer, txt_handle = self._handles(log_file)
+                except Exception as e:
+                    if errors is None:
+                        raise
+                    errors.append((log_file, e))
+                    continue
+                try:
+                    if "csv" in sinks:
+                        writer.writerow(log_entry)
+                    if "txt" in sinks:
+                        txt_handle.write(
+                            f"{log_entry['run_uuid']} | {log_entry['timestamp']} | {log_entry['process_type']} | {log_entry['message']}\n"
+                        )
+                except Exception as e:
+                    if errors is None:
+                        raise
+                    errors.append((log_file, e))
+                touched.add(log_file)
+                if "db" in sinks:
+                    self.pending.append((log_file, log_entry))
+            for log_file in touched:
+                csv_handle, _, txt_handle = self.files[log_file]
+                csv_handle.flush()
+                txt_handle.flush()
+        if flush_db:
+            self.flush_db()
+
+    def flush_db(self):
+        """Insert pending entries into dba.tlogentry in batches."""
+        with self.lock:
+            while self.pending:
+                batch = self.pending[:LOG_DB_BATCH_SIZE]
+                try:
+                    if self.conn is None or self.conn.closed:
+                        self.conn = psycopg2.connect(**DB_PARAMS)
+                    with self.conn.cursor() as cur:
+                        execute_values(cur, """
+                            INSERT INTO dba.tlogentry (
+                                run_uuid, timestamp, processtype, stepcounter,
+                                username, stepruntime, totalruntime, message, loglevel, sourcelogid
+                            )
+                            VALUES %s
+                        """, [(
+                            log_entry["run_uuid"],
+                            log_entry["timestamp"],
+                            log_entry["process_type"][:TLOGENTRY_NAME_LENGTH],
+                            (log_entry["stepcounter"] or "")[:TLOGENTRY_NAME_LENGTH],
+                            (log_entry["user"] or "")[:TLOGENTRY_NAME_LENGTH],
+                            float(log_entry["step_runtime"]),
+                            float(log_entry["total_runtime"]),
+                            log_entry["message"],
+                            log_entry["level"],
+                            log_entry["log_id"]
+                        ) for _, log_entry in batch], page_size=LOG_DB_BATCH_SIZE)
+                    self.conn.commit()
+                except Exception as e:
+                    # Log database error to TXT file as fallback; the batch is dropped so one bad row cannot block the queue
+                    try:
+                        if self.conn is not None and not self.conn.closed:
+                            self.conn.rollback()
+                    except psycopg2.Error:
+                        pass
+                    for log_file in {log_file for log_file, _ in batch}:
+                        try:
+                            _, _, txt_handle = self._handles(log_file)
+                            txt_handle.write(f"{batch[0][1]['run_uuid']} | {batch[0][1]['timestamp']} | Error | Failed to log {len(batch)} entries to PostgreSQL: {str(e)}\n")
+                            txt_handle.flush()
+                        except Exception as txt_error:
+                            self._report(f"Failed to log {len(batch)} entries to PostgreSQL ({str(e)}) or to {log_file}: {txt_error}")
+                finally:
+                    del self.pending[:len(batch)]
+
+    def running(self):
+        """Whether the background thread is there to drain the queue."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def flush(self, timeout=None):
+        """Block until everything queued before this call is written to the files and the database."""
+        if not self.running():
+            # Without the thread, write whatever it left in the queue from the calling thread
+            entries = []
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                else:
+                    entries.append(item)
+            errors = []
+            self.write(entries, flush_db=False, errors=errors)
+            for log_file, e in errors:
+                self._report(f"Failed to write log entry to {log_file}: {e}")
+            self.flush_db()
+            return True
+        event = threading.Event()
+        self.queue.put(event)
+        return event.wait(timeout)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            for csv_handle, _, txt_handle in self.files.values():
+                csv_handle.close()
+                txt_handle.close()
+            self.files.clear()
+            if self.conn is not None and not self.conn.closed:
+                self.conn.close()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def _get_writer():
+    """Return this process's writer, starting a new one after a fork or on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = LogWriter()
+            if os.environ.get(LOG_ASYNC_ENV, "1") != "0":
+                _writer.start()
+        return _writer
+
+def flush_logs(timeout=None):
+    """Wait until every entry logged so far has been written. Returns False if the timeout expired first."""
+    return _get_writer().flush(timeout)
+
+_log_rules = None
+_log_rules_due = 0.0
+_log_rules_failures = 0
+_log_rules_reloading = False
+_log_policies = {}
+_log_config_lock = threading.Lock()
+_log_config_load_lock = threading.Lock()
+_sampling_state = {}
+_sampling_lock = threading.Lock()
+
+def stepcounter_template(stepcounter):
+    """Replace the per-item parts of a stepcounter (IDs, file names) with '*', e.g. event_123_append -> event_*_append.
+
+    Any '_'-separated part containing a digit or a '.' is replaced. dba.fstepcountertemplate applies the same
+    rule in SQL for the dba.tsteplatencydaily rollup; keep the two in step.
+    """
+    return re.sub(r"[^_]*[0-9.][^_]*", "*", stepcounter or "")
+
+def _parse_level(level):
+    level = (level or "").strip().upper()
+    return "WARN" if level == "WARNING" else level
+
+def _env_log_rules():
+    """Rules from LOG_LEVEL, LOG_LEVELS and LOG_SAMPLING; malformed entries are ignored."""
+    rules = []
+    level = _parse_level(os.environ.get(LOG_LEVEL_ENV))
+    if level in LOG_LEVELS:
+        rules.append({"processtype": None, "sink": None, "minlevel": level, "samplerate": None, "maxperminute": None})
+    for item in os.environ.get(LOG_LEVELS_ENV, "").split(","):
+        target, _, level = item.partition("=")
+        process_type, _, sink = target.strip().partition(":")
+        level = _parse_level(level)
+        if level not in LOG_LEVELS or (sink and sink not in LOG_SINKS):
+            continue
+        rules.append({"processtype": None if process_type in ("", "*") else process_type, "sink": sink or None,
+                      "minlevel": level, "samplerate": None, "maxperminute": None})
+    for item in os.environ.get(LOG_SAMPLING_ENV, "").split(","):
+        process_type, _, setting = item.partition("=")
+        rate, _, per_minute = setting.partition("/")
+        try:
+            samplerate = float(rate) if rate.strip() else None
+            maxperminute = int(per_minute) if per_minute.strip() else None
+        except ValueError:
+            continue
+        if samplerate is None and maxperminute is None:
+            continue
+        rules.append({"processtype": None if process_type.strip() in ("", "*") else process_type.strip(), "sink": None,
+                      "minlevel": None, "samplerate": samplerate, "maxperminute": maxperminute})
+    return rules
+
+def _load_log_rules():
+    """Active dba.tlogconfig rules, or None if the table cannot be read."""
+    rules = []
+    try:
+        with psycopg2.connect(connect_timeout=5, **DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT processtype, sink, minlevel, samplerate, maxperminute
+                    FROM dba.tlogconfig
+                    WHERE isactive
+                    ORDER BY logconfigid
+                """)
+                for processtype, sink, minlevel, samplerate, maxperminute in cur.fetchall():
+                    rules.append({"processtype": processtype, "sink": sink, "minlevel": _parse_level(minlevel) or None,
+                                  "samplerate": float(samplerate) if samplerate is not None else None, "maxperminute": maxperminute})
+        conn.close()
+    except psycopg2.Error:
+        return None
+    return rules
+
+def _reload_log_rules():
+    """Read dba.tlogconfig without holding _log_config_lock and swap the new rules in.
+
+    After a failed read the previous rules stay in force and the next attempt is put off by LOG_CONFIG_RETRY,
+    doubling per consecutive failure. Before the first successful read only the environment rules apply.
+    """
+    global _log_rules, _log_rules_due, _log_rules_failures, _log_rules_reloading
+    db_rules = None
+    try:
+        with _log_config_load_lock:
+            db_rules = _load_log_rules()
+    finally:
+        with _log_config_lock:
+            now = time.time()
+            if db_rules is not None:
+                _log_rules = db_rules + _env_log_rules()
+                _log_rules_failures = 0
+                _log_rules_due = now + LOG_CONFIG_REFRESH
+                _log_policies.clear()
+            else:
+                if _log_rules is None:
+                    _log_rules = _env_log_rules()
+                    _log_policies.clear()
+                _log_rules_due = now + min(LOG_CONFIG_RETRY * 2 ** _log_rules_failures, LOG_CONFIG_REFRESH)
+                _log_rules_failures += 1
+            _log_rules_reloading = False
+
+def _best_rule_value(rules, field, process_type, sink=None):
+    """Value of field from the most specific matching rule that sets it; later rules win ties."""
+    best_rank, value = -1, None
+    for rule in rules:
+        if rule[field] is None or rule["processtype"] not in (None, process_type) or rule["sink"] not in (None, sink):
+            continue
+        rank = (rule["processtype"] is not None) * 2 + (rule["sink"] is not None)
+        if rank >= best_rank:
+            best_rank, value = rank, rule[field]
+    return value
+
+def _log_policy(process_type):
+    """Minimum level per sink, samplerate and maxperminute for a process type.
+
+    The first call loads the rules in the caller's thread; later reloads run in a background thread so
+    loggers keep using the current rules while dba.tlogconfig is read.
+    """
+    global _log_rules_reloading
+    with _log_config_lock:
+        reload_rules = not _log_rules_reloading and time.time() >= _log_rules_due
+        if reload_rules:
+            _log_rules_reloading = True
+        first_load = _log_rules is None
+    if reload_rules:
+        if first_load:
+            _reload_log_rules()
+        else:
+            threading.Thread(target=_reload_log_rules, name="log-config-reload", daemon=True).start()
+    elif first_load:
+        # Another thread is doing the first load; wait for it rather than log without the configured rules
+        with _log_config_load_lock:
+            pass
+    with _log_config_lock:
+        policy = _log_policies.get(process_type)
+        if policy is None:
+            rules = _log_rules if _log_rules is not None else _env_log_rules()
+            minimums = {sink: LOG_LEVELS[_best_rule_value(rules, "minlevel", process_type, sink) or "DEBUG"] for sink in LOG_SINKS}
+            policy = (
+                minimums,
+                _best_rule_value(rules, "samplerate", process_type),
+                _best_rule_value(rules, "maxperminute", process_type)
+            )
+            if _log_rules is not None:
+                _log_policies[process_type] = policy
+        return policy
+
+def level_enabled(process_type, level, sink):
+    """Whether an entry of this process type and level would be written to sink ('csv', 'txt' or 'db')."""
+    level = _parse_level(level) or PROCESS_TYPE_LEVELS.get(process_type, "INFO")
+    if level not in LOG_LEVELS:
+        level = "INFO"
+    return LOG_LEVELS[level] >= _log_policy(process_type)[0][sink]
+
+def _sample(process_type, stepcounter, samplerate, maxperminute, context):
+    """Decide whether to keep an entry for its stepcounter template.
+
+    Returns (keep, summary); summary is (process_type, template, dropped, context) for the minute
+    that just ended when entries were dropped in it, so the caller can log how many were skipped.
+    """
+    template = stepcounter_template(stepcounter)
+    key = (process_type, template)
+    now = time.time()
+    summary = None
+    with _sampling_lock:
+        state = _sampling_state.get(key)
+        if state is None:
+            state = _sampling_state[key] = {"window": now, "seen": 0, "kept": 0, "dropped": 0, "context": context}
+        if now - state["window"] >= 60:
+            if state["dropped"]:
+                summary = (process_type, template, state["dropped"], state["context"])
+            state.update(window=now, kept=0, dropped=0)
+        state["context"] = context
+        seen = state["seen"]
+        state["seen"] += 1
+        # Keep a steady fraction of entries, starting with the first one
+        keep = samplerate is None or seen == 0 or int(seen * samplerate) > int((seen - 1) * samplerate)
+        if keep and maxperminute is not None and state["kept"] >= maxperminute:
+            keep = False
+        if keep:
+            state["kept"] += 1
+        else:
+            state["dropped"] += 1
+    return keep, summary
+
+def _log_sampling_summary(process_type, template, dropped, context):
+    log_file, fields = context
+    log_message(log_file, "Logging", f"Skipped {dropped} {process_type} entries matching stepcounter {template} by log sampling",
+                stepcounter="Logging_Sampled", level="INFO", sample=False, **fields)
+
+@atexit.register
+def _close_writer():
+    if _writer is not None and _writer.pid == os.getpid():
+        with _sampling_lock:
+            summaries = [(key[0], key[1], state["dropped"], state["context"]) for key, state in _sampling_state.items() if state["dropped"]]
+            for state in _sampling_state.values():
+                state["dropped"] = 0
+        for summary in summaries:
+            _log_sampling_summary(*summary)
+        _writer.close()
+
 def log_message(log_file, process_type, message, use_db=True, **kwargs):
-    """Log a message to CSV, TXT, and optionally PostgreSQL with configurable fields."""
+    """Log a message to CSV, TXT, and optionally PostgreSQL with configurable fields.
+
+    level is DEBUG, INFO, WARN or ERROR; without it the level follows the process type (Error, Warning,
+    Debug) and defaults to INFO. Each sink drops entries below its minimum level from dba.tlogconfig or
+    the LOG_LEVEL/LOG_LEVELS environment variables. DEBUG and INFO entries can also be sampled or rate
+    limited per stepcounter template; pass sample=False to always keep an entry.
+
+    Entries are handed to a background writer and written in order; call flush_logs() before reading
+    a log back. They are flushed automatically at interpreter exit.
+    """
     global _log_id_counter, _last_log_time
     current_time = time.time()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
+
     # Check for parent log file from environment variable
     parent_log_file = os.environ.get('PARENT_LOG_FILE')
     if parent_log_file:
         log_file = parent_log_file  # Use parent log file if specified
-    
+
+    # Handle level and drop the entry before any other work if no sink wants it
+    level = _parse_level(kwargs.get("level")) or PROCESS_TYPE_LEVELS.get(process_type, "INFO")
+    if level not in LOG_LEVELS:
+        level = "INFO"
+    minimums, samplerate, maxperminute = _log_policy(process_type)
+    sinks = {sink for sink in LOG_SINKS if LOG_LEVELS[level] >= minimums[sink] and (use_db or sink != "db")}
+    if not sinks:
+        return
+    if LOG_LEVELS[level] < LOG_LEVELS["WARN"] and kwargs.get("sample", True) and (samplerate is not None or maxperminute is not None):
+        context = (log_file, {k: kwargs[k] for k in ("run_uuid", "user", "script_start_time") if k in kwargs})
+        keep, summary = _sample(process_type, kwargs.get("stepcounter", ""), samplerate, maxperminute, context)
+        if summary:
+            _log_sampling_summary(*summary)
+        if not keep:
+            return
+
     # Handle log_id
     with _log_id_lock:
         log_id = _log_id_counter
         _log_id_counter += 1
-    
+
     # Handle run_uuid
     run_uuid = kwargs.get("run_uuid", str(uuid.uuid4()))
-    
+
     # Handle stepcounter
     stepcounter = kwargs.get("stepcounter", "")
-    
+
     # Handle user
     user = kwargs.get("user", "")
-    
+
     # Handle runtimes
     with _log_time_lock:
         step_runtime = current_time - _last_log_time
         _last_log_time = current_time
     total_runtime = current_time - kwargs.get("script_start_time", current_time)
-    
+
     # Define log entry
     log_entry = {
         "log_id": log_id,
@@ -62,67 +562,16 @@ def log_message(log_file, process_type, message, use_db=True, **kwargs):
         "user": user,
         "step_runtime": f"{step_runtime:.3f}",
         "total_runtime": f"{total_runtime:.3f}",
-        "message": message
+        "message": message,
+        "level": level
     }
-    
-    # Define column order for CSV
-    column_order = [
-        "log_id",
-        "timestamp",
-        "run_uuid",
-        "process_type",
-        "stepcounter",
-        "user",
-        "step_runtime",
-        "total_runtime",
-        "message"
-    ]
-    
-    # Write to CSV
-    csv_file = f"{log_file}.csv"
-    with open(csv_file, "a", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=column_order)
-        if f.tell() == 0:
-            writer.writeheader()
-        writer.writerow({k: log_entry[k] for k in column_order})
-    os.chmod(csv_file, 0o660)
-    
-    # Write to TXT
-    txt_file = f"{log_file}.txt"
-    txt_entry = (
-        f"{log_entry['run_uuid']} | {log_entry['timestamp']} | {log_entry['process_type']} | {log_entry['message']}\n"
-    )
-    with open(txt_file, "a") as f:
-        if f.tell() == 0:
-            f.write("run_uuid | timestamp | process_type | message\n")
-            f.write("------------------------------------|---------------------|------------------|--------------------------------\n")
-        f.write(txt_entry)
-    os.chmod(txt_file, 0o660)
-    
-    # Write to PostgreSQL if use_db is True
-    if use_db:
-        try:
-            with psycopg2.connect(**DB_PARAMS) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO dba.tlogentry (
-                            run_uuid, timestamp, process_type, stepcounter, 
-                            user_name, step_runtime, total_runtime, message
-                        )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        run_uuid,
-                        timestamp,
-                        process_type,
-                        stepcounter,
-                        user,
-                        float(log_entry["step_runtime"]),
-                        float(log_entry["total_runtime"]),
-                        message
-                    ))
-                    conn.commit()
-        except psycopg2.Error as e:
-            # Log database error to TXT file as fallback
-            with open(txt_file, "a") as f:
-                f.write(f"{run_uuid} | {timestamp} | Error | Failed to log to PostgreSQL: {str(e)}\n")
-            os.chmod(txt_file, 0o660)
\ No newline at end of file
+
+    writer = _get_writer()
+    if not writer.running():
+        # Also the fallback if the background thread has died, so callers never block on a queue nobody drains
+        if writer.thread is not None:
+            writer.flush()
+        writer.write([(str(log_file), log_entry, sinks)])
+    else:
+        # Blocks when the queue is full, so a slow database slows callers down instead of dropping entries
+        writer.queue.put((str(log_file), log_entry, sinks))
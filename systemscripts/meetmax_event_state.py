@@ -0,0 +1,208 @@
+from collections import Counter
+from datetime import datetime, timedelta
+import psycopg2
+from psycopg2.extras import execute_values
+from systemscripts.db_config import DB_PARAMS
+from systemscripts.log_utils import log_message
+
+# Valid events whose result changed this recently are checked on every run
+ACTIVE_WINDOW_DAYS = 30
+
+# Valid events that have not changed lately are rechecked after this many days
+VALID_TTL_DAYS = 7
+
+# Known-invalid event IDs below the highest valid one are rechecked after this many days
+INVALID_TTL_DAYS = 60
+
+# At most this many known-invalid IDs are rechecked per run, oldest check first, so revalidation is spread out
+MAX_REVALIDATIONS_PER_RUN = 500
+
+# StatusCode values meetmax_url_check uses for a check that did not return a page
+FAILED_STATUSES = ("Failed", "Error")
+
+# Scheduling reasons, in the order their event IDs are checked
+SCHEDULE_REASONS = ("new", "frontier", "retry", "active", "stale", "revalidate")
+
+def load_event_state(log_file, run_uuid, user, script_start_time):
+    """Return {eventid: state row dict} from dba.tmeetmaxeventstate, or None if it cannot be read."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT eventid, url, ifexists, invalideventid, isdownloadable, downloadlink, statuscode, title,
+                           lastchecked, lastsuccess, lastvalid, lastchanged, changecount, failurecount
+                    FROM dba.tmeetmaxeventstate
+                """)
+                columns = [desc[0] for desc in cur.description]
+                state = {row[0]: dict(zip(columns, row)) for row in cur.fetchall()}
+        log_message(log_file, "EventState", f"Loaded state for {len(state)} event IDs",
+                    run_uuid=run_uuid, stepcounter="EventState_0", user=user, script_start_time=script_start_time)
+        return state
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to load event state, checking the full range: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="EventState_1", user=user, script_start_time=script_start_time)
+        return None
+
+def highest_valid_event_id(state):
+    """Highest event ID whose last successful check found the event, or None."""
+    return max((event_id for event_id, row in state.items() if row["ifexists"] == 1 and row["lastsuccess"] is not None), default=None)
+
+def select_event_ids(state, event_ids, now=None):
+    """Pick the event IDs to check this run, in priority order. Returns (event IDs, Counter of scheduling reasons).
+
+    - new: never checked successfully
+    - frontier: above the highest known valid ID, where new events appear
+    - retry: the last check failed
+    - active: valid and changed within ACTIVE_WINDOW_DAYS
+    - stale: valid and not checked for VALID_TTL_DAYS
+    - revalidate: known invalid and not checked for INVALID_TTL_DAYS, capped at MAX_REVALIDATIONS_PER_RUN
+    """
+    now = now or datetime.now()
+    active_since = now - timedelta(days=ACTIVE_WINDOW_DAYS)
+    valid_before = now - timedelta(days=VALID_TTL_DAYS)
+    invalid_before = now - timedelta(days=INVALID_TTL_DAYS)
+    max_valid = highest_valid_event_id(state)
+
+    scheduled = {reason: [] for reason in SCHEDULE_REASONS}
+    for event_id in event_ids:
+        row = state.get(event_id)
+        if row is None or row["lastsuccess"] is None:
+            scheduled["new"].append(event_id)
+        elif max_valid is None or event_id > max_valid:
+            scheduled["frontier"].append(event_id)
+        elif row["failurecount"]:
+            scheduled["retry"].append(event_id)
+        elif row["ifexists"] == 1:
+            if row["lastchanged"] and row["lastchanged"] >= active_since:
+                scheduled["active"].append(event_id)
+            elif row["lastchecked"] <= valid_before:
+                scheduled["stale"].append(event_id)
+        elif row["lastchecked"] <= invalid_before:
+            scheduled["revalidate"].append(event_id)
+
+    scheduled["revalidate"].sort(key=lambda event_id: (state[event_id]["lastchecked"], event_id))
+    scheduled["revalidate"] = scheduled["revalidate"][:MAX_REVALIDATIONS_PER_RUN]
+
+    selected = [event_id for reason in SCHEDULE_REASONS for event_id in scheduled[reason]]
+    return selected, Counter({reason: len(ids) for reason, ids in scheduled.items()})
+
+def state_result(row):
+    """Result row, in meetmax_url_check's columns, for an event's last known state."""
+    return {
+        "EventID": row["eventid"],
+        "URL": row["url"] or "",
+        "IfExists": row["ifexists"],
+        "InvalidEventID": row["invalideventid"],
+        "IsDownloadable": row["isdownloadable"],
+        "DownloadLink": row["downloadlink"] or "",
+        "StatusCode": row["statuscode"] or "",
+        "Title": row["title"] or ""
+    }
+
+def merge_snapshot(state, results):
+    """Full snapshot of every known event ID: this run's results over the last known state, sorted by EventID.
+
+    An event whose check failed this run keeps its last successful result if it has one.
+    """
+    rows = {event_id: state_result(row) for event_id, row in (state or {}).items() if row["lastsuccess"] is not None}
+    for result in results:
+        if result["StatusCode"] in FAILED_STATUSES and result["EventID"] in rows:
+            continue
+        rows[result["EventID"]] = result
+    return [rows[event_id] for event_id in sorted(rows)]
+
+def record_event_results(results, checked_at, log_file, run_uuid, user, script_start_time):
+    """Upsert this run's results into dba.tmeetmaxeventstate. Returns True on success."""
+    succeeded = [r for r in results if r["StatusCode"] not in FAILED_STATUSES]
+    failed = [r for r in results if r["StatusCode"] in FAILED_STATUSES]
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                # A change is counted when the parsed result differs from the previous successful one
+                execute_values(cur, """
+                    INSERT INTO dba.tmeetmaxeventstate AS s (
+                        eventid, url, ifexists, invalideventid, isdownloadable, downloadlink, statuscode, title,
+                        firstchecked, lastchecked, lastsuccess, lastvalid, lastchanged
+                    ) VALUES %s
+                    ON CONFLICT (eventid) DO UPDATE SET
+                        url = EXCLUDED.url
+                        ,ifexists = EXCLUDED.ifexists
+                        ,invalideventid = EXCLUDED.invalideventid
+                        ,isdownloadable = EXCLUDED.isdownloadable
+                        ,downloadlink = EXCLUDED.downloadlink
+                        ,statuscode = EXCLUDED.statuscode
+                        ,title = EXCLUDED.title
+                        ,lastchecked = EXCLUDED.lastchecked
+                        ,lastsuccess = EXCLUDED.lastsuccess
+                        ,lastvalid = COALESCE(EXCLUDED.lastvalid, s.lastvalid)
+                        ,lastchanged = CASE
+                            WHEN s.lastsuccess IS NULL
+                              OR (s.ifexists, s.invalideventid, s.isdownloadable, s.downloadlink, s.title)
+                                 IS DISTINCT FROM (EXCLUDED.ifexists, EXCLUDED.invalideventid, EXCLUDED.isdownloadable, EXCLUDED.downloadlink, EXCLUDED.title)
+                            THEN EXCLUDED.lastchecked
+                            ELSE s.lastchanged
+                         END
+                        ,changecount = s.changecount + CASE
+                            WHEN s.lastsuccess IS NOT NULL
+                             AND (s.ifexists, s.invalideventid, s.isdownloadable, s.downloadlink, s.title)
+                                 IS DISTINCT FROM (EXCLUDED.ifexists, EXCLUDED.invalideventid, EXCLUDED.isdownloadable, EXCLUDED.downloadlink, EXCLUDED.title)
+                            THEN 1
+                            ELSE 0
+                         END
+                        ,failurecount = 0
+                """, [
+                    (r["EventID"], r["URL"], r["IfExists"], r["InvalidEventID"], r["IsDownloadable"], r["DownloadLink"],
+                     r["StatusCode"], r["Title"], checked_at, checked_at, checked_at,
+                     checked_at if r["IfExists"] == 1 else None, checked_at)
+                    for r in succeeded
+                ])
+                # A failed check keeps the last successful result and only counts the failure
+                execute_values(cur, """
+                    INSERT INTO dba.tmeetmaxeventstate AS s (
+                        eventid, url, statuscode, firstchecked, lastchecked, failurecount
+                    ) VALUES %s
+                    ON CONFLICT (eventid) DO UPDATE SET
+                        lastchecked = EXCLUDED.lastchecked
+                        ,failurecount = s.failurecount + 1
+                """, [(r["EventID"], r["URL"], r["StatusCode"], checked_at, checked_at, 1) for r in failed])
+                conn.commit()
+        log_message(log_file, "EventState", f"Recorded state for {len(succeeded)} checked and {len(failed)} failed event IDs",
+                    run_uuid=run_uuid, stepcounter="EventState_2", user=user, script_start_time=script_start_time)
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to record event state: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="EventState_3", user=user, script_start_time=script_start_time)
+        return False
+
+def load_frontier(log_file, run_uuid, user, script_start_time):
+    """Return (highest valid event ID, discovered at) from the latest dba.tmeetmaxfrontier row, or None."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT highestvalidid, discoveredat
+                    FROM dba.tmeetmaxfrontier
+                    ORDER BY discoveredat DESC
+                    LIMIT 1
+                """)
+                return cur.fetchone()
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to load cached event ID frontier: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Frontier_1", user=user, script_start_time=script_start_time)
+        return None
+
+def record_frontier(highest_valid_id, probe_count, log_file, run_uuid, user, script_start_time):
+    """Cache a discovered frontier in dba.tmeetmaxfrontier. Returns True on success."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO dba.tmeetmaxfrontier (highestvalidid, probecount, run_uuid)
+                    VALUES (%s, %s, %s)
+                """, (highest_valid_id, probe_count, run_uuid))
+                conn.commit()
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to cache event ID frontier: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Frontier_2", user=user, script_start_time=script_start_time)
+        return False
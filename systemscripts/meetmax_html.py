@@ -0,0 +1,134 @@
+import re
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# Patterns meetmax_url_check has always matched on MeetMax company list pages; extract_page returns exactly
+# what re.search with each of them returns
+PRIVATE_LINK_PATTERN = re.compile(r'<a[^>]*href="[^"]*__private-co-list_cp\.html[^"]*"[^>]*class="[^"]*nav-link[^"]*"[^>]*>Private Company List</a>', re.IGNORECASE)
+TITLE_PATTERN = re.compile(r'<title>(.*?)</title>', re.IGNORECASE)
+INVALID_EVENT_PATTERN = re.compile(r'<div class="alert alert-danger">Invalid Event ID: \d+</div>', re.IGNORECASE)
+DOWNLOAD_LINK_PATTERN = re.compile(r'<a[^>]*href="([^"]*[_\-_]co-list_cp\.xls[^"]*)"[^>]*>', re.IGNORECASE)
+EXPORT_BUTTON_PATTERN = re.compile(r'<[^>]*id="export"[^>]*>.*?<i class="fas fa-cloud-download-alt"> </i>\s*Download Company List', re.IGNORECASE | re.DOTALL)
+
+# Non-ASCII characters re.IGNORECASE matches to ASCII letters; U+0130 also changes length when lowercased. Pages
+# containing any of them are read with plain re.search so the results cannot differ.
+_UNSAFE_CASE_CHARS = ("\u0130", "\u0131", "\u017f", "\u212a")
+
+# Fields read from a page: title and download_href are the raw captured groups, or None without a match
+PageFields = namedtuple("PageFields", ["private_link", "title", "invalid_event", "download_href", "export_button"])
+
+_FIELD_PATTERNS = (
+    ("private_link", PRIVATE_LINK_PATTERN),
+    ("title", TITLE_PATTERN),
+    ("invalid_event", INVALID_EVENT_PATTERN),
+    ("download_href", DOWNLOAD_LINK_PATTERN),
+    ("export_button", EXPORT_BUTTON_PATTERN),
+)
+
+def _fields(matches):
+    """PageFields from {field: match or None}."""
+    return PageFields(
+        private_link=matches["private_link"] is not None,
+        title=matches["title"].group(1) if matches["title"] else None,
+        invalid_event=matches["invalid_event"] is not None,
+        download_href=matches["download_href"].group(1) if matches["download_href"] else None,
+        export_button=matches["export_button"] is not None
+    )
+
+def _href_start_bound(text, keyword_at):
+    """Earliest start for an '<a[^>]*href="[^"]*' match reaching a keyword at or after keyword_at.
+
+    The href value holds no quote, so it opens at the last quote before the keyword, and the tag holds no '>' up
+    to 'href="', so the match starts after the last '>' before that.
+    """
+    quote_at = text.rfind('"', 0, keyword_at)
+    if quote_at < 5:
+        return 0
+    return text.rfind(">", 0, quote_at - 5) + 1
+
+def extract_page(text):
+    """Read every field from a company list page, scanning each pattern only from where its match can begin.
+
+    One lowercased copy of the page locates each pattern's required literal with a plain substring find. A field
+    whose literal is absent cannot match and is skipped; otherwise its compiled pattern is searched from the
+    earliest position a match could start, which returns the same match as re.search over the whole page. The
+    large private company list pages no longer have every tag scanned by five backtracking patterns.
+    """
+    if any(char in text for char in _UNSAFE_CASE_CHARS):
+        return search_page(text)
+    lowered = text.lower()
+    matches = dict.fromkeys(name for name, _ in _FIELD_PATTERNS)
+
+    title_at = lowered.find("<title>")
+    if title_at >= 0:
+        matches["title"] = TITLE_PATTERN.search(text, title_at)
+
+    invalid_at = lowered.find('<div class="alert alert-danger">invalid event id: ')
+    if invalid_at >= 0:
+        matches["invalid_event"] = INVALID_EVENT_PATTERN.search(text, invalid_at)
+
+    private_at = lowered.find("__private-co-list_cp.html")
+    if private_at >= 0:
+        matches["private_link"] = PRIVATE_LINK_PATTERN.search(text, _href_start_bound(text, private_at))
+
+    link_at = lowered.find("co-list_cp.xls")
+    if link_at >= 0:
+        matches["download_href"] = DOWNLOAD_LINK_PATTERN.search(text, _href_start_bound(text, link_at))
+
+    # The export element's tag holds no '>' before id="export"
+    export_at = lowered.find('id="export"')
+    if export_at >= 0:
+        matches["export_button"] = EXPORT_BUTTON_PATTERN.search(text, text.rfind(">", 0, export_at) + 1)
+
+    return _fields(matches)
+
+def search_page(text):
+    """Read the fields with a separate re.search per pattern, the way meetmax_url_check used to; the benchmark baseline."""
+    return _fields({name: pattern.search(text) for name, pattern in _FIELD_PATTERNS})
+
+def load_pages(paths):
+    """Read saved pages as (path, text); directories are searched for *.htm and *.html files."""
+    pages = []
+    for path in paths:
+        path = Path(path)
+        files = sorted(path.rglob("*.htm*")) if path.is_dir() else [path]
+        pages.extend((str(f), f.read_text(encoding="utf-8", errors="replace")) for f in files)
+    return pages
+
+def benchmark(pages, repeat=5):
+    """Compare extract_page with search_page on saved pages. Returns (mismatched paths, search CPU seconds, extract CPU seconds) per pass."""
+    mismatches = [name for name, text in pages if extract_page(text) != search_page(text)]
+    timings = {}
+    for label, extract in (("search", search_page), ("extract", extract_page)):
+        started = time.process_time()
+        for _ in range(repeat):
+            for _, text in pages:
+                extract(text)
+        timings[label] = (time.process_time() - started) / repeat
+    return mismatches, timings["search"], timings["extract"]
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python meetmax_html.py <saved_page_or_directory> [...] [--repeat N]")
+        sys.exit(1)
+    args = sys.argv[1:]
+    repeat = 5
+    if "--repeat" in args:
+        index = args.index("--repeat")
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+    pages = load_pages(args)
+    if not pages:
+        print("No saved pages found")
+        sys.exit(1)
+    mismatches, search_seconds, extract_seconds = benchmark(pages, repeat)
+    print(f"Pages: {len(pages)} ({sum(len(text) for _, text in pages)} characters), repeat {repeat}")
+    print(f"re.search per pattern: {search_seconds * 1e6 / len(pages):.1f} us CPU per page")
+    print(f"extract_page:          {extract_seconds * 1e6 / len(pages):.1f} us CPU per page")
+    if extract_seconds:
+        print(f"Speedup: {search_seconds / extract_seconds:.2f}x")
+    for name in mismatches:
+        print(f"MISMATCH: {name}")
+    sys.exit(1 if mismatches else 0)
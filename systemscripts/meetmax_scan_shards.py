@@ -0,0 +1,247 @@
+import os
+import socket
+from collections import Counter
+import psycopg2
+from psycopg2.extras import execute_values
+from systemscripts.db_config import DB_PARAMS
+from systemscripts.log_utils import log_message
+
+# Event IDs per shard; a shard is the unit a worker claims, checks and stages in one go
+SHARD_SIZE = 250
+
+# A claimed shard whose claim has not been renewed for this many minutes is assumed lost with its worker and
+# claimed again. Workers renew their claim as results come in, so a slow shard keeps its lease.
+SHARD_LEASE_MINUTES = 30
+
+# How often a worker renews the claim of the shard it is checking, if it has checked an event since the last renewal
+SHARD_HEARTBEAT_SECONDS = 60
+
+def create_shards(scan_uuid, event_ids, rate_limit, processes, log_file, run_uuid, user, script_start_time, shard_size=SHARD_SIZE):
+    """Split event_ids into shards of shard_size in dba.tmeetmaxscanshard. Returns the shard count, or None on failure.
+
+    scan_uuid is the run_uuid of the meetmax_url_check run the shards belong to; run_uuid is the one to log under.
+    rate_limit, the requests per second of all workers together, and processes, the number the run starts, are
+    stored with every shard so that any worker, even one started by hand, knows its share of the rate while the
+    budget in dba.tratebudget cannot be reached. Shard numbers follow the order of event_ids, and existing shards
+    are left alone, so creating the shards of a run again after a restart changes nothing.
+    """
+    shards = [(scan_uuid, shard_id, event_ids[start:start + shard_size], rate_limit, processes)
+              for shard_id, start in enumerate(range(0, len(event_ids), shard_size))]
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO dba.tmeetmaxscanshard (run_uuid, shardid, eventids, ratelimit, processes)
+                    VALUES %s
+                    ON CONFLICT (run_uuid, shardid) DO NOTHING
+                """, shards)
+                conn.commit()
+        log_message(log_file, "Shards", f"Created {len(shards)} shards of up to {shard_size} event IDs for run {scan_uuid}",
+                    run_uuid=run_uuid, stepcounter="Shards_0", user=user, script_start_time=script_start_time)
+        return len(shards)
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to create shards for run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_1", user=user, script_start_time=script_start_time)
+        return None
+
+def claim_shard(scan_uuid, worker, log_file, run_uuid, user, script_start_time, lease_minutes=SHARD_LEASE_MINUTES):
+    """Claim the next pending shard of the run, or one whose lease has expired.
+
+    Returns (shard ID, event IDs, fallback rate) or None. The fallback rate is the run's rate limit split between
+    its planned processes or, if more workers have joined, every worker that has claimed a shard.
+
+    FOR UPDATE SKIP LOCKED lets any number of workers claim at once: each skips the rows the others are locking,
+    so no shard is handed to two workers and nobody waits.
+    """
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE dba.tmeetmaxscanshard s
+                    SET status = 'claimed'
+                        ,claimedby = %s
+                        ,claimedat = CURRENT_TIMESTAMP
+                    WHERE s.run_uuid = %s
+                      AND s.shardid = (
+                          SELECT shardid
+                          FROM dba.tmeetmaxscanshard
+                          WHERE run_uuid = %s
+                            AND (status = 'pending'
+                                 OR (status = 'claimed' AND claimedat < CURRENT_TIMESTAMP - make_interval(mins => %s)))
+                          ORDER BY shardid
+                          FOR UPDATE SKIP LOCKED
+                          LIMIT 1
+                      )
+                    RETURNING s.shardid, s.eventids, s.ratelimit / GREATEST(s.processes, 1 + (
+                        SELECT COUNT(DISTINCT c.claimedby)
+                        FROM dba.tmeetmaxscanshard c
+                        WHERE c.run_uuid = s.run_uuid AND c.claimedby <> %s
+                    ))
+                """, (worker, scan_uuid, scan_uuid, lease_minutes, worker))
+                row = cur.fetchone()
+                conn.commit()
+        return row
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to claim a shard of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_2", user=user, script_start_time=script_start_time)
+        return None
+
+def renew_shard(scan_uuid, shard_id, worker, log_file, run_uuid, user, script_start_time):
+    """Restart the lease of a shard this worker has claimed. Returns False if the claim has passed to another worker or failed."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE dba.tmeetmaxscanshard
+                    SET claimedat = CURRENT_TIMESTAMP
+                    WHERE run_uuid = %s AND shardid = %s AND status = 'claimed' AND claimedby = %s
+                """, (scan_uuid, shard_id, worker))
+                renewed = cur.rowcount == 1
+                conn.commit()
+        return renewed
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to renew the claim of shard {shard_id} of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_12", user=user, script_start_time=script_start_time)
+        return False
+
+def process_alive(pid):
+    """Whether a process with this ID is running on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def release_dead_claims(scan_uuid, log_file, run_uuid, user, script_start_time):
+    """Return to pending the run's claimed shards whose worker was on this host and is no longer running.
+
+    Used when a run is resumed, so the shards of its crashed workers are not left waiting for their lease to
+    expire. Claims of workers on other hosts keep their lease, since those may still be running. Returns the
+    number of shards released, or None on failure.
+    """
+    host = socket.gethostname()
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT claimedby
+                    FROM dba.tmeetmaxscanshard
+                    WHERE run_uuid = %s AND status = 'claimed'
+                """, (scan_uuid,))
+                dead = []
+                for (claimed_by,) in cur.fetchall():
+                    claim_host, _, pid = (claimed_by or "").rpartition(":")
+                    if claim_host == host and pid.isdigit() and not process_alive(int(pid)):
+                        dead.append(claimed_by)
+                released = 0
+                if dead:
+                    cur.execute("""
+                        UPDATE dba.tmeetmaxscanshard
+                        SET status = 'pending'
+                            ,claimedby = NULL
+                            ,claimedat = NULL
+                        WHERE run_uuid = %s AND status = 'claimed' AND claimedby = ANY(%s)
+                    """, (scan_uuid, dead))
+                    released = cur.rowcount
+                conn.commit()
+        log_message(log_file, "Shards", f"Released {released} shards of run {scan_uuid} claimed by {len(dead)} stopped workers on {host}",
+                    run_uuid=run_uuid, stepcounter="Shards_10", user=user, script_start_time=script_start_time)
+        return released
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to release shards of stopped workers of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_11", user=user, script_start_time=script_start_time)
+        return None
+
+def complete_shard(scan_uuid, shard_id, results, log_file, run_uuid, user, script_start_time):
+    """Stage a shard's results in dba.tmeetmaxscanresult and mark it done, in one transaction. Returns True on success."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                if results:
+                    # A shard checked again after its lease expired overwrites the rows it staged before
+                    execute_values(cur, """
+                        INSERT INTO dba.tmeetmaxscanresult (
+                            run_uuid, eventid, shardid, url, ifexists, invalideventid, isdownloadable, downloadlink, statuscode, title
+                        ) VALUES %s
+                        ON CONFLICT (run_uuid, eventid) DO UPDATE SET
+                            shardid = EXCLUDED.shardid
+                            ,url = EXCLUDED.url
+                            ,ifexists = EXCLUDED.ifexists
+                            ,invalideventid = EXCLUDED.invalideventid
+                            ,isdownloadable = EXCLUDED.isdownloadable
+                            ,downloadlink = EXCLUDED.downloadlink
+                            ,statuscode = EXCLUDED.statuscode
+                            ,title = EXCLUDED.title
+                    """, [
+                        (scan_uuid, r["EventID"], shard_id, r["URL"], r["IfExists"], r["InvalidEventID"], r["IsDownloadable"],
+                         r["DownloadLink"], r["StatusCode"], r["Title"])
+                        for r in results
+                    ])
+                cur.execute("""
+                    UPDATE dba.tmeetmaxscanshard
+                    SET status = 'done'
+                        ,completedat = CURRENT_TIMESTAMP
+                        ,resultcount = %s
+                    WHERE run_uuid = %s AND shardid = %s
+                """, (len(results), scan_uuid, shard_id))
+                conn.commit()
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to stage results of shard {shard_id} of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_3", user=user, script_start_time=script_start_time)
+        return False
+
+def shard_progress(scan_uuid, log_file, run_uuid, user, script_start_time):
+    """Counter of the run's shards by status (pending, claimed, done), or None if it cannot be read."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT status, COUNT(*)
+                    FROM dba.tmeetmaxscanshard
+                    WHERE run_uuid = %s
+                    GROUP BY status
+                """, (scan_uuid,))
+                return Counter(dict(cur.fetchall()))
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to read shard progress of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_4", user=user, script_start_time=script_start_time)
+        return None
+
+def load_staged_results(scan_uuid, log_file, run_uuid, user, script_start_time):
+    """Result rows, in meetmax_url_check's columns, staged by the run's workers, sorted by EventID; None on failure."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT eventid, url, ifexists, invalideventid, isdownloadable, downloadlink, statuscode, title
+                    FROM dba.tmeetmaxscanresult
+                    WHERE run_uuid = %s
+                    ORDER BY eventid
+                """, (scan_uuid,))
+                rows = cur.fetchall()
+        return [
+            {"EventID": eventid, "URL": url or "", "IfExists": ifexists, "InvalidEventID": invalideventid, "IsDownloadable": isdownloadable,
+             "DownloadLink": downloadlink or "", "StatusCode": statuscode or "", "Title": title or ""}
+            for eventid, url, ifexists, invalideventid, isdownloadable, downloadlink, statuscode, title in rows
+        ]
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to load staged results of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_5", user=user, script_start_time=script_start_time)
+        return None
+
+def clear_staged_results(scan_uuid, log_file, run_uuid, user, script_start_time):
+    """Delete the run's staged results and its shards once the results are in its CSV. Returns True on success."""
+    try:
+        with psycopg2.connect(**DB_PARAMS) as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM dba.tmeetmaxscanresult WHERE run_uuid = %s", (scan_uuid,))
+                cur.execute("DELETE FROM dba.tmeetmaxscanshard WHERE run_uuid = %s", (scan_uuid,))
+                conn.commit()
+        return True
+    except psycopg2.Error as e:
+        log_message(log_file, "Warning", f"Failed to clear staged results of run {scan_uuid}: {str(e)}",
+                    run_uuid=run_uuid, stepcounter="Shards_6", user=user, script_start_time=script_start_time)
+        return False
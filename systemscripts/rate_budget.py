@@ -0,0 +1,91 @@
+import time
+import asyncio
+import threading
+import psycopg2
+from systemscripts.db_config import DB_PARAMS
+from systemscripts.web_utils import TokenBucket
+
+# Seconds to pace locally after a database error before the shared bucket is tried again
+DB_RETRY_SECONDS = 30
+
+class DbTokenBucket:
+    """Token bucket kept in dba.tratebudget, shared by every process and host that uses the same name.
+
+    Each acquire takes one token with a single UPDATE, which refills the bucket at rate tokens per second from the
+    database clock and returns how long the caller must wait for its token, so concurrent workers are spaced out
+    exactly as one TokenBucket would space them. Has the acquire/acquire_async interface of TokenBucket and can be
+    passed as fetch_url_async's rate_limiter. If the database cannot be reached, requests are paced locally at
+    fallback_rate until it can, so a worker keeps going without exceeding its share.
+    """
+
+    def __init__(self, name, rate, capacity=1, fallback_rate=None):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.fallback = TokenBucket(fallback_rate or self.rate, 1)
+        self.db_errors = 0
+        self._conn = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Open the bucket's connection on first use and make sure its row exists with the configured rate."""
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(**DB_PARAMS)
+            self._conn.autocommit = True
+            with self._conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO dba.tratebudget (budgetname, rate, capacity, tokens, updatedat)
+                    VALUES (%s, %s, %s, %s, clock_timestamp())
+                    ON CONFLICT (budgetname) DO UPDATE SET
+                        rate = EXCLUDED.rate
+                        ,capacity = EXCLUDED.capacity
+                """, (self.name, self.rate, self.capacity, self.capacity))
+        return self._conn
+
+    def _reserve(self):
+        """Take one token and return the seconds to wait before it may be used."""
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                return self.fallback._reserve()
+            try:
+                with self._connection().cursor() as cur:
+                    cur.execute("""
+                        UPDATE dba.tratebudget
+                        SET tokens = LEAST(capacity, tokens + GREATEST(0, EXTRACT(EPOCH FROM clock_timestamp() - updatedat)::DOUBLE PRECISION) * rate) - 1
+                            ,updatedat = clock_timestamp()
+                        WHERE budgetname = %s
+                        RETURNING tokens, rate
+                    """, (self.name,))
+                    tokens, rate = cur.fetchone()
+                return 0.0 if tokens >= 0 else -tokens / rate
+            except psycopg2.Error:
+                self.db_errors += 1
+                self._retry_at = time.monotonic() + DB_RETRY_SECONDS
+                if self._conn is not None:
+                    self._conn.close()
+                return self.fallback._reserve()
+
+    def set_fallback_rate(self, rate):
+        """Change the rate requests are paced at while the database cannot be reached."""
+        with self._lock:
+            if rate and rate != self.fallback.rate:
+                self.fallback = TokenBucket(rate, 1)
+
+    def acquire(self):
+        """Block the calling thread until a token is available."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait in the event loop until a token is available; the database round trip runs in a thread."""
+        wait = await asyncio.to_thread(self._reserve)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def close(self):
+        """Close the bucket's database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
@@ -0,0 +1,124 @@
+import os
+import json
+import tempfile
+import threading
+from array import array
+
+# Column kinds and the array typecode each is stored in; text columns are kept in plain lists
+COLUMN_TYPECODES = {"int": "q", "bool": "b", "str": None}
+
+class ColumnarBuffer:
+    """Result rows held column by column instead of as one dict per row.
+
+    schema is a list of (column name, kind) with kind one of COLUMN_TYPECODES. Integer and boolean columns are
+    packed into typed arrays, 8 and 1 bytes per row; rows are rebuilt as dicts with the original types on reading.
+    """
+
+    def __init__(self, schema):
+        self.schema = list(schema)
+        self._columns = {name: array(COLUMN_TYPECODES[kind]) if COLUMN_TYPECODES[kind] else [] for name, kind in self.schema}
+        self._length = 0
+
+    def append(self, row):
+        """Add one row given as a dict with every schema column."""
+        for name, kind in self.schema:
+            value = row[name]
+            self._columns[name].append(int(value) if kind != "str" else value)
+        self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def row(self, index):
+        """Row at index as a dict."""
+        return {name: bool(self._columns[name][index]) if kind == "bool" else self._columns[name][index] for name, kind in self.schema}
+
+    def __iter__(self):
+        # Rows appended while iterating are not visited
+        return (self.row(index) for index in range(self._length))
+
+class AppendOnlyResultWriter:
+    """Streams result rows to an append-only JSON Lines file while buffering them in a ColumnarBuffer.
+
+    Each row is written as one line when it arrives, so a save never rewrites earlier rows; sync() forces what has
+    been written to disk with fsync, for a periodic checkpoint. Iterating the writer yields the buffered rows in
+    arrival order. Appends from several threads are serialized by a lock. With resume, the rows already in the file
+    are loaded into the buffer first and new rows are appended after them.
+    """
+
+    def __init__(self, path, schema, resume=False):
+        self.path = path
+        self.buffer = ColumnarBuffer(schema)
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load_existing()
+        # Line buffered, so every row reaches the operating system as soon as it is written
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        os.chmod(path, 0o660)
+
+    def _load_existing(self):
+        """Buffer the complete rows already in the file and cut off a partial last line left by a crash."""
+        complete_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    break
+                self.buffer.append(row)
+                complete_bytes += len(line)
+        with open(self.path, "r+b") as f:
+            f.truncate(complete_bytes)
+
+    def append(self, row):
+        """Write one row to the file and the buffer."""
+        line = json.dumps({name: row[name] for name, _ in self.buffer.schema}) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.buffer.append(row)
+
+    def extend(self, rows):
+        """Append several rows."""
+        for row in rows:
+            self.append(row)
+
+    def sync(self):
+        """fsync the rows written so far. Returns the number of rows on disk."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            return len(self.buffer)
+
+    def close(self):
+        """Sync and close the file; the buffered rows stay readable."""
+        self.sync()
+        with self._lock:
+            self._file.close()
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __iter__(self):
+        return iter(self.buffer)
+
+def write_manifest(path, manifest):
+    """Write a checkpoint manifest as JSON, atomically and fsync'd, so a crash leaves the old or the new version."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(temp_path, 0o660)
+    os.replace(temp_path, path)
+
+def read_manifest(path):
+    """Return a manifest written by write_manifest, or None if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -1,29 +1,404 @@
 import time
+import asyncio
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import aiohttp
 import requests
-from requests.exceptions import RequestException, HTTPError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, HTTPError, Timeout
 
-def fetch_url(session, url, retries=5, initial_delay=5.0, headers=None, log_file=None, run_uuid=None, user=None, script_start_time=None):
-    """Fetch a URL with retry logic for handling errors, including rate limiting."""
+# Page returned by fetch_url_async; status_code and text match the requests.Response attributes callers read
+FetchedPage = namedtuple("FetchedPage", ["url", "status_code", "text", "headers"])
+
+# Responses that mean the host wants us to slow down; timeouts are treated the same way
+THROTTLE_STATUSES = (429, 503)
+
+def _log(log_file, process_type, message, url, run_uuid, user, script_start_time):
+    """Log a fetch event when the caller passed a log file; log_utils is imported lazily to keep this module light."""
+    if log_file is None:
+        return
+    from systemscripts.log_utils import log_message
+    log_message(log_file, process_type, message, run_uuid=run_uuid, stepcounter=f"fetch_{url}", user=user, script_start_time=script_start_time)
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header, given as delay-seconds or an HTTP date. None if absent or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def fetch_url(session, url, retries=5, initial_delay=5.0, headers=None, log_file=None, run_uuid=None, user=None, script_start_time=None, rate_controller=None, cache=None):
+    """Fetch a URL with retry logic for handling errors, including rate limiting.
+
+    session is an HttpClient or a requests.Session; None uses the process-wide default_http_client(), so repeated
+    calls reuse its keep-alive connections instead of opening a new one per request. With a rate_controller (AdaptiveRateController) every attempt waits for the host's current rate and reports
+    its outcome back, so 429/503 responses and timeouts slow down every request to the host, not just this one.
+    With a cache (http_cache.HttpCache) the request is conditional on the cached validators, and a 304 response is
+    counted as a cache hit and returned for the caller to read the cached entry.
+    """
+    if session is None:
+        session = default_http_client()
+    if cache is not None:
+        headers = {**(headers or {}), **cache.validators(url)}
     delay = initial_delay
     for attempt in range(retries):
         try:
+            if rate_controller is not None:
+                rate_controller.acquire(url)
             response = session.get(url, headers=headers, timeout=10)
+            if rate_controller is not None:
+                _record_outcome(rate_controller, url, response.status_code, response.headers.get("Retry-After"), log_file, run_uuid, user, script_start_time)
             response.raise_for_status()
+            if cache is not None and response.status_code == 304:
+                cache.record("not_modified")
             return response
         except HTTPError as e:
-            if e.response.status_code == 429 and log_file is not None:
-                from systemscripts.log_utils import log_message
-                log_message(log_file, "RateLimit", f"Rate limit hit for {url}, attempt {attempt + 1}/{retries}, waiting {delay}s", run_uuid=run_uuid, stepcounter=f"fetch_{url}", user=user, script_start_time=script_start_time)
+            if e.response.status_code == 429:
+                _log(log_file, "RateLimit", f"Rate limit hit for {url}, attempt {attempt + 1}/{retries}, waiting {delay}s", url, run_uuid, user, script_start_time)
             if attempt == retries - 1:
                 raise
             time.sleep(delay)
             delay *= 2  # Exponential backoff
         except RequestException as e:
-            if log_file is not None:
-                from systemscripts.log_utils import log_message
-                log_message(log_file, "Error", f"Request error for {url}, attempt {attempt + 1}/{retries}: {str(e)}", run_uuid=run_uuid, stepcounter=f"fetch_{url}", user=user, script_start_time=script_start_time)
+            if rate_controller is not None and isinstance(e, Timeout):
+                _record_outcome(rate_controller, url, None, None, log_file, run_uuid, user, script_start_time)
+            _log(log_file, "Error", f"Request error for {url}, attempt {attempt + 1}/{retries}: {str(e)}", url, run_uuid, user, script_start_time)
             if attempt == retries - 1:
                 raise
             time.sleep(delay)
             delay *= 2
-    return None
\ No newline at end of file
+    return None
+
+class TokenBucket:
+    """Request budget of rate tokens per second, bursting up to capacity after an idle spell.
+
+    Tokens are reserved under a lock, so one bucket can be shared by threads and by coroutines; a caller that
+    finds the bucket empty is handed the time at which its token becomes available and waits for it.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token and return the seconds to wait before it may be used."""
+        with self._lock:
+            now = time.monotonic()
+            # _updated is in the future while the bucket is paused; nothing refills until then
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self._tokens -= 1
+            wait = self._updated - now
+            return wait if self._tokens >= 0 else wait - self._tokens / self.rate
+
+    def set_rate(self, rate):
+        """Change the refill rate; tokens already earned or owed are kept."""
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self.rate = float(rate)
+
+    def pause(self, seconds):
+        """Hand out no token for the next seconds, e.g. to honor a Retry-After header."""
+        with self._lock:
+            resume = time.monotonic() + seconds
+            if resume > self._updated:
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = resume
+
+    def acquire(self):
+        """Block the calling thread until a token is available."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait in the event loop until a token is available."""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+class HostLimiter:
+    """Caps the requests open against each host, with one asyncio.Semaphore per host name."""
+
+    def __init__(self, max_per_host):
+        self.max_per_host = max_per_host
+        self._semaphores = {}
+
+    def __call__(self, url):
+        """Return the semaphore for the host of url; use as `async with host_limiter(url):`."""
+        host = urlsplit(url).netloc.lower()
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+class AdaptiveRateController:
+    """Per-host request rate tuned by additive increase, multiplicative decrease (AIMD).
+
+    Each host gets a TokenBucket starting at initial_rate requests per second. Every healthy response adds
+    increase to the rate, up to max_rate; a 429 or 503 response or a timeout multiplies it by decrease, down to
+    min_rate, and a Retry-After header pauses the host for that long. Throttling signals from requests that were
+    already in flight when the rate was cut are ignored, so one overload only cuts the rate once. Shared safely by
+    threads (acquire) and coroutines (acquire_async).
+    """
+
+    def __init__(self, initial_rate=1.0, min_rate=0.05, max_rate=5.0, increase=0.02, decrease=0.5, burst=1):
+        self.initial_rate = float(initial_rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.burst = burst
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        """Return the state for the host of url, creating it on first use."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = {"host": host, "bucket": TokenBucket(self.initial_rate, self.burst), "last_cut": 0.0,
+                                             "requests": 0, "throttled": 0, "cuts": 0, "retry_after": 0}
+            return state
+
+    def acquire(self, url):
+        """Block the calling thread until the host of url may be sent another request."""
+        state = self._host(url)
+        state["requests"] += 1
+        state["bucket"].acquire()
+
+    async def acquire_async(self, url):
+        """Wait in the event loop until the host of url may be sent another request."""
+        state = self._host(url)
+        state["requests"] += 1
+        await state["bucket"].acquire_async()
+
+    def record(self, url, status_code=None, retry_after=None):
+        """Adjust the host's rate for one response; status_code None means the request timed out.
+
+        Returns the new rate if this response cut it, otherwise None.
+        """
+        state = self._host(url)
+        bucket = state["bucket"]
+        throttled = status_code is None or status_code in THROTTLE_STATUSES
+        with self._lock:
+            if not throttled:
+                bucket.set_rate(min(self.max_rate, bucket.rate + self.increase))
+                return None
+            state["throttled"] += 1
+            delay = parse_retry_after(retry_after)
+            if delay:
+                state["retry_after"] += 1
+                bucket.pause(delay)
+            now = time.monotonic()
+            # One cut per interval at the reduced rate: the other in-flight requests saw the same overload
+            if now - state["last_cut"] < 1.0 / bucket.rate:
+                return None
+            state["last_cut"] = now
+            state["cuts"] += 1
+            bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease))
+            return bucket.rate
+
+    def rate(self, url):
+        """Current requests per second allowed for the host of url."""
+        return self._host(url)["bucket"].rate
+
+    def summary(self):
+        """One-line effective rate and throttling counts per host, for the run log."""
+        with self._lock:
+            states = list(self._hosts.values())
+        if not states:
+            return "no requests yet"
+        return ", ".join(f"{s['host']}={s['bucket'].rate:.3f}/s ({s['requests']} requests, {s['throttled']} throttled, "
+                         f"{s['cuts']} cuts, {s['retry_after']} Retry-After)" for s in states)
+
+class HttpClient:
+    """Keep-alive connection pools shared by the threads and coroutines of a run.
+
+    Blocking requests (get, fetch_url) go through one requests.Session whose HTTPAdapter caches pools for
+    pool_connections hosts and keeps up to pool_maxsize idle connections per host; pool_block makes threads wait
+    for a free connection instead of opening extra ones. Coroutines (async_session, fetch_url_async) share one
+    aiohttp.ClientSession per event loop on a TCPConnector holding at most limit connections, limit_per_host per
+    host (0 for no limit), idle for up to keepalive_timeout seconds. headers are sent with every request.
+
+    stats() and summary() count requests and how many of them reused an open connection rather than paying a new
+    TCP and TLS handshake. Blocking counts come from the cached pools, so keep pool_connections at or above the
+    number of hosts a run talks to.
+    """
+
+    def __init__(self, headers=None, pool_connections=10, pool_maxsize=10, pool_block=False, limit=100, limit_per_host=0, keepalive_timeout=30.0):
+        self.headers = dict(headers or {})
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._async_session = None
+        self._async_loop = None
+        self._async_counts = {"requests": 0, "new_connections": 0, "reused_connections": 0}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, url, **kwargs):
+        """Blocking GET on the pooled requests.Session; takes the same keyword arguments as requests.Session.get."""
+        return self.session.get(url, **kwargs)
+
+    def _trace_config(self):
+        """aiohttp tracing hooks that count requests and new versus reused connections."""
+        def counter(name):
+            async def count(session, context, params):
+                with self._lock:
+                    self._async_counts[name] += 1
+            return count
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(counter("requests"))
+        trace_config.on_connection_create_end.append(counter("new_connections"))
+        trace_config.on_connection_reuseconn.append(counter("reused_connections"))
+        return trace_config
+
+    def async_session(self):
+        """Return the aiohttp.ClientSession for the running event loop, creating it on first use.
+
+        A session cannot outlive its loop, so each asyncio.run gets its own; call aclose before the loop ends.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+                connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=self.keepalive_timeout)
+                self._async_session = aiohttp.ClientSession(headers=self.headers, connector=connector, trace_configs=[self._trace_config()])
+                self._async_loop = loop
+            return self._async_session
+
+    async def aclose(self):
+        """Close the aiohttp session of the running loop, if one is open."""
+        with self._lock:
+            session, self._async_session, self._async_loop = self._async_session, None, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    def close(self):
+        """Close the pooled blocking connections."""
+        self.session.close()
+
+    def stats(self):
+        """Requests sent and connections opened or reused so far, blocking and asyncio combined."""
+        requests_sent = new_connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                new_connections += pool.num_connections
+        with self._lock:
+            counts = dict(self._async_counts)
+        return {
+            "requests": requests_sent + counts["requests"],
+            "new_connections": new_connections + counts["new_connections"],
+            "reused_connections": max(0, requests_sent - new_connections) + counts["reused_connections"]
+        }
+
+    def summary(self):
+        """One-line connection reuse counts, for the run log."""
+        stats = self.stats()
+        reuse = stats["reused_connections"] / stats["requests"] if stats["requests"] else 0.0
+        return f"{stats['requests']} requests, {stats['new_connections']} new connections, {stats['reused_connections']} reused ({reuse:.0%})"
+
+# Client used by fetch_url when no session is passed; created on first use
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def default_http_client():
+    """Process-wide HttpClient shared by callers that do not manage their own."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+def _record_outcome(rate_controller, url, status_code, retry_after, log_file, run_uuid, user, script_start_time):
+    """Report a response (status_code None for a timeout) to rate_controller and log any rate cut."""
+    new_rate = rate_controller.record(url, status_code, retry_after)
+    if new_rate is not None:
+        reason = f"HTTP {status_code}" if status_code is not None else "timeout"
+        wait = f", Retry-After {retry_after}" if retry_after else ""
+        _log(log_file, "RateControl", f"Cut request rate for {urlsplit(url).netloc} to {new_rate:.3f}/s after {reason}{wait}", url, run_uuid, user, script_start_time)
+
+async def _get_page(session, url, headers, timeout, rate_controller, log_file, run_uuid, user, script_start_time):
+    """Issue one GET and read the body, raising aiohttp.ClientResponseError for 4xx/5xx."""
+    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        if rate_controller is not None:
+            _record_outcome(rate_controller, url, response.status, response.headers.get("Retry-After"), log_file, run_uuid, user, script_start_time)
+        response.raise_for_status()
+        text = await response.text(errors="replace")
+        return FetchedPage(str(response.url), response.status, text, dict(response.headers))
+
+async def fetch_url_async(session, url, retries=5, initial_delay=5.0, headers=None, rate_limiter=None, host_limiter=None, timeout=10,
+                          log_file=None, run_uuid=None, user=None, script_start_time=None, rate_controller=None, cache=None):
+    """Fetch a URL with an HttpClient or an aiohttp.ClientSession, retrying like fetch_url.
+
+    Every attempt, retries included, takes a token from rate_limiter (a TokenBucket) and from rate_controller
+    (an AdaptiveRateController, which is also told how the attempt went), then a slot from host_limiter
+    (a HostLimiter). None of them is held during the backoff sleep. A cache is used as in fetch_url; a 304 page
+    has an empty text.
+    """
+    if isinstance(session, HttpClient):
+        session = session.async_session()
+    if cache is not None:
+        headers = {**(headers or {}), **cache.validators(url)}
+    delay = initial_delay
+    for attempt in range(retries):
+        try:
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async()
+            if rate_controller is not None:
+                await rate_controller.acquire_async(url)
+            if host_limiter is not None:
+                async with host_limiter(url):
+                    page = await _get_page(session, url, headers, timeout, rate_controller, log_file, run_uuid, user, script_start_time)
+            else:
+                page = await _get_page(session, url, headers, timeout, rate_controller, log_file, run_uuid, user, script_start_time)
+            if cache is not None and page.status_code == 304:
+                cache.record("not_modified")
+            return page
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                _log(log_file, "RateLimit", f"Rate limit hit for {url}, attempt {attempt + 1}/{retries}, waiting {delay}s", url, run_uuid, user, script_start_time)
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(delay)
+            delay *= 2  # Exponential backoff
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if rate_controller is not None and isinstance(e, asyncio.TimeoutError):
+                _record_outcome(rate_controller, url, None, None, log_file, run_uuid, user, script_start_time)
+            _log(log_file, "Error", f"Request error for {url}, attempt {attempt + 1}/{retries}: {str(e) or type(e).__name__}", url, run_uuid, user, script_start_time)
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(delay)
+            delay *= 2
+    return None
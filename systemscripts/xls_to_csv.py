@@ -15,6 +15,27 @@ from directory_management import ensure_directory_exists, ROOT_DIR, LOG_DIR
 # Add the root directory to sys.path
 sys.path.append(str(Path.home() / 'client_etl_workflow'))
 
+def read_excel_file(input_filepath):
+    """Parse a workbook once into a DataFrame, trying openpyxl first and falling back to xlrd for legacy .xls.
+
+    Returns (df, engine). Column names are returned as strings so callers can treat them like CSV headers.
+    Raises the xlrd error if neither engine can read the file.
+    """
+    try:
+        engine = "openpyxl"
+        df = pd.read_excel(input_filepath, engine=engine)
+    except Exception:
+        engine = "xlrd"
+        df = pd.read_excel(input_filepath, engine=engine)
+    df.columns = [str(col) for col in df.columns]
+    return df, engine
+
+def write_csv(df, output_filepath):
+    """Write a DataFrame as a QUOTE_NONNUMERIC CSV readable by the etl_group."""
+    df.to_csv(output_filepath, index=False, quoting=csv.QUOTE_NONNUMERIC, quotechar='"')
+    os.chmod(output_filepath, 0o660)
+    os.chown(output_filepath, os.getuid(), grp.getgrnam('etl_group').gr_gid)
+
 def xls_to_csv(input_filepath):
     """Convert an XLS/XLSX file to CSV and save it in the same directory."""
     script_start_time = time.time()
@@ -77,10 +98,8 @@ def xls_to_csv(input_filepath):
                             run_uuid=run_uuid, stepcounter="Conversion_4", user=user, script_start_time=script_start_time)
                 return
         
-        df.to_csv(output_filepath, index=False, quoting=csv.QUOTE_NONNUMERIC, quotechar='"')
-        os.chmod(output_filepath, 0o660)
         try:
-            os.chown(output_filepath, os.getuid(), grp.getgrnam('etl_group').gr_gid)
+            write_csv(df, output_filepath)
         except KeyError:
             log_message(log_file, "Warning", f"Group 'etl_group' not found; skipping chown for {output_filepath}", 
                         run_uuid=run_uuid, stepcounter="Conversion_5", user=user, script_start_time=script_start_time)